@@ -1,22 +1,67 @@
-from typing import Generator, cast
+from typing import AsyncGenerator, Generator, Optional, cast
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.crud.user import user as user_crud
 from app.crud.user import CRUDUser
+from app.crud.activity import ActivityTracker
+from app.crud.audit import audit_actor
 from app.models.user import User
 from app.schemas.token import TokenPayload
 from app.core import security
 from app.core.config import settings
-from app.db.db_utils import DatabaseConnectionPool
+from app.core.rate_limit import InMemoryRateLimitStore, Limit, LoginRateLimiter
+from app.core.token_cache import TokenClaimsCache
+from app.db.db_utils import AsyncDatabaseConnectionPool, DatabaseConnectionPool
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/login/access-token", auto_error=False
+)
+
+token_cache = (
+    TokenClaimsCache(
+        max_size=settings.TOKEN_CACHE_MAX_SIZE,
+        max_ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS,
+    )
+    if settings.TOKEN_CACHE_ENABLED
+    else None
+)
+
+login_rate_limiter = (
+    LoginRateLimiter(
+        InMemoryRateLimitStore(max_keys=settings.LOGIN_RATE_LIMIT_MAX_KEYS),
+        per_ip=Limit(
+            settings.LOGIN_RATE_LIMIT_IP_ATTEMPTS,
+            settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+        ),
+        per_email=Limit(
+            settings.LOGIN_RATE_LIMIT_EMAIL_ATTEMPTS,
+            settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+        ),
+    )
+    if settings.LOGIN_RATE_LIMIT_ENABLED
+    else None
+)
+
+
+activity_tracker = (
+    ActivityTracker(
+        lambda: DatabaseConnectionPool().get_session(),
+        flush_interval=settings.ACTIVITY_FLUSH_INTERVAL_SECONDS,
+        staleness=settings.ACTIVITY_STALENESS_SECONDS,
+        max_users=settings.ACTIVITY_MAX_USERS,
+    )
+    if settings.ACTIVITY_TRACKING_ENABLED
+    else None
+)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -28,9 +73,34 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+def get_read_db() -> Generator[Session, None, None]:
+    """Session for read-only endpoints; reads are served by a replica if any."""
+    db_pool = DatabaseConnectionPool()
+    db = db_pool.get_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    db_pool = AsyncDatabaseConnectionPool()
+    db = db_pool.get_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def decode_token(token: str) -> TokenPayload:
+    """
+    Verify `token` and return its claims. Verified claims are cached until the
+    token expires, so repeated requests with the same token skip the HMAC check.
+    """
+    if token_cache is not None:
+        cached = token_cache.get(token, settings.SECRET_KEY)
+        if cached is not None:
+            return cached
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -41,9 +111,68 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = cast(CRUDUser, user_crud).get(db, id=token_data.sub)
+    if token_cache is not None:
+        token_cache.set(token, settings.SECRET_KEY, token_data, payload)
+    return token_data
+
+
+async def set_audit_actor(token: Optional[str] = Depends(optional_oauth2)) -> None:
+    """
+    Attribute audit events of this request to the bearer token's user, if a
+    valid token was sent. Async so the context variable reaches the endpoint.
+    """
+    actor = None
+    if token is not None:
+        try:
+            actor = decode_token(token).sub
+        except HTTPException:
+            pass
+    audit_actor.set(actor)
+
+
+def claims_user(token_data: TokenPayload) -> Optional[User]:
+    """
+    In claims-only auth mode, a transient `User` carrying only the id and flags
+    stated by the token, unless the user changed since it was issued. None when
+    the user has to be loaded instead.
+    """
+    revocations = cast(CRUDUser, user_crud).revocations
+    if (
+        not settings.AUTH_CLAIMS_ONLY
+        or revocations is None
+        or token_data.sub is None
+        or token_data.is_active is None
+        or token_data.is_superuser is None
+        or token_data.token_version is None
+        or revocations.is_revoked(
+            token_data.sub, token_data.token_version, token_data.iat
+        )
+    ):
+        return None
+    return User(
+        id=token_data.sub,
+        is_active=token_data.is_active,
+        is_superuser=token_data.is_superuser,
+        version=token_data.token_version,
+    )
+
+
+def get_current_user(
+    db: Session = Depends(get_read_db), token: str = Depends(reusable_oauth2)
+) -> User:
+    """
+    The user the bearer token belongs to. In claims-only auth mode this is built
+    from the token without a query when possible, so only `id`, `is_active`,
+    `is_superuser` and `version` can be relied on. Marks the user as seen.
+    """
+    token_data = decode_token(token)
+    user = claims_user(token_data)
+    if user is None:
+        user = cast(CRUDUser, user_crud).get(db, id=token_data.sub)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    if activity_tracker is not None:
+        activity_tracker.touch(user.id)
     return cast(User, user)
 
 
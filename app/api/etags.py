@@ -0,0 +1,86 @@
+import hashlib
+from typing import Any, Iterable, List, Optional, Sequence, Set
+
+from fastapi import Request, Response, status
+
+from app.api.negotiation import JSON_MEDIA_TYPE
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def entity_etag(
+    id: Any,
+    version: int,
+    fields: Optional[Sequence[str]] = None,
+    media_type: str = JSON_MEDIA_TYPE,
+) -> str:
+    """
+    Strong ETag for one row: `"<id>.<version>"`, plus a digest of `fields` and
+    `media_type` when only some fields are sent or not as JSON, since that is a
+    different representation.
+    """
+    tag = f"{id}.{version}"
+    variant = tuple(fields or ())
+    if media_type != JSON_MEDIA_TYPE:
+        variant += (media_type,)
+    if variant:
+        tag += f".{_digest(*variant)[:8]}"
+    return f'"{tag}"'
+
+
+def collection_etag(
+    items: Iterable[Any], fields: Optional[Sequence[str]] = None, *extra: Any
+) -> str:
+    """
+    Strong ETag for a page of rows, from their ids and versions, the selected
+    `fields` and anything else the response depends on (such as the total).
+    """
+    return f'"{_digest([(item.id, item.version) for item in items], fields, *extra)}"'
+
+
+def _tags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(request: Request, etag: str) -> bool:
+    """
+    Whether `If-None-Match` matches `etag`, i.e. the client already has this
+    representation. Uses the weak comparison RFC 9110 asks for.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    tags = _tags(header)
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def not_modified(etag: str, response: Response) -> Response:
+    """Empty 304 response, keeping the headers already set on `response`."""
+    unchanged = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    unchanged.headers.raw.extend(response.headers.raw)
+    unchanged.headers["ETag"] = etag
+    return unchanged
+
+
+def if_match_versions(header: Optional[str], id: Any) -> Optional[Set[int]]:
+    """
+    Versions of row `id` named by an `If-Match` header, or None when there is no
+    precondition (no header, or `*`). Weak and foreign tags never match, so they
+    contribute nothing; an empty set fails for every version.
+    """
+    if header is None:
+        return None
+    tags = _tags(header)
+    if "*" in tags:
+        return None
+    versions = set()
+    for tag in tags:
+        if not (tag.startswith('"') and tag.endswith('"')):
+            continue
+        tag_id, _, rest = tag[1:-1].partition(".")
+        version = rest.partition(".")[0]
+        if tag_id == str(id) and version.isdigit():
+            versions.add(int(version))
+    return versions
@@ -0,0 +1,46 @@
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from pydantic import TypeAdapter
+
+from app.api.negotiation import JSON_MEDIA_TYPE, negotiated_response
+
+
+def parse_fields(
+    fields: Optional[str], allowed: Sequence[str]
+) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma separated `?fields=` value into the requested field names, in
+    request order and without duplicates. None means every field.
+    """
+    if fields is None:
+        return None
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [field for field in requested if field not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}; "
+            f"choose from {', '.join(allowed)}",
+        )
+    return requested
+
+
+def fieldset_response(
+    content: Any,
+    fields: Sequence[str],
+    response: Response,
+    media_type: str = JSON_MEDIA_TYPE,
+    adapter: Optional[TypeAdapter] = None,
+) -> Response:
+    """
+    Response with only `fields` of one object or a list of them (ORM objects or
+    rows), as JSON or MessagePack. Values come straight from the database, so
+    they are serialized without being validated again, by `adapter` if given.
+    Headers already set on `response` are kept.
+    """
+    items = content if isinstance(content, list) else [content]
+    data = [{field: getattr(item, field) for field in fields} for item in items]
+    return negotiated_response(
+        data if items is content else data[0], media_type, response, adapter
+    )
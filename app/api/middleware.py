@@ -0,0 +1,224 @@
+import hmac
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Mapping, Optional
+
+import anyio.to_thread
+from fastapi import status
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.concurrency import ConcurrencyLimiter, Overloaded
+from app.core.config import settings
+from app.core.profiling import PROFILE_SUFFIX, ProfileStore, StackSampler
+from app.core.metrics import (
+    UNMATCHED_ROUTE,
+    MetricsRegistry,
+    RequestMetrics,
+    current_request,
+)
+
+
+class MetricsMiddleware:
+    """
+    Times each HTTP request, counts the SQL it issues and adds a
+    `Server-Timing` header. Routes are labelled by their path template so
+    path parameters don't create new series.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", request.server_timing())
+            await send(message)
+
+        token = current_request.set(request)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            self.registry.observe(scope["method"], path, status, request)
+
+
+def route_class(scope: Scope) -> Optional[str]:
+    """
+    Concurrency limit class of a request, from its method and path since it
+    isn't routed yet. Requests outside the login and users APIs aren't limited.
+    """
+    path: str = scope["path"]
+    method: str = scope["method"]
+    if path.startswith(f"{settings.API_V1_STR}/login/"):
+        return "auth"
+    if not path.startswith(f"{settings.API_V1_STR}/users"):
+        return None
+    if path.endswith("/export"):
+        # Exports stream for as long as the table takes, which says nothing
+        # about overload.
+        return None
+    if method in ("GET", "HEAD") or path.endswith("/lookup"):
+        return "read"
+    if method == "POST":
+        # Creating users hashes their passwords.
+        return "hashing"
+    return "write"
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Sheds load before it piles up in the thread pool and the DB pool: requests
+    are admitted by their class's `ConcurrencyLimiter` and answered with 503
+    and `Retry-After` when it can't admit them in time. The latency and pool
+    wait of admitted requests are fed back to adapt the limits.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Mapping[str, ConcurrencyLimiter],
+        classify: Callable[[Scope], Optional[str]] = route_class,
+    ) -> None:
+        self.app = app
+        self.limiters = limiters
+        self.classify = classify
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = (
+            self.limiters.get(self.classify(scope) or "")
+            if scope["type"] == "http"
+            else None
+        )
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Server is busy, please retry shortly."},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        # Shares the metrics middleware's request if it runs, for pool waits.
+        request = current_request.get()
+        token = None
+        if request is None:
+            request = RequestMetrics()
+            token = current_request.set(request)
+        pool_wait = request.pool_wait
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if token is not None:
+                current_request.reset(token)
+            limiter.release(
+                time.perf_counter() - started,
+                request.pool_wait - pool_wait,
+                dropped=status_code == status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request with a `StackSampler` when it carries
+    `X-Profile: <secret>`, or for a `sample_rate` share of all requests, and
+    saves the samples to `store`. Requests profiled on demand get the profile's
+    file name back in `X-Profile-File`. At most `max_concurrent` requests are
+    profiled at once.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        *,
+        interval: float,
+        sample_rate: float = 0.0,
+        secret: Optional[str] = None,
+        max_concurrent: int = 1,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.secret = secret.encode() if secret else None
+        self.max_concurrent = max_concurrent
+        self._active = 0
+
+    def _requested(self, scope: Scope) -> bool:
+        if self.secret is None:
+            return False
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return hmac.compare_digest(value, self.secret)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._active >= self.max_concurrent:
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not requested and random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        name = ""
+
+        async def send_with_profile(message: Message) -> None:
+            nonlocal name
+            if message["type"] == "http.response.start":
+                # Routed by now, so the route template can name the profile.
+                route = scope.get("route")
+                path: str = scope["path"] if route is None else route.path
+                slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:80]
+                name = (
+                    f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{slug}-"
+                    f"{uuid.uuid4().hex[:8]}"
+                )
+                if requested:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-Profile-File", f"{name}{PROFILE_SUFFIX}")
+            await send(message)
+
+        self._active += 1
+        sampler = StackSampler(self.interval, threading.get_ident())
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            self._active -= 1
+            samples = await anyio.to_thread.run_sync(sampler.stop)
+            if name:
+                await anyio.to_thread.run_sync(self.store.save, name, samples)
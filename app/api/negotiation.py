@@ -0,0 +1,77 @@
+from typing import Any, Optional, cast
+
+import msgpack
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json, to_jsonable_python
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Media types clients use for MessagePack, mapped to the one we answer with.
+MSGPACK_ALIASES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack"}
+
+
+def _quality(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate(request: Request) -> str:
+    """
+    Media type to answer `request` with: MessagePack when `Accept` prefers it
+    over JSON, JSON otherwise, including for types we don't produce.
+    """
+    header = request.headers.get("accept")
+    if not header or "msgpack" not in header:
+        return JSON_MEDIA_TYPE
+    msgpack_q = json_q = 0.0
+    for entry in header.split(","):
+        media_type, _, params = entry.partition(";")
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_ALIASES:
+            msgpack_q = max(msgpack_q, _quality(params))
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            json_q = max(json_q, _quality(params))
+    return MSGPACK_MEDIA_TYPE if msgpack_q > json_q else JSON_MEDIA_TYPE
+
+
+def encode(
+    content: Any, media_type: str, adapter: Optional[TypeAdapter] = None
+) -> bytes:
+    """
+    `content` serialized as `media_type`, through `adapter` when given and by
+    type inference otherwise. Both formats carry the same JSON-compatible values.
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        if adapter is not None:
+            content = adapter.dump_python(content, mode="json")
+        else:
+            content = to_jsonable_python(content)
+        return cast(bytes, msgpack.packb(content))
+    if adapter is not None:
+        return adapter.dump_json(content)
+    return to_json(content)
+
+
+def negotiated_response(
+    content: Any,
+    media_type: str,
+    response: Response,
+    adapter: Optional[TypeAdapter] = None,
+) -> Response:
+    """
+    `content` encoded as `media_type`. Returning a `Response` skips FastAPI's
+    `response_model` validation and encoding. Headers already set on
+    `response` are kept.
+    """
+    negotiated = Response(
+        content=encode(content, media_type, adapter), media_type=media_type
+    )
+    negotiated.headers.raw.extend(response.headers.raw)
+    return negotiated
@@ -0,0 +1,43 @@
+from typing import Any, Collection, Optional, Sequence
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.crud.pagination import Cursor, InvalidCursorError
+
+
+def parse_cursor(
+    after: Optional[str], allowed_order: Collection[str]
+) -> Optional[Cursor]:
+    if after is None:
+        return None
+    try:
+        cursor = Cursor.decode(after)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if cursor.order_by not in allowed_order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed cursor"
+        )
+    return cursor
+
+
+def set_next_page_headers(
+    request: Request,
+    response: Response,
+    items: Sequence[Any],
+    *,
+    order_by: str,
+    limit: int,
+) -> None:
+    """
+    Advertise the next page through `Link: <...>; rel="next"` and
+    `X-Next-Cursor`. A short page means there is nothing left to fetch.
+    """
+    if limit <= 0 or len(items) < limit:
+        return
+    cursor = Cursor.from_row(items[-1], order_by).encode()
+    next_url = request.url.remove_query_params(["skip", "after"]).include_query_params(
+        after=cursor, limit=limit
+    )
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    response.headers["X-Next-Cursor"] = cursor
@@ -0,0 +1,41 @@
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, status
+from typing import Any, Dict
+
+from app.api import deps
+from app.core.concurrency import concurrency_limiters
+from app.crud.audit import audit_log
+from app.crud.user import user_cache
+from app.db.db_utils import DatabaseConnectionPool
+from app.models.user import User
+
+router = APIRouter()
+
+
+@router.get("/stats", response_model=Dict[str, Any], status_code=status.HTTP_200_OK)
+def read_stats(
+    current_user: User = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Connection pool, cache, audit log, activity tracking and concurrency limit
+    counters of this process.
+    """
+    db_pool = DatabaseConnectionPool()
+    return {
+        "db_pool": db_pool.stats(),
+        "db_replica_pools": db_pool.replica_stats(),
+        "user_cache": asdict(user_cache.stats) if user_cache else None,
+        "token_cache": asdict(deps.token_cache.stats) if deps.token_cache else None,
+        "audit_log": asdict(audit_log.stats) if audit_log else None,
+        "activity": (
+            asdict(deps.activity_tracker.stats) if deps.activity_tracker else None
+        ),
+        "concurrency": (
+            {
+                name: asdict(limiter.stats)
+                for name, limiter in concurrency_limiters.items()
+            }
+            if concurrency_limiters
+            else None
+        ),
+    }
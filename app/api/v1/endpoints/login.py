@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+from typing import Any
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.crud.user import user as user_crud
+from app.schemas.token import Token
+
+router = APIRouter()
+
+
+@router.post("/login/access-token", response_model=Token)
+async def login_access_token(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
+) -> Any:
+    """
+    OAuth2 compatible token login, get an access token for future requests.
+    The stored hash is upgraded when it uses an outdated scheme or cost.
+    """
+    if deps.login_rate_limiter is not None:
+        deps.login_rate_limiter.check(
+            email=form_data.username,
+            ip=request.client.host if request.client else None,
+        )
+    user = await run_in_threadpool(user_crud.get_by_email, db, email=form_data.username)
+    if user is None:
+        hashed_password = await run_in_threadpool(security.dummy_password_hash)
+    else:
+        hashed_password = user.password
+    valid, new_hash = await password_hasher.verify_and_update(
+        form_data.password, hashed_password
+    )
+    if user is None or not valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Incorrect email or password",
+        )
+    if not user_crud.is_active(user):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
+        )
+    if deps.login_rate_limiter is not None:
+        deps.login_rate_limiter.succeeded(email=form_data.username)
+    if deps.activity_tracker is not None:
+        deps.activity_tracker.touch(user.id, login=True)
+    if new_hash:
+        # A rehash bumps the version but revokes nothing, so the token below
+        # may carry the previous one.
+        await run_in_threadpool(
+            user_crud.set_password_hash, db, id=user.id, hashed_password=new_hash
+        )
+    claims = None
+    if settings.AUTH_CLAIMS_ONLY:
+        claims = {
+            "is_active": user.is_active,
+            "is_superuser": user.is_superuser,
+            "token_version": user.version,
+        }
+    return {
+        "access_token": security.create_access_token(user.id, claims=claims),
+        "token_type": "bearer",
+    }
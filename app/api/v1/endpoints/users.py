@@ -1,16 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+import csv
+import io
+import json
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Any, List
+from sqlalchemy.orm.exc import StaleDataError
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    cast,
+    get_args,
+)
 
+from app.core.config import settings
+from app.core.hashing import password_hasher
 from app.crud.user import user as user_crud
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.schemas.user import (
+    BulkItemStatus,
+    User,
+    UserBulkCreate,
+    UserBulkCreateResult,
+    UserBulkItemResult,
+    UserCount,
+    UserCreate,
+    UserFilter,
+    UserLookup,
+    UserLookupResult,
+    UserRecord,
+    UserUpdate,
+)
 from app.api import deps
+from app.api.etags import (
+    collection_etag,
+    entity_etag,
+    if_match_versions,
+    none_match,
+    not_modified,
+)
+from app.api.fieldsets import fieldset_response, parse_fields
+from app.api.negotiation import MSGPACK_MEDIA_TYPE, negotiate
+from app.api.pagination import parse_cursor, set_next_page_headers
+
+router = APIRouter(dependencies=[Depends(deps.set_audit_actor)])
+
+UserOrder = Literal["id", "email"]
+USER_ORDER_FIELDS = get_args(UserOrder)
+
+EMAIL_TAKEN = "The user with this email already exists in the system."
+
+USER_FIELDS = tuple(User.model_fields)
+FIELDS_DESCRIPTION = f"Comma separated subset of {', '.join(USER_FIELDS)}."
 
-router = APIRouter()
+EXPORT_FIELDS = ("id", "email", "is_active", "is_superuser")
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Serialize whole users read from the database, which need no validation.
+USER_ADAPTER = TypeAdapter(UserRecord)
+USERS_ADAPTER = TypeAdapter(List[UserRecord])
+# Documents the `Accept: application/msgpack` alternative to JSON.
+MSGPACK_RESPONSES: Dict[int | str, Dict[str, Any]] = {
+    200: {"content": {MSGPACK_MEDIA_TYPE: {}}}
+}
+
+
+def _drain(buffer: io.StringIO) -> str:
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
 
 
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     *,
     db: Session = Depends(deps.get_db),
     user_in: UserCreate,
@@ -18,86 +97,387 @@ def create_user(
     """
     Create new user.
     """
-    user = user_crud.get_by_email(db, email=user_in.email)
-    if user:
+    hashed_password = await password_hasher.hash_password(user_in.password)
+    try:
+        user = await run_in_threadpool(
+            user_crud.create, db, obj_in=user_in, hashed_password=hashed_password
+        )
+    except IntegrityError as e:
+        if not user_crud.is_unique_violation(e, "email"):
+            raise
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail="The user with this email already exists in the system.",
+            detail=EMAIL_TAKEN,
         )
-    user = user_crud.create(db, obj_in=user_in)
     return user
 
 
-@router.get("/", response_model=List[User], status_code=status.HTTP_200_OK)
-def read_users(
+@router.post(
+    "/bulk", response_model=UserBulkCreateResult, status_code=status.HTTP_200_OK
+)
+async def create_users_bulk(
+    *,
     db: Session = Depends(deps.get_db),
+    bulk_in: UserBulkCreate,
+) -> Any:
+    """
+    Create many users at once and report the outcome of each item.
+    """
+    results: Dict[int, UserBulkItemResult] = {}
+    to_create: Dict[int, UserCreate] = {}
+    for index, item in enumerate(bulk_in.users):
+        try:
+            to_create[index] = UserCreate.model_validate(item)
+        except ValidationError as e:
+            results[index] = UserBulkItemResult(
+                index=index,
+                status=BulkItemStatus.invalid,
+                email=item.get("email") if isinstance(item, dict) else None,
+                detail="; ".join(error["msg"] for error in e.errors()),
+            )
+
+    taken = await run_in_threadpool(
+        user_crud.get_existing_emails,
+        db,
+        emails=[user_in.email for user_in in to_create.values()],
+    )
+    for index, user_in in list(to_create.items()):
+        if user_in.email in taken:
+            del to_create[index]
+            results[index] = UserBulkItemResult(
+                index=index,
+                status=BulkItemStatus.conflict,
+                email=user_in.email,
+                detail=EMAIL_TAKEN,
+            )
+        taken.add(user_in.email)
+
+    hashed_passwords = await password_hasher.hash_passwords(
+        [user_in.password for user_in in to_create.values()]
+    )
+    try:
+        users = await run_in_threadpool(
+            user_crud.create_multi,
+            db,
+            objs_in=list(to_create.values()),
+            hashed_passwords=hashed_passwords,
+        )
+    except IntegrityError as e:
+        await run_in_threadpool(db.rollback)
+        if not user_crud.is_unique_violation(e, "email"):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Some of these users were created concurrently, please retry.",
+        )
+    for index, user in zip(to_create, users):
+        results[index] = UserBulkItemResult(
+            index=index,
+            status=BulkItemStatus.created,
+            email=user.email,
+            user=User.model_validate(user),
+        )
+
+    ordered = [results[index] for index in sorted(results)]
+    return UserBulkCreateResult(
+        created=len(to_create),
+        conflicts=sum(r.status == BulkItemStatus.conflict for r in ordered),
+        invalid=sum(r.status == BulkItemStatus.invalid for r in ordered),
+        results=ordered,
+    )
+
+
+@router.get(
+    "/",
+    response_model=List[User],
+    status_code=status.HTTP_200_OK,
+    responses=MSGPACK_RESPONSES,
+)
+def read_users(
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_read_db),
+    filters: UserFilter = Depends(),
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
+    order_by: UserOrder = "id",
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+) -> Any:
+    """
+    Retrieve users. `X-Total-Count` holds the number of users matching the
+    filters.
+
+    Pass the `after` cursor from the previous page's `X-Next-Cursor` (or follow
+    its `Link: rel="next"`) for keyset pagination; `skip` still works for
+    offset pagination. `fields` limits both the columns read and the response.
+    Answers 304 when `If-None-Match` holds the page's current `ETag`, and with
+    MessagePack instead of JSON when `Accept` prefers `application/msgpack`.
+    """
+    media_type = negotiate(request)
+    response.headers["Vary"] = "Accept"
+    cursor = parse_cursor(after, USER_ORDER_FIELDS)
+    if cursor is not None:
+        order_by = cast(UserOrder, cursor.order_by)
+    selected = parse_fields(fields, USER_FIELDS)
+    page: Dict[str, Any] = dict(
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+        after=cursor,
+        filters=filters.model_dump(),
+    )
+    users: Sequence[Any]
+    if selected is None:
+        users = user_crud.get_multi(db, **page)
+    else:
+        # The id and ordering column are needed for the next-page cursor, the
+        # version for the ETag.
+        columns = dict.fromkeys((*selected, "id", "version", order_by))
+        users = user_crud.get_multi_columns(db, columns=list(columns), **page)
+    set_next_page_headers(request, response, users, order_by=order_by, limit=limit)
+    total = user_crud.count(
+        db,
+        filters=filters.model_dump(),
+        approximate=settings.USER_COUNT_MODE == "approximate",
+    )
+    response.headers["X-Total-Count"] = str(total)
+    etag = collection_etag(users, selected, total, media_type)
+    if none_match(request, etag):
+        return not_modified(etag, response)
+    response.headers["ETag"] = etag
+    if selected is not None:
+        return fieldset_response(list(users), selected, response, media_type)
+    return fieldset_response(
+        list(users), USER_FIELDS, response, media_type, USERS_ADAPTER
+    )
+
+
+@router.get("/count", response_model=UserCount, status_code=status.HTTP_200_OK)
+def count_users(
+    db: Session = Depends(deps.get_read_db),
+    filters: UserFilter = Depends(),
+) -> Any:
+    """
+    Number of users matching the filters. Served from counters kept up to date
+    by writes, or from planner estimates when `USER_COUNT_MODE=approximate`.
+    """
+    count = user_crud.count(
+        db,
+        filters=filters.model_dump(),
+        approximate=settings.USER_COUNT_MODE == "approximate",
+    )
+    return {"count": count}
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_users(
+    db: Session = Depends(deps.get_read_db),
+    filters: UserFilter = Depends(),
+    format: Literal["ndjson", "csv"] = "ndjson",
 ) -> Any:
     """
-    Retrieve users.
+    Stream every user matching the filters as NDJSON or CSV.
     """
-    users = user_crud.get_multi(db, skip=skip, limit=limit)
-    return users
+
+    def generate() -> Iterator[str]:
+        # Dependencies are torn down before a streamed body is sent, so the
+        # generator keeps using the session on its own and closes it at the end.
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if format == "csv":
+                writer.writerow(EXPORT_FIELDS)
+            for rows in user_crud.stream(
+                db,
+                columns=EXPORT_FIELDS,
+                filters=filters.model_dump(),
+                batch_size=settings.EXPORT_BATCH_SIZE,
+            ):
+                if format == "csv":
+                    writer.writerows(rows)
+                else:
+                    for row in rows:
+                        buffer.write(json.dumps(row._asdict(), separators=(",", ":")))
+                        buffer.write("\n")
+                yield _drain(buffer)
+            if buffer.tell():
+                yield _drain(buffer)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
 
 
-@router.get("/{user_id}", response_model=User, status_code=status.HTTP_200_OK)
+@router.get("/search", response_model=List[User], status_code=status.HTTP_200_OK)
+def search_users(
+    db: Session = Depends(deps.get_read_db),
+    q: str = Query(..., min_length=1, max_length=254),
+    limit: int = Query(20, ge=1, le=100),
+) -> Any:
+    """
+    Find users whose email starts with or contains `q`, ignoring case. Prefix
+    matches come first; terms shorter than three characters only match prefixes.
+    """
+    return user_crud.search(db, q=q, limit=limit)
+
+
+@router.post("/lookup", response_model=UserLookupResult, status_code=status.HTTP_200_OK)
+def lookup_users(
+    lookup: UserLookup,
+    db: Session = Depends(deps.get_read_db),
+) -> Any:
+    """
+    Resolve many users at once by id and/or email, with one query per kind of
+    key for the users that are not cached. Users are listed once each, those
+    found by id first, in request order; keys without a user are reported back.
+    """
+    by_id = user_crud.get_many(db, ids=lookup.ids)
+    by_email = user_crud.get_many_by_field(db, field="email", values=lookup.emails)
+    users = {user.id: user for user in [*by_id.values(), *by_email.values()]}
+    return {
+        "users": list(users.values()),
+        "missing_ids": [id for id in dict.fromkeys(lookup.ids) if id not in by_id],
+        "missing_emails": [
+            email for email in dict.fromkeys(lookup.emails) if email not in by_email
+        ],
+    }
+
+
+@router.get(
+    "/{user_id}",
+    response_model=User,
+    status_code=status.HTTP_200_OK,
+    responses=MSGPACK_RESPONSES,
+)
 def read_user_by_id(
     user_id: int,
-    db: Session = Depends(deps.get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_read_db),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = user_crud.get(db, id=user_id)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
-        )
-    return user
+    return _read_user(db, request, response, "id", user_id, fields)
 
 
-@router.get("/by-email/{email}", response_model=User, status_code=status.HTTP_200_OK)
+@router.get(
+    "/by-email/{email}",
+    response_model=User,
+    status_code=status.HTTP_200_OK,
+    responses=MSGPACK_RESPONSES,
+)
 def read_user_by_email(
     email: str,
-    db: Session = Depends(deps.get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_read_db),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ) -> Any:
     """
     Get a specific user by email.
     """
-    user = user_crud.get_by_email(db, email=email)
+    return _read_user(db, request, response, "email", email, fields)
+
+
+def _read_user(
+    db: Session,
+    request: Request,
+    response: Response,
+    field: str,
+    value: Any,
+    fields: Optional[str],
+) -> Any:
+    """
+    The user where `field` equals `value`, in the format negotiated from
+    `Accept`, or a 304 without a body when the client's `If-None-Match` already
+    holds its `ETag`.
+    """
+    media_type = negotiate(request)
+    response.headers["Vary"] = "Accept"
+    selected = parse_fields(fields, USER_FIELDS)
+    if selected is None:
+        user = user_crud.get_by_field(db, field=field, value=value)
+    else:
+        columns = dict.fromkeys((*selected, "id", "version"))
+        user = user_crud.get_columns_by_field(
+            db, field=field, value=value, columns=list(columns)
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    return user
+    etag = entity_etag(user.id, user.version, selected, media_type)
+    if none_match(request, etag):
+        return not_modified(etag, response)
+    response.headers["ETag"] = etag
+    if selected is not None:
+        return fieldset_response(user, selected, response, media_type)
+    return fieldset_response(user, USER_FIELDS, response, media_type, USER_ADAPTER)
 
 
 @router.put("/{user_id}", response_model=User, status_code=status.HTTP_200_OK)
-def update_user(
+async def update_user(
     *,
     db: Session = Depends(deps.get_db),
+    response: Response,
     user_id: int,
     user_in: UserUpdate,
+    if_match: Optional[str] = Header(None),
 ) -> Any:
     """
-    Update a user.
+    Update a user. With `If-Match`, the update only happens if the user still
+    has one of the given ETags, and fails with 412 otherwise, including when
+    the user doesn't exist.
     """
-    user = user_crud.get(db, id=user_id)
-    if not user:
+    hashed_password = None
+    if user_in.password is not None:
+        hashed_password = await password_hasher.hash_password(user_in.password)
+    try:
+        user = await run_in_threadpool(
+            user_crud.update_by_id,
+            db,
+            id=user_id,
+            obj_in=user_in,
+            hashed_password=hashed_password,
+            versions=if_match_versions(if_match, user_id),
+        )
+    except StaleDataError:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found",
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="The user has been modified since it was read",
+        )
+    except IntegrityError as e:
+        if not user_crud.is_unique_violation(e, "email"):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=EMAIL_TAKEN,
         )
-    try:
-        user = user_crud.update(db, db_obj=user, obj_in=user_in)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
+    if not user:
+        if if_match is not None:
+            # With no current representation, no `If-Match` can hold.
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="User not found",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    response.headers["ETag"] = entity_etag(user.id, user.version)
     return user
 
 
@@ -109,11 +489,10 @@ def delete_user(
     """
     Delete a user.
     """
-    user = user_crud.get(db, id=user_id)
+    user = user_crud.remove(db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    user_crud.remove(db, id=user_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,312 @@
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    status,
+    Response,
+)
+from fastapi.routing import APIRoute
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Any, Dict, List, Optional, Sequence, cast
+
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.crud.user_async import user_async as user_crud
+from app.schemas.user import User, UserCount, UserCreate, UserFilter, UserUpdate
+from app.api import deps
+from app.api.v1.endpoints import users
+from app.api.v1.endpoints.users import (
+    EMAIL_TAKEN,
+    FIELDS_DESCRIPTION,
+    MSGPACK_RESPONSES,
+    USER_ADAPTER,
+    USER_FIELDS,
+    USER_ORDER_FIELDS,
+    USERS_ADAPTER,
+    UserOrder,
+)
+from app.api.etags import (
+    collection_etag,
+    entity_etag,
+    if_match_versions,
+    none_match,
+    not_modified,
+)
+from app.api.fieldsets import fieldset_response, parse_fields
+from app.api.negotiation import negotiate
+from app.api.pagination import parse_cursor, set_next_page_headers
+
+router = APIRouter(dependencies=[Depends(deps.set_audit_actor)])
+
+# Endpoints without an async implementation, served by the sync ones.
+SYNC_PATHS = {"/bulk", "/export", "/search", "/lookup"}
+
+
+@router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
+async def create_user(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_in: UserCreate,
+) -> Any:
+    """
+    Create new user.
+    """
+    hashed_password = await password_hasher.hash_password(user_in.password)
+    try:
+        user = await user_crud.create(
+            db, obj_in=user_in, hashed_password=hashed_password
+        )
+    except IntegrityError as e:
+        if not user_crud.is_unique_violation(e, "email"):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=EMAIL_TAKEN,
+        )
+    return user
+
+
+@router.get(
+    "/",
+    response_model=List[User],
+    status_code=status.HTTP_200_OK,
+    responses=MSGPACK_RESPONSES,
+)
+async def read_users(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    filters: UserFilter = Depends(),
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    order_by: UserOrder = "id",
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+) -> Any:
+    """
+    Retrieve users. `X-Total-Count` holds the number of users matching the
+    filters.
+
+    Pass the `after` cursor from the previous page's `X-Next-Cursor` (or follow
+    its `Link: rel="next"`) for keyset pagination; `skip` still works for
+    offset pagination. `fields` limits both the columns read and the response.
+    Answers 304 when `If-None-Match` holds the page's current `ETag`, and with
+    MessagePack instead of JSON when `Accept` prefers `application/msgpack`.
+    """
+    media_type = negotiate(request)
+    response.headers["Vary"] = "Accept"
+    cursor = parse_cursor(after, USER_ORDER_FIELDS)
+    if cursor is not None:
+        order_by = cast(UserOrder, cursor.order_by)
+    selected = parse_fields(fields, USER_FIELDS)
+    page: Dict[str, Any] = dict(
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+        after=cursor,
+        filters=filters.model_dump(),
+    )
+    users: Sequence[Any]
+    if selected is None:
+        users = await user_crud.get_multi(db, **page)
+    else:
+        # The id and ordering column are needed for the next-page cursor, the
+        # version for the ETag.
+        columns = dict.fromkeys((*selected, "id", "version", order_by))
+        users = await user_crud.get_multi_columns(db, columns=list(columns), **page)
+    set_next_page_headers(request, response, users, order_by=order_by, limit=limit)
+    total = await user_crud.count(
+        db,
+        filters=filters.model_dump(),
+        approximate=settings.USER_COUNT_MODE == "approximate",
+    )
+    response.headers["X-Total-Count"] = str(total)
+    etag = collection_etag(users, selected, total, media_type)
+    if none_match(request, etag):
+        return not_modified(etag, response)
+    response.headers["ETag"] = etag
+    if selected is not None:
+        return fieldset_response(list(users), selected, response, media_type)
+    return fieldset_response(
+        list(users), USER_FIELDS, response, media_type, USERS_ADAPTER
+    )
+
+
+@router.get("/count", response_model=UserCount, status_code=status.HTTP_200_OK)
+async def count_users(
+    db: AsyncSession = Depends(deps.get_async_db),
+    filters: UserFilter = Depends(),
+) -> Any:
+    """
+    Number of users matching the filters. Served from counters kept up to date
+    by writes, or from planner estimates when `USER_COUNT_MODE=approximate`.
+    """
+    count = await user_crud.count(
+        db,
+        filters=filters.model_dump(),
+        approximate=settings.USER_COUNT_MODE == "approximate",
+    )
+    return {"count": count}
+
+
+# Before `/{user_id}`, which would otherwise take these paths for a user id.
+router.routes.extend(
+    route
+    for route in users.router.routes
+    if isinstance(route, APIRoute) and route.path in SYNC_PATHS
+)
+
+
+@router.get(
+    "/{user_id}",
+    response_model=User,
+    status_code=status.HTTP_200_OK,
+    responses=MSGPACK_RESPONSES,
+)
+async def read_user_by_id(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+) -> Any:
+    """
+    Get a specific user by id.
+    """
+    return await _read_user(db, request, response, "id", user_id, fields)
+
+
+@router.get(
+    "/by-email/{email}",
+    response_model=User,
+    status_code=status.HTTP_200_OK,
+    responses=MSGPACK_RESPONSES,
+)
+async def read_user_by_email(
+    email: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+) -> Any:
+    """
+    Get a specific user by email.
+    """
+    return await _read_user(db, request, response, "email", email, fields)
+
+
+async def _read_user(
+    db: AsyncSession,
+    request: Request,
+    response: Response,
+    field: str,
+    value: Any,
+    fields: Optional[str],
+) -> Any:
+    """
+    The user where `field` equals `value`, in the format negotiated from
+    `Accept`, or a 304 without a body when the client's `If-None-Match` already
+    holds its `ETag`.
+    """
+    media_type = negotiate(request)
+    response.headers["Vary"] = "Accept"
+    selected = parse_fields(fields, USER_FIELDS)
+    user: Any
+    if selected is None:
+        user = await user_crud.get_by_field(db, field=field, value=value)
+    else:
+        columns = dict.fromkeys((*selected, "id", "version"))
+        user = await user_crud.get_columns_by_field(
+            db, field=field, value=value, columns=list(columns)
+        )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    etag = entity_etag(user.id, user.version, selected, media_type)
+    if none_match(request, etag):
+        return not_modified(etag, response)
+    response.headers["ETag"] = etag
+    if selected is not None:
+        return fieldset_response(user, selected, response, media_type)
+    return fieldset_response(user, USER_FIELDS, response, media_type, USER_ADAPTER)
+
+
+@router.put("/{user_id}", response_model=User, status_code=status.HTTP_200_OK)
+async def update_user(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    response: Response,
+    user_id: int,
+    user_in: UserUpdate,
+    if_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    Update a user. With `If-Match`, the update only happens if the user still
+    has one of the given ETags, and fails with 412 otherwise, including when
+    the user doesn't exist.
+    """
+    hashed_password = None
+    if user_in.password is not None:
+        hashed_password = await password_hasher.hash_password(user_in.password)
+    try:
+        user = await user_crud.update_by_id(
+            db,
+            id=user_id,
+            obj_in=user_in,
+            hashed_password=hashed_password,
+            versions=if_match_versions(if_match, user_id),
+        )
+    except StaleDataError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="The user has been modified since it was read",
+        )
+    except IntegrityError as e:
+        if not user_crud.is_unique_violation(e, "email"):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=EMAIL_TAKEN,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    if not user:
+        if if_match is not None:
+            # With no current representation, no `If-Match` can hold.
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="User not found",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    response.headers["ETag"] = entity_etag(user.id, user.version)
+    return user
+
+
+@router.delete("/{user_id}")
+async def delete_user(
+    user_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """
+    Delete a user.
+    """
+    user = await user_crud.remove(db, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,100 @@
+"""
+Pick the password hashing cost for this host: the highest rounds whose median
+hash time stays within the latency budget.
+
+    python -m app.core.calibrate_hashing --budget-ms 250
+    python -m app.core.calibrate_hashing --scheme pbkdf2_sha256
+
+Prints the settings to use, e.g. `PASSWORD_HASH_ROUNDS=12`. Users' existing
+hashes are upgraded to the new cost at their next login.
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List, Tuple
+
+from passlib.registry import get_crypt_handler
+
+from app.core.config import settings
+from app.core.security import PASSWORD_SCHEMES, build_pwd_context
+
+# Lowest cost recommended regardless of how slow the host is.
+MIN_ROUNDS = {"bcrypt": 10, "pbkdf2_sha256": 100_000}
+
+
+def measure_hash(scheme: str, rounds: int, samples: int = 5) -> float:
+    """Median seconds to hash one password with `scheme` at `rounds`."""
+    context = build_pwd_context(scheme, rounds)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(
+    scheme: str,
+    budget: float,
+    measure: Callable[[int], float],
+    min_rounds: int,
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    Return the highest rounds (at least `min_rounds`) whose `measure` stays within
+    `budget` seconds, and every (rounds, seconds) pair measured on the way.
+    """
+    handler = get_crypt_handler(scheme)
+    measured: List[Tuple[int, float]] = []
+    rounds = max(min_rounds, handler.min_rounds)
+    if handler.rounds_cost == "log2":
+        # Each extra round doubles the cost, so walk up until over budget.
+        while rounds < handler.max_rounds:
+            measured.append((rounds + 1, measure(rounds + 1)))
+            if measured[-1][1] > budget:
+                break
+            rounds += 1
+        return rounds, measured
+    # Linear cost: extrapolate from one sample, then back off until it fits.
+    seconds = measure(rounds)
+    measured.append((rounds, seconds))
+    candidate = min(handler.max_rounds, int(rounds * budget / seconds))
+    while candidate > rounds:
+        seconds = measure(candidate)
+        measured.append((candidate, seconds))
+        if seconds <= budget:
+            return candidate, measured
+        candidate = int(candidate * 0.9)
+    return rounds, measured
+
+
+def main(args: argparse.Namespace) -> None:
+    budget = args.budget_ms / 1000
+    rounds, measured = calibrate(
+        args.scheme,
+        budget,
+        lambda rounds: measure_hash(args.scheme, rounds, args.samples),
+        args.min_rounds or MIN_ROUNDS[args.scheme],
+    )
+    for tried, seconds in measured:
+        print(f"{args.scheme} rounds={tried:<10} {seconds * 1000:9.1f} ms")
+    chosen = dict(measured).get(rounds) or measure_hash(args.scheme, rounds)
+    if chosen > budget:
+        print(f"warning: the minimum cost already exceeds {args.budget_ms} ms")
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    print(f"PASSWORD_HASH_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scheme", choices=PASSWORD_SCHEMES, default=settings.PASSWORD_HASH_SCHEME
+    )
+    parser.add_argument(
+        "--budget-ms", type=float, default=settings.PASSWORD_HASH_BUDGET_MS
+    )
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--min-rounds", type=int)
+    main(parser.parse_args())
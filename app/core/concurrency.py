@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional
+
+from app.core.config import settings
+
+# Route classes limited separately, see `app.api.middleware.route_class`.
+ROUTE_CLASSES = ("auth", "hashing", "read", "write")
+
+
+class Overloaded(Exception):
+    """Raised when a request can't be admitted within its class's limits."""
+
+
+@dataclass
+class LimiterStats:
+    limit: float
+    in_flight: int
+    queued: int
+    admitted: int = 0
+    # Requests turned away because the queue was full or they waited too long.
+    rejected: int = 0
+    timed_out: int = 0
+    increases: int = 0
+    decreases: int = 0
+
+
+class AIMDLimit:
+    """
+    Additive-increase/multiplicative-decrease concurrency limit. Requests that
+    take longer than `latency_target`, wait longer than `pool_wait_target` for
+    a database connection or are dropped downstream shrink the limit by
+    `backoff`; other requests grow it by about one per limit's worth of them,
+    as long as the limit is actually being used.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        latency_target: float,
+        pool_wait_target: float,
+        backoff: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.current = min(max(initial, min_limit), max_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.pool_wait_target = pool_wait_target
+        self.backoff = backoff
+        self.clock = clock
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = -float("inf")
+
+    def on_sample(
+        self, latency: float, pool_wait: float, in_flight: int, dropped: bool
+    ) -> None:
+        if (
+            dropped
+            or latency > self.latency_target
+            or pool_wait > self.pool_wait_target
+        ):
+            # Requests admitted before a decrease report the same overload, so
+            # back off at most once per latency target.
+            now = self.clock()
+            if now - self._last_decrease >= self.latency_target:
+                self._last_decrease = now
+                self.current = max(self.min_limit, self.current * self.backoff)
+                self.decreases += 1
+        elif in_flight * 2 >= self.current and self.current < self.max_limit:
+            self.current = min(self.max_limit, self.current + 1 / self.current)
+            self.increases += 1
+
+
+class ConcurrencyLimiter:
+    """
+    Admits at most `limit.current` requests at once. Others wait in a FIFO
+    queue of up to `max_queue` requests for at most `queue_timeout` seconds,
+    after which, like when the queue is full, `acquire` raises `Overloaded`.
+    Not thread safe: it must only be used from the event loop.
+    """
+
+    def __init__(self, limit: AIMDLimit, *, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    async def acquire(self) -> None:
+        if not self._waiters and self._in_flight < self.limit.current:
+            self._in_flight += 1
+            self._admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._rejected += 1
+            raise Overloaded("Too many requests queued")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self._rejected += 1
+            self._timed_out += 1
+            raise Overloaded("Timed out waiting for a slot") from None
+        except asyncio.CancelledError:
+            # The client went away, possibly right after being handed a slot.
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._discard(waiter)
+            raise
+        self._admitted += 1
+
+    def release(self, latency: float, pool_wait: float, dropped: bool) -> None:
+        """Return the slot of a finished request and adapt the limit to it."""
+        self.limit.on_sample(latency, pool_wait, self._in_flight, dropped)
+        self._release()
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        # Slots are handed over directly so arrivals can't overtake the queue.
+        while self._waiters and self._in_flight < self.limit.current:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._in_flight += 1
+
+    def _discard(self, waiter: "asyncio.Future[None]") -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    @property
+    def stats(self) -> LimiterStats:
+        return LimiterStats(
+            limit=self.limit.current,
+            in_flight=self._in_flight,
+            queued=len(self._waiters),
+            admitted=self._admitted,
+            rejected=self._rejected,
+            timed_out=self._timed_out,
+            increases=self.limit.increases,
+            decreases=self.limit.decreases,
+        )
+
+
+def create_limiters() -> Dict[str, ConcurrencyLimiter]:
+    return {
+        name: ConcurrencyLimiter(
+            AIMDLimit(
+                initial=settings.CONCURRENCY_LIMIT_INITIAL,
+                min_limit=settings.CONCURRENCY_LIMIT_MIN,
+                max_limit=settings.CONCURRENCY_LIMIT_MAX,
+                latency_target=settings.CONCURRENCY_LATENCY_TARGETS[name],
+                pool_wait_target=settings.CONCURRENCY_POOL_WAIT_TARGET_SECONDS,
+                backoff=settings.CONCURRENCY_LIMIT_BACKOFF,
+            ),
+            max_queue=settings.CONCURRENCY_QUEUE_SIZE,
+            queue_timeout=settings.CONCURRENCY_QUEUE_TIMEOUT_SECONDS,
+        )
+        for name in ROUTE_CLASSES
+    }
+
+
+concurrency_limiters: Optional[Dict[str, ConcurrencyLimiter]] = (
+    create_limiters() if settings.CONCURRENCY_LIMIT_ENABLED else None
+)
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl, PostgresDsn, field_validator
-from typing import List, Optional, Any
+from typing import Dict, List, Literal, Optional, Any
 
 
 class Settings(BaseSettings):
@@ -17,6 +17,22 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: Optional[str] = None
     POSTGRES_DB: Optional[str] = None
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Seconds after which a connection is replaced; -1 keeps them forever.
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_USE_LIFO: bool = False
+
+    # JSON list of replica DSNs for read-only endpoints; writes use the primary.
+    SQLALCHEMY_REPLICA_URIS: List[str] = []
+    DB_REPLICA_BALANCING: Literal["round_robin", "least_busy"] = "round_robin"
+
+    # Serve the users API through AsyncSession instead of the sync engine.
+    USE_ASYNC_DB: bool = False
+    # Defaults to SQLALCHEMY_DATABASE_URI with the asyncpg driver.
+    ASYNC_SQLALCHEMY_DATABASE_URI: Optional[str] = None
 
     TEST_POSTGRES_SERVER: Optional[str] = None
     TEST_POSTGRES_USER: Optional[str] = None
@@ -27,6 +43,114 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER: Optional[str] = None
     FIRST_SUPERUSER_PASSWORD: Optional[str] = None
 
+    # New hashes use this scheme; hashes from the other supported scheme or with
+    # different rounds still verify and are replaced at the user's next login.
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "pbkdf2_sha256"] = "bcrypt"
+    # Cost parameter of the scheme (passlib's default if unset); run
+    # `python -m app.core.calibrate_hashing` to pick one for this host.
+    PASSWORD_HASH_ROUNDS: Optional[int] = None
+    PASSWORD_HASH_BUDGET_MS: float = 250.0
+    # Size of the password hashing process pool; None means one per CPU.
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    # Hashing jobs allowed in flight before new ones are rejected with 503; bulk
+    # creates wait for free slots instead.
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    BULK_CREATE_MAX_USERS: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    # Concurrent reads of the same users within a process share one query.
+    USER_READ_COALESCING_ENABLED: bool = True
+    # Most ids, and most emails, accepted by one `POST /users/lookup`.
+    USER_LOOKUP_MAX_KEYS: int = 1000
+
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
+    # Upper bound for tokens without `exp`, or with a far-away one.
+    TOKEN_CACHE_MAX_TTL_SECONDS: float = 300.0
+
+    # How list totals are counted: in-process counters kept by CRUD writes,
+    # Postgres planner estimates, or COUNT(*) on every request.
+    USER_COUNT_MODE: Literal["counter", "approximate", "exact"] = "counter"
+    # Counters are recomputed from the database at least this often.
+    USER_COUNT_RECONCILE_SECONDS: float = 300.0
+
+    # Authorize requests from the `is_active`/`is_superuser` claims of the token
+    # instead of loading the user. Changes to users revoke their older tokens in
+    # process memory only, so other workers keep trusting them until expiry.
+    AUTH_CLAIMS_ONLY: bool = False
+    # Revoked users tracked before expired entries are pruned.
+    AUTH_REVOCATION_CAPACITY: int = 100_000
+
+    # Login attempts allowed per window, per client IP and per email, before
+    # further attempts get 429 without any password hashing.
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_IP_ATTEMPTS: int = 20
+    LOGIN_RATE_LIMIT_EMAIL_ATTEMPTS: int = 5
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: float = 60.0
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # Write-behind audit trail of user changes, inserted into `audit_event` in
+    # batches of up to AUDIT_LOG_BATCH_SIZE at least every flush interval.
+    AUDIT_LOG_ENABLED: bool = True
+    AUDIT_LOG_MAX_PENDING: int = 10_000
+    AUDIT_LOG_BATCH_SIZE: int = 500
+    AUDIT_LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # How long a write waits for room in a full queue before its event is
+    # dropped.
+    AUDIT_LOG_ENQUEUE_TIMEOUT_SECONDS: float = 0.05
+
+    # Batched `last_seen_at`/`last_login_at` tracking: touches are coalesced in
+    # memory and written every flush interval, and a user's `last_seen_at` is
+    # rewritten at most once per staleness period.
+    ACTIVITY_TRACKING_ENABLED: bool = True
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: float = 30.0
+    ACTIVITY_STALENESS_SECONDS: float = 300.0
+    ACTIVITY_MAX_USERS: int = 100_000
+
+    # Adaptive concurrency limits per route class (auth, hashing, read, write).
+    # Requests beyond a class's limit queue for up to the queue timeout and get
+    # 503 with Retry-After after that, or right away if the queue is full. Each
+    # limit shrinks when requests of its class exceed their latency target or
+    # wait too long for a DB connection, and grows again while they don't.
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_LIMIT_INITIAL: int = 10
+    CONCURRENCY_LIMIT_MIN: int = 2
+    CONCURRENCY_LIMIT_MAX: int = 100
+    CONCURRENCY_LIMIT_BACKOFF: float = 0.9
+    CONCURRENCY_QUEUE_SIZE: int = 50
+    CONCURRENCY_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    CONCURRENCY_LATENCY_TARGETS: Dict[str, float] = {
+        "auth": 1.0,
+        "hashing": 2.0,
+        "read": 0.25,
+        "write": 0.5,
+    }
+    CONCURRENCY_POOL_WAIT_TARGET_SECONDS: float = 0.05
+    # Threads running sync endpoints; defaults to DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # so requests wait for a thread rather than holding one while they wait for
+    # a connection.
+    THREADPOOL_SIZE: Optional[int] = None
+
+    # Opt-in request profiling. Profiled requests have their threads' stacks
+    # sampled every interval and saved as collapsed stacks (for flamegraph.pl
+    # or speedscope) to PROFILING_DIR, whose oldest profiles are deleted beyond
+    # PROFILING_MAX_BYTES. Requests are profiled when they send
+    # `X-Profile: <PROFILING_SECRET>`, and at random at PROFILING_SAMPLE_RATE.
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_BYTES: int = 50 * 1024 * 1024
+    PROFILING_MAX_CONCURRENT: int = 1
+
+    # Per-route latency and SQL metrics, Server-Timing headers and /metrics.
+    METRICS_ENABLED: bool = True
+
     @field_validator("BACKEND_CORS_ORIGINS", mode="before")
     @classmethod
     def assemble_cors_origins(cls, v: str | List[str]) -> List[str] | str:
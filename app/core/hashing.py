@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from app.core import security
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class HashingUnavailableError(Exception):
+    """Raised when the hashing pool already has too much work queued."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a process pool so the CPU cost of
+    bcrypt never lands on the threads that serve requests.
+
+    At most `max_pending` jobs may be queued or running at once; single jobs
+    beyond that fail fast with `HashingUnavailableError` instead of waiting.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 32):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._waiters: List["asyncio.Future[None]"] = []
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingUnavailableError("Password hashing pool is saturated")
+            self._pending += 1
+
+    async def _acquire_waiting(self) -> None:
+        while True:
+            with self._lock:
+                if self._pending < self.max_pending:
+                    self._pending += 1
+                    return
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+            await waiter
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._release()
+
+    async def hash_password(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def hash_passwords(self, passwords: Sequence[str]) -> List[str]:
+        """
+        Hash a batch in parallel across the pool. Each password takes one of the
+        `max_pending` slots while it is queued or running; when none is free the
+        batch waits for one rather than failing, so batches of any size finish.
+        """
+        if self.max_pending < 1:
+            raise HashingUnavailableError("Password hashing pool is saturated")
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        jobs: List["asyncio.Future[str]"] = []
+        for password in passwords:
+            await self._acquire_waiting()
+            job = loop.run_in_executor(executor, security.get_password_hash, password)
+            job.add_done_callback(lambda _: self._release())
+            jobs.append(job)
+        return list(await asyncio.gather(*jobs))
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            security.verify_password, plain_password, hashed_password
+        )
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await self._run(
+            security.verify_and_update, plain_password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,163 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Engine, event
+
+# Upper bounds (seconds) of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@dataclass
+class RequestMetrics:
+    """SQL work done on behalf of the current request."""
+
+    statements: int = 0
+    db_time: float = 0.0
+    # Time spent waiting for connections from instrumented pools.
+    pool_wait: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    def server_timing(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.statements} queries", '
+            f"total;dur={elapsed * 1000:.2f}"
+        )
+
+
+# Set by the metrics middleware; the values are shared with the threads that
+# run sync endpoints because they execute in a copy of the request context.
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar(
+    "current_request", default=None
+)
+
+
+class _RouteStats:
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.statements = 0
+        self.db_time = 0.0
+        self.statuses: Dict[int, int] = {}
+
+
+class MetricsRegistry:
+    """
+    Per-route aggregates of finished requests. Requests accumulate into their
+    own `RequestMetrics` and take the lock once, when they complete.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+
+    def observe(
+        self, method: str, route: str, status: int, request: RequestMetrics
+    ) -> None:
+        elapsed = time.perf_counter() - request.started
+        index = bisect_left(LATENCY_BUCKETS, elapsed)
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _RouteStats()
+            stats.buckets[index] += 1
+            stats.latency_sum += elapsed
+            stats.statements += request.statements
+            stats.db_time += request.db_time
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition of everything observed so far."""
+        requests: List[str] = []
+        latency: List[str] = []
+        statements: List[str] = []
+        db_time: List[str] = []
+        with self._lock:
+            for (method, route), stats in sorted(self._routes.items()):
+                labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+                for status, count in sorted(stats.statuses.items()):
+                    requests.append(
+                        f'http_requests_total{{{labels},status="{status}"}} {count}'
+                    )
+                cumulative = 0
+                bounds = [repr(b) for b in LATENCY_BUCKETS] + ["+Inf"]
+                for bound, count in zip(bounds, stats.buckets):
+                    cumulative += count
+                    latency.append(
+                        f"http_request_duration_seconds_bucket"
+                        f'{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                latency.append(
+                    f"http_request_duration_seconds_sum{{{labels}}} "
+                    f"{stats.latency_sum!r}"
+                )
+                latency.append(
+                    f"http_request_duration_seconds_count{{{labels}}} {cumulative}"
+                )
+                statements.append(
+                    f"http_request_db_statements_total{{{labels}}} {stats.statements}"
+                )
+                db_time.append(
+                    f"http_request_db_seconds_total{{{labels}}} {stats.db_time!r}"
+                )
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status.",
+            "# TYPE http_requests_total counter",
+            *requests,
+            "# HELP http_request_duration_seconds Request latency, by route.",
+            "# TYPE http_request_duration_seconds histogram",
+            *latency,
+            "# HELP http_request_db_statements_total SQL statements, by route.",
+            "# TYPE http_request_db_statements_total counter",
+            *statements,
+            "# HELP http_request_db_seconds_total Time spent in SQL, by route.",
+            "# TYPE http_request_db_seconds_total counter",
+            *db_time,
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _before_cursor_execute(conn: Any, *args: Any) -> None:
+    if current_request.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, *args: Any) -> None:
+    request = current_request.get()
+    started = conn.info.get("query_start_time")
+    if request is None or not started:
+        return
+    request.statements += 1
+    request.db_time += time.perf_counter() - started.pop()
+
+
+def _handle_error(context: Any) -> None:
+    # `after_cursor_execute` doesn't fire for failed statements.
+    connection = context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attribute the statements executed on `engine` to the current request."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,118 @@
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import List, Optional, Tuple
+
+# Threads anyio runs sync endpoints and dependencies in.
+WORKER_THREAD_NAME = "AnyIO worker thread"
+PROFILE_SUFFIX = ".collapsed"
+# A thread whose innermost frames are waits in these modules, called from one
+# of the loops below, has nothing to do and is left out of the samples.
+WAIT_MODULES = frozenset({"threading", "queue", "selectors"})
+IDLE_LOOPS = frozenset(
+    {
+        ("anyio._backends._asyncio", "WorkerThread.run"),
+        ("asyncio.base_events", "BaseEventLoop._run_once"),
+    }
+)
+
+
+def _location(frame: FrameType) -> Tuple[str, str]:
+    return frame.f_globals.get("__name__", "?"), frame.f_code.co_qualname
+
+
+def _stack(frame: Optional[FrameType]) -> List[str]:
+    """`module:function` of each frame from the outermost, or [] when idle."""
+    frames: List[FrameType] = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    busy = next((f for f in frames if _location(f)[0] not in WAIT_MODULES), None)
+    if busy is None or _location(busy) in IDLE_LOOPS:
+        return []
+    return [":".join(_location(f)) for f in reversed(frames)]
+
+
+class StackSampler:
+    """
+    Statistical profiler. While running, a background thread records the
+    stacks of the event loop thread and of the worker threads every `interval`
+    seconds, counting identical stacks in collapsed form
+    (`thread;outer;...;inner`). Other requests running at the same time are
+    sampled too, so profile a quiet instance where possible.
+    """
+
+    def __init__(self, interval: float, loop_thread: int):
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.samples: Counter[str] = Counter()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+        for thread in threading.enumerate():
+            if thread.ident == self.loop_thread:
+                label = "event-loop"
+            elif thread.name == WORKER_THREAD_NAME:
+                label = "worker"
+            else:
+                continue
+            stack = _stack(frames.get(thread.ident or 0))
+            if stack:
+                self.samples[";".join([label, *stack])] += 1
+
+
+class ProfileStore:
+    """
+    Directory of collapsed-stack profiles, readable by flamegraph.pl or
+    speedscope. After each write the oldest profiles are deleted until the
+    directory holds at most `max_bytes` of them.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def save(self, name: str, samples: Counter[str]) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}{PROFILE_SUFFIX}"
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+        )
+        self._rotate()
+        return path
+
+    def _rotate(self) -> None:
+        profiles = []
+        for path in self.directory.glob(f"*{PROFILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            profiles.append((stat.st_mtime, path.name, stat.st_size, path))
+        profiles.sort()
+        total = sum(size for _, _, size, _ in profiles)
+        for _, _, size, path in profiles:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
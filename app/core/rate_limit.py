@@ -0,0 +1,122 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller is over its limit; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Limit:
+    """`attempts` allowed per `window` seconds, refilled continuously."""
+
+    attempts: int
+    window: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.attempts / self.window
+
+
+class RateLimitStore(ABC):
+    """
+    Token buckets keyed by caller. `take` must check and update a bucket
+    atomically so a shared backend can serve several processes.
+    """
+
+    @abstractmethod
+    def take(self, key: str, limit: Limit) -> float:
+        """
+        Take one token from the bucket under `key`. Return 0 if one was
+        available, otherwise the seconds until the next one.
+        """
+
+    @abstractmethod
+    def reset(self, key: str) -> None:
+        """Refill the bucket under `key`."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every bucket."""
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    In-process buckets bounded to `max_keys`. The least recently used bucket is
+    evicted when full; keys under active attack are always recently used.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.evictions = 0
+        # key -> (tokens left, monotonic time they were counted)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(limit.attempts), now))
+            tokens = min(
+                float(limit.attempts), tokens + (now - updated) * limit.refill_rate
+            )
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / limit.refill_rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return retry_after
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginRateLimiter:
+    """
+    Throttles login attempts per client IP and per email, so a credential
+    stuffing burst is turned away before any password hashing happens.
+    """
+
+    def __init__(self, store: RateLimitStore, *, per_ip: Limit, per_email: Limit):
+        self.store = store
+        self.per_ip = per_ip
+        self.per_email = per_email
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"login:email:{email.strip().lower()}"
+
+    def check(self, *, email: str, ip: Optional[str]) -> None:
+        """Count an attempt, raising `RateLimitExceeded` if it is over a limit."""
+        if ip is not None:
+            retry_after = self.store.take(f"login:ip:{ip}", self.per_ip)
+            if retry_after:
+                raise RateLimitExceeded(retry_after)
+        retry_after = self.store.take(self._email_key(email), self.per_email)
+        if retry_after:
+            raise RateLimitExceeded(retry_after)
+
+    def succeeded(self, *, email: str) -> None:
+        """Forget the attempts against `email` once its owner has logged in."""
+        self.store.reset(self._email_key(email))
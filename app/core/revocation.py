@@ -0,0 +1,103 @@
+import hashlib
+import math
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership test with no false negatives and a false
+    positive rate of about `error_rate` once `capacity` keys were added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class TokenRevocationSet:
+    """
+    Users whose tokens issued before a given version can no longer be trusted
+    on their claims alone, because their flags or password changed or they were
+    deleted. A Bloom filter answers the common "never revoked" case without
+    taking the lock; the exact map settles its false positives.
+
+    Entries are dropped once every token they could apply to has expired
+    (`max_token_age` seconds). Tokens issued before this set was created are
+    never trusted, since revocations made by an earlier process are unknown.
+    State is per process.
+    """
+
+    def __init__(self, *, max_token_age: float, capacity: int):
+        self.max_token_age = max_token_age
+        self.since = time.time()
+        self._capacity = capacity
+        self._bloom = BloomFilter(capacity)
+        # user id -> (first trusted token version, time of revocation)
+        self._revoked: Dict[int, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, user_id: int, version: int) -> None:
+        """Distrust the user's tokens carrying a version below `version`."""
+        now = time.time()
+        with self._lock:
+            previous = self._revoked.get(user_id)
+            if previous is not None:
+                version = max(version, previous[0])
+            self._revoked[user_id] = (version, now)
+            self._bloom.add(str(user_id))
+            if len(self._revoked) > self._capacity:
+                self._prune(now)
+
+    def is_revoked(
+        self, user_id: int, token_version: int, issued_at: Optional[float]
+    ) -> bool:
+        # `iat` has whole seconds.
+        if issued_at is None or issued_at < math.floor(self.since):
+            return True
+        if str(user_id) not in self._bloom:
+            return False
+        with self._lock:
+            entry = self._revoked.get(user_id)
+        return entry is not None and token_version < entry[0]
+
+    def _prune(self, now: float) -> None:
+        # Callers hold the lock. Bloom filters can't forget keys, so the filter
+        # is rebuilt, and grown if pruning didn't free enough room.
+        self._revoked = {
+            user_id: entry
+            for user_id, entry in self._revoked.items()
+            if now - entry[1] < self.max_token_age
+        }
+        while len(self._revoked) > self._capacity // 2:
+            self._capacity *= 2
+        bloom = BloomFilter(self._capacity)
+        for user_id in self._revoked:
+            bloom.add(str(user_id))
+        # Readers check the filter without the lock, so swap in a complete one.
+        self._bloom = bloom
+
+    def __len__(self) -> int:
+        return len(self._revoked)
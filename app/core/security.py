@@ -1,6 +1,29 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from jose import jwt
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.config import settings
+
+PASSWORD_SCHEMES = ("bcrypt", "pbkdf2_sha256")
+
+
+def build_pwd_context(scheme: str, rounds: Optional[int] = None) -> CryptContext:
+    """
+    Context hashing with `scheme`. The other supported schemes are deprecated,
+    so `verify_and_update` migrates their hashes, and so are hashes whose rounds
+    differ from `rounds`.
+    """
+    options: Dict[str, Any] = {f"{scheme}__rounds": rounds} if rounds else {}
+    schemes = [scheme] + [other for other in PASSWORD_SCHEMES if other != scheme]
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+pwd_context = build_pwd_context(
+    settings.PASSWORD_HASH_SCHEME, settings.PASSWORD_HASH_ROUNDS
+)
 
 ALGORITHM = "HS256"
 
@@ -9,5 +32,41 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if its hash uses outdated settings, return a new hash
+    to store. Unrecognised hashes never verify.
+    """
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except ValueError:
+        return False, None
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+@lru_cache(maxsize=1)
+def dummy_password_hash() -> str:
+    """Hash checked for unknown emails so their logins cost as much as real ones."""
+    return get_password_hash("dummy-password-for-timing")
+
+
+def create_access_token(
+    subject: Any,
+    expires_delta: Optional[timedelta] = None,
+    claims: Optional[Dict[str, Any]] = None,
+) -> str:
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    now = datetime.now(timezone.utc)
+    to_encode = {
+        **(claims or {}),
+        "exp": now + expires_delta,
+        "iat": now,
+        "sub": str(subject),
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
@@ -0,0 +1,79 @@
+import threading
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Call(Generic[K, V]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Mapping[K, V] = {}
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Coalesces concurrent loads of the same keys across threads: while a load
+    for a key is in flight, other callers wanting that key wait for it and get
+    its result instead of loading the key again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[K, _Call[K, V]] = {}
+
+    def do_many(
+        self, keys: Iterable[K], load: Callable[[List[K]], Mapping[K, V]]
+    ) -> Dict[K, V]:
+        """
+        Values for `keys`. Keys nobody is loading are passed to one `load` call,
+        which returns the values it found; the others are awaited. Keys no load
+        found are left out, and errors of a shared load reach every waiter.
+        """
+        call: _Call[K, V] = _Call()
+        owned: List[K] = []
+        waiting: Dict[K, _Call[K, V]] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                in_flight = self._calls.get(key)
+                if in_flight is None:
+                    self._calls[key] = call
+                    owned.append(key)
+                else:
+                    waiting[key] = in_flight
+        results: Dict[K, V] = {}
+        if owned:
+            try:
+                call.result = load(owned)
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in owned:
+                        del self._calls[key]
+                call.done.set()
+            results.update(call.result)
+        for key, in_flight in waiting.items():
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            if key in in_flight.result:
+                results[key] = in_flight.result[key]
+        return results
+
+    def in_flight(self) -> int:
+        """Number of keys currently being loaded."""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,61 @@
+import hashlib
+import threading
+import time
+from typing import Any, Mapping, Optional
+
+from app.core.cache import CacheStats, LRUTTLCache
+from app.schemas.token import TokenPayload
+
+
+class TokenClaimsCache:
+    """
+    Claims of already verified bearer tokens, keyed by a SHA-256 digest of the
+    token so raw tokens are never kept in memory. An entry lives until the
+    token's `exp` (capped at `max_ttl`), and everything is dropped as soon as
+    the signing key changes.
+    """
+
+    def __init__(self, max_size: int, max_ttl: float):
+        self.max_ttl = max_ttl
+        self._cache = LRUTTLCache(max_size=max_size)
+        self._key_fingerprint: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _check_key(self, secret_key: str) -> None:
+        fingerprint = hashlib.sha256(secret_key.encode()).digest()
+        if fingerprint != self._key_fingerprint:
+            with self._lock:
+                if fingerprint != self._key_fingerprint:
+                    self._cache.clear()
+                    self._key_fingerprint = fingerprint
+
+    def get(self, token: str, secret_key: str) -> Optional[TokenPayload]:
+        self._check_key(secret_key)
+        payload: Optional[TokenPayload] = self._cache.get(self._digest(token))
+        return payload
+
+    def set(
+        self,
+        token: str,
+        secret_key: str,
+        payload: TokenPayload,
+        claims: Mapping[str, Any],
+    ) -> None:
+        self._check_key(secret_key)
+        ttl = self.max_ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            self._cache.set(self._digest(token), payload, ttl=ttl)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
@@ -1,3 +1,4 @@
 from .user import user
+from .user_async import user_async
 
-__all__ = ["user"]
+__all__ = ["user", "user_async"]
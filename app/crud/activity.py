@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ActivityStats:
+    touches: int = 0
+    # Touches that needed no write because the user was seen recently enough.
+    skipped: int = 0
+    # Touches lost because too many users were pending.
+    dropped: int = 0
+    # Touches lost because their UPDATE failed.
+    failed: int = 0
+    flushed: int = 0
+    updates: int = 0
+    pending: int = 0
+
+
+class ActivityTracker:
+    """
+    Keeps `User.last_seen_at` and `User.last_login_at` up to date without a
+    write per request. Touches are coalesced per user in memory and written
+    every `flush_interval` seconds with one UPDATE per `batch_size` users.
+
+    A user seen again within `staleness` seconds of their last write is not
+    written again, so `last_seen_at` may lag by up to `staleness` plus
+    `flush_interval`; logins are always written. Pending touches are lost if
+    the process dies. The columns are written directly, so they don't bump the
+    user's version or invalidate cached copies.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        flush_interval: float,
+        staleness: float,
+        max_users: int,
+        batch_size: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.staleness = staleness
+        self.max_users = max_users
+        self.batch_size = batch_size
+        self.clock = clock
+        # user id -> (last seen, last login or None)
+        self._pending: Dict[int, Tuple[float, Optional[float]]] = {}
+        # user id -> last seen time written, least recently written first
+        self._written: "OrderedDict[int, float]" = OrderedDict()
+        self._stats = ActivityStats()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self, user_id: int, *, login: bool = False) -> None:
+        """Note that the user made a request, or logged in, just now."""
+        now = self.clock()
+        with self._lock:
+            self._stats.touches += 1
+            pending = self._pending.get(user_id)
+            if pending is None:
+                written = self._written.get(user_id)
+                if not login and written is not None and now - written < self.staleness:
+                    self._stats.skipped += 1
+                    return
+                if len(self._pending) >= self.max_users:
+                    self._stats.dropped += 1
+                    self._wakeup.set()
+                    return
+                self._pending[user_id] = (now, now if login else None)
+            else:
+                self._pending[user_id] = (now, now if login else pending[1])
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="activity-tracker", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the flushing thread after a last flush."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            if self._stopping:
+                return
+
+    def flush(self) -> int:
+        """Write every pending touch now; returns how many users were updated."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            items = list(pending.items())
+            written = 0
+            for start in range(0, len(items), self.batch_size):
+                written += self._write(items[start : start + self.batch_size])
+            return written
+
+    def _write(self, batch: List[Tuple[int, Tuple[float, Optional[float]]]]) -> int:
+        seen = {user_id: _utc(at) for user_id, (at, _) in batch}
+        logins = {
+            user_id: _utc(login) for user_id, (_, login) in batch if login is not None
+        }
+        values = {User.last_seen_at: case(seen, value=User.id)}
+        if logins:
+            values[User.last_login_at] = case(
+                logins, value=User.id, else_=User.last_login_at
+            )
+        stmt = (
+            update(User)
+            .where(User.id.in_(seen))
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            with self.session_factory() as db:
+                db.execute(stmt)
+                db.commit()
+        except Exception:
+            logger.exception("Failed to write activity of %d users", len(batch))
+            with self._lock:
+                self._stats.failed += len(batch)
+            return 0
+        with self._lock:
+            for user_id, (at, _) in batch:
+                self._written[user_id] = at
+                self._written.move_to_end(user_id)
+            while len(self._written) > self.max_users:
+                self._written.popitem(last=False)
+            self._stats.flushed += len(batch)
+            self._stats.updates += 1
+        return len(batch)
+
+    @property
+    def stats(self) -> ActivityStats:
+        with self._lock:
+            return ActivityStats(**{**vars(self._stats), "pending": len(self._pending)})
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
@@ -0,0 +1,189 @@
+import logging
+import queue
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from pydantic_core import to_jsonable_python
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.db_utils import DatabaseConnectionPool
+from app.models.audit import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+# Values of these fields never reach the audit trail, only the fact they changed.
+REDACTED_FIELDS = frozenset({"password"})
+REDACTED = "<redacted>"
+
+# Id of the authenticated user on whose behalf the current request writes.
+audit_actor: ContextVar[Optional[int]] = ContextVar("audit_actor", default=None)
+
+
+@dataclass
+class AuditStats:
+    enqueued: int = 0
+    flushed: int = 0
+    batches: int = 0
+    # Events given up on because the queue stayed full.
+    dropped: int = 0
+    # Events lost because their batch insert failed.
+    failed: int = 0
+    pending: int = 0
+
+
+class AuditLog:
+    """
+    Write-behind audit trail. CRUD writes `record` events into a bounded
+    in-memory queue, and a background thread inserts them into `audit_event`
+    in multi-row batches, so auditing adds no round trip to the write itself.
+
+    When the queue is full, writers wait up to `enqueue_timeout` seconds for
+    room and the event is dropped after that. `stop` flushes whatever is still
+    queued. Events still queued when the process dies are lost.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        max_pending: int,
+        batch_size: int,
+        flush_interval: float,
+        enqueue_timeout: float,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_pending)
+        self._stats = AuditStats()
+        self._stats_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def record(
+        self,
+        action: str,
+        entity: str,
+        entity_id: Any,
+        changes: Optional[Mapping[str, Mapping[str, Any]]] = None,
+        *,
+        block: bool = True,
+    ) -> bool:
+        """
+        Queue an event; False if it had to be dropped. Pass `block=False` on an
+        event loop, where waiting for room would stall every request.
+        """
+        event = {
+            "occurred_at": datetime.now(timezone.utc),
+            "actor_id": audit_actor.get(),
+            "action": action,
+            "entity": entity,
+            "entity_id": entity_id,
+            "changes": {
+                field: (
+                    {key: REDACTED for key in change}
+                    if field in REDACTED_FIELDS
+                    else to_jsonable_python(change)
+                )
+                for field, change in (changes or {}).items()
+            },
+        }
+        # Without the writer thread nothing would make room, so don't wait.
+        block = block and self._thread is not None
+        try:
+            self._queue.put(event, block=block, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats.dropped += 1
+            return False
+        with self._stats_lock:
+            self._stats.enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="audit-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the writer thread once it has flushed every queued event."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            if self._stopping:
+                return
+
+    def flush(self) -> int:
+        """Insert every queued event now; returns how many were written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take(self.batch_size)
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        try:
+            with self.session_factory() as db:
+                db.execute(insert(AuditEvent).values(batch))
+                db.commit()
+        except Exception:
+            logger.exception("Failed to write %d audit events", len(batch))
+            with self._stats_lock:
+                self._stats.failed += len(batch)
+            return 0
+        with self._stats_lock:
+            self._stats.flushed += len(batch)
+            self._stats.batches += 1
+        return len(batch)
+
+    @property
+    def stats(self) -> AuditStats:
+        with self._stats_lock:
+            return AuditStats(**{**vars(self._stats), "pending": self._queue.qsize()})
+
+
+audit_log = (
+    AuditLog(
+        lambda: DatabaseConnectionPool().get_session(),
+        max_pending=settings.AUDIT_LOG_MAX_PENDING,
+        batch_size=settings.AUDIT_LOG_BATCH_SIZE,
+        flush_interval=settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS,
+        enqueue_timeout=settings.AUDIT_LOG_ENQUEUE_TIMEOUT_SECONDS,
+    )
+    if settings.AUDIT_LOG_ENABLED
+    else None
+)
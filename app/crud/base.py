@@ -1,62 +1,567 @@
-from typing import Any, Generic, Optional, Type, TypeVar, Sequence
+import json
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Sequence,
+    Union,
+)
 from pydantic import BaseModel
+from sqlalchemy import (
+    Dialect,
+    Row,
+    Select,
+    UniqueConstraint,
+    Update,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.orm.exc import StaleDataError
 
+from app.core.singleflight import SingleFlight
+from app.crud.audit import AuditLog
+from app.crud.cache import ModelCache, attach_snapshot, column_keys
+from app.crud.counter import RowCounter
+from app.crud.pagination import Cursor, filter_clauses, page_query
 from app.db.base_class import Base
+from app.db.routing import routed_to_replica
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+# (engine, field, value) of a row fetched through a `SingleFlight`.
+RowKey = Tuple[Any, str, Any]
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: Optional[ModelCache[ModelType]] = None,
+        counter: Optional[RowCounter[ModelType]] = None,
+        singleflight: Optional[SingleFlight[RowKey, Dict[str, Any]]] = None,
+        audit: Optional[AuditLog] = None,
+    ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
         **Parameters**
         * `model`: A SQLAlchemy model class
-        * `schema`: A Pydantic model (schema) class
+        * `cache`: Optional read-through cache for `get` and `get_by_field`
+          on the cache's key fields, filled by reads from the primary only;
+          `update` and `remove` invalidate it
+        * `counter`: Optional row counts served to `count`; writes keep it
+          up to date
+        * `singleflight`: Optional coalescing of concurrent `get`,
+          `get_by_field` and `get_many*` queries for the same rows
+        * `audit`: Optional audit trail that committed writes are recorded to
         """
         self.model = model
+        self.cache = cache
+        self.counter = counter
+        self.singleflight = singleflight
+        self.audit = audit
+        self._columns = column_keys(model)
+        self.version_field = version_field(model)
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+        return self.get_by_field(db, "id", id)
 
     def get_by_field(self, db: Session, field: str, value: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(getattr(self.model, field) == value).first()
+        return self.get_many_by_field(db, field=field, values=[value]).get(value)
+
+    def get_many(self, db: Session, *, ids: Iterable[Any]) -> Dict[Any, ModelType]:
+        return self.get_many_by_field(db, field="id", values=ids)
+
+    def get_many_by_field(
+        self, db: Session, *, field: str, values: Iterable[Any]
+    ) -> Dict[Any, ModelType]:
+        """
+        Rows whose unique `field` is one of `values`, keyed by that value in the
+        order of `values`; values without a row are left out. Cached rows cost
+        nothing and the rest are read with a single query.
+        """
+        wanted = list(dict.fromkeys(values))
+        cache = self.cache
+        if cache is not None and field != "id" and field not in cache.fields:
+            cache = None
+        found: Dict[Any, ModelType] = {}
+        if cache is not None:
+            for value in wanted:
+                cached = cache.get(db, field, value)
+                if cached is not None:
+                    found[value] = cached
+        missing = [value for value in wanted if value not in found]
+        if missing:
+            # A replica may still have rows that a write on the primary just
+            # invalidated; caching them would serve them for the whole TTL.
+            if cache is not None and routed_to_replica(db, select(self.model)):
+                cache = None
+            for value, snapshot in self._fetch(db, field, missing).items():
+                found[value] = attach_snapshot(db, self.model, snapshot)
+                if cache is not None:
+                    cache.set(found[value])
+        return {value: found[value] for value in wanted if value in found}
+
+    def _fetch(
+        self, db: Session, field: str, values: List[Any]
+    ) -> Dict[Any, Dict[str, Any]]:
+        # Column snapshots rather than objects, so that threads whose queries
+        # were coalesced each attach the rows to their own session.
+        column = getattr(self.model, field)
+        query = select(*(getattr(self.model, key).label(key) for key in self._columns))
+        # The engine this SELECT runs on, a replica for read-only sessions, so
+        # rows are only shared between sessions that read from the same one.
+        bind = db.get_bind(clause=query)
+
+        def load(keys: List[RowKey]) -> Dict[RowKey, Dict[str, Any]]:
+            wanted = [value for _, _, value in keys]
+            if len(wanted) == 1:
+                clause = column == wanted[0]
+            else:
+                clause = column.in_(wanted)
+            rows = db.execute(query.where(clause)).mappings()
+            return {(bind, field, row[field]): dict(row) for row in rows}
+
+        keys: List[RowKey] = [(bind, field, value) for value in values]
+        if self.singleflight is None:
+            loaded = load(keys)
+        else:
+            loaded = self.singleflight.do_many(keys, load)
+        return {key[2]: loaded[key] for key in keys if key in loaded}
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str = "id",
+        after: Optional[Cursor] = None,
+        filters: Optional[Mapping[str, Any]] = None,
     ) -> Sequence[ModelType]:
-        return db.execute(select(self.model).offset(skip).limit(limit)).scalars().all()
+        query = page_query(
+            self.model,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            after=after,
+            filters=filters,
+        )
+        return db.execute(query).scalars().all()
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        create_data = obj_in.model_dump()
-        db_obj = self.model(**create_data)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+    def get_columns_by_field(
+        self, db: Session, *, field: str, value: Any, columns: Sequence[str]
+    ) -> Optional[Any]:
+        """
+        The row where `field` equals `value`, with only `columns` loaded. A
+        cached object is returned as is since it costs no query at all.
+        """
+        cache = self.cache
+        if cache is not None and field != "id" and field not in cache.fields:
+            cache = None
+        if cache is not None:
+            cached = cache.get(db, field, value)
+            if cached is not None:
+                return cached
+        query = select(*(getattr(self.model, column) for column in columns)).where(
+            getattr(self.model, field) == value
+        )
+        return db.execute(query).first()
+
+    def get_multi_columns(
+        self,
+        db: Session,
+        *,
+        columns: Sequence[str],
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str = "id",
+        after: Optional[Cursor] = None,
+        filters: Optional[Mapping[str, Any]] = None,
+    ) -> Sequence[Row[Any]]:
+        """Like `get_multi`, but selects only `columns` and returns rows."""
+        query = page_query(
+            self.model,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            after=after,
+            filters=filters,
+            columns=columns,
+        )
+        return db.execute(query).all()
+
+    def count(
+        self,
+        db: Session,
+        *,
+        filters: Optional[Mapping[str, Any]] = None,
+        approximate: bool = False,
+    ) -> int:
+        """
+        Number of rows matching `filters`. Served by the counter when it covers
+        the filters; with `approximate`, Postgres planner estimates are used
+        instead. Otherwise falls back to COUNT(*).
+        """
+        if approximate:
+            estimate = self.estimate_count(db, filters=filters)
+            if estimate is not None:
+                return estimate
+        if self.counter is not None and self.counter.covers(filters):
+            return self.counter.count(db, filters)
+        query = (
+            select(func.count())
+            .select_from(self.model)
+            .where(*filter_clauses(self.model, filters))
+        )
+        return db.scalar(query) or 0
+
+    def estimate_count(
+        self, db: Session, *, filters: Optional[Mapping[str, Any]] = None
+    ) -> Optional[int]:
+        return estimate_count(db, self.model, filters)
+
+    def stream(
+        self,
+        db: Session,
+        *,
+        columns: Sequence[str],
+        filters: Optional[Mapping[str, Any]] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Sequence[Row[Any]]]:
+        """
+        Yield `columns` of every matching row, ordered by id, in batches of
+        `batch_size`. Rows come from a server-side cursor and are never turned
+        into ORM objects, so memory use does not grow with the table.
+        """
+        query = (
+            select(*(getattr(self.model, column) for column in columns))
+            .where(*filter_clauses(self.model, filters))
+            .order_by(self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from db.execute(query).partitions()
+
+    def create(
+        self, db: Session, *, obj_in: Union[CreateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        """
+        Insert one row with a single INSERT ... RETURNING. Unique constraint
+        violations roll back and propagate as `IntegrityError`.
+        """
+        create_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump()
+        stmt = insert(self.model).values(**create_data).returning(self.model)
+        try:
+            db_obj = db.scalars(stmt).one()
+        except IntegrityError:
+            db.rollback()
+            raise
+        self._commit_detached(db, [db_obj])
+        if self.counter is not None:
+            self.counter.added([db_obj])
+        self._audit("create", db_obj.id, new=create_data)
         return db_obj
 
+    def create_multi(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+    ) -> Sequence[ModelType]:
+        """
+        Insert all rows with a single batched INSERT ... RETURNING in one
+        transaction. Rows come back in the order of `objs_in`.
+        """
+        rows = [
+            obj_in if isinstance(obj_in, dict) else obj_in.model_dump()
+            for obj_in in objs_in
+        ]
+        if not rows:
+            return []
+        stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        db_objs = db.scalars(stmt, rows).all()
+        self._commit_detached(db, db_objs)
+        if self.counter is not None:
+            self.counter.added(db_objs)
+        for db_obj, row in zip(db_objs, rows):
+            self._audit("create", db_obj.id, new=row)
+        return db_objs
+
     def update(
         self,
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: UpdateSchemaType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
     ) -> ModelType:
-        update_data = obj_in.model_dump(exclude_unset=True)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        old_key = self.counter.key(db_obj) if self.counter is not None else None
+        old = {field: getattr(db_obj, field) for field in update_data}
         for field in update_data:
             setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
+        try:
+            db.commit()
+        except StaleDataError:
+            # Another writer bumped the version since `db_obj` was loaded.
+            db.rollback()
+            raise
         db.refresh(db_obj)
+        if self.cache is not None:
+            self.cache.invalidate(db_obj)
+        if self.counter is not None and old_key is not None:
+            self.counter.moved(old_key, db_obj)
+        self._audit("update", db_obj.id, new=update_data, old=old)
+        return db_obj
+
+    def update_by_id(
+        self,
+        db: Session,
+        *,
+        id: Any,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        versions: Optional[Collection[int]] = None,
+    ) -> Optional[ModelType]:
+        """
+        Update a row with a single UPDATE ... RETURNING, without loading it
+        first, bumping its version column if the model has one. Returns None
+        when no row has this id. With `versions`, the row is only updated if its
+        current version is one of them; otherwise `StaleDataError` is raised.
+        The fields whose value changed are audited with their old values; see
+        `update_by_id_statements` for what reading them costs.
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        if not update_data:
+            current = self.get(db, id=id)
+            if current is not None:
+                self._check_version(current, versions)
+            return current
+        lock, stmt = update_by_id_statements(
+            self.model,
+            id,
+            update_data,
+            versions,
+            db.get_bind().dialect,
+            old_values=self._needs_old_values(update_data),
+        )
+        try:
+            old_row = None if lock is None else db.execute(lock).first()
+            row = db.execute(stmt).one_or_none()
+        except IntegrityError:
+            db.rollback()
+            raise
+        if row is None:
+            db.rollback()
+            if versions is not None and self.get(db, id=id) is not None:
+                raise StaleDataError(f"{self.model.__name__} {id} has changed")
+            return None
+        db_obj: ModelType = row[0]
+        old = dict(zip(update_data, row[1:] if old_row is None else old_row))
+        self._commit_detached(db, [db_obj])
+        if self.cache is not None:
+            self.cache.invalidate(db_obj)
+        if self.counter is not None:
+            old_key = tuple(
+                old[field] if field in old else getattr(db_obj, field)
+                for field in self.counter.group_by
+            )
+            self.counter.moved(old_key, db_obj)
+        self._audit("update", db_obj.id, new=update_data, old=old)
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> Optional[ModelType]:
-        obj = db.get(self.model, id)
-        if obj:
-            db.delete(obj)
-            db.commit()
+        """Delete a row with a single DELETE ... RETURNING."""
+        stmt = delete(self.model).where(self.model.id == id).returning(self.model)
+        obj = db.scalars(stmt).one_or_none()
+        if obj is None:
+            db.rollback()
+            return None
+        self._commit_detached(db, [obj])
+        if self.cache is not None:
+            self.cache.invalidate(obj)
+        if self.counter is not None:
+            self.counter.removed(obj)
+        self._audit("delete", obj.id)
         return obj
+
+    def is_unique_violation(self, error: IntegrityError, field: str) -> bool:
+        return is_unique_violation(error, self.model, field)
+
+    def _needs_old_values(self, update_data: Mapping[str, Any]) -> bool:
+        # For the audit trail, and to move the row between counter groups.
+        if self.audit is not None:
+            return True
+        return self.counter is not None and bool(
+            set(self.counter.group_by) & set(update_data)
+        )
+
+    def _audit(
+        self,
+        action: str,
+        id: Any,
+        *,
+        new: Optional[Mapping[str, Any]] = None,
+        old: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        if self.audit is None:
+            return
+        changes = audit_changes(new, old)
+        if action == "update" and not changes:
+            return
+        self.audit.record(action, self.model.__tablename__, id, changes)
+
+    def _check_version(
+        self, db_obj: ModelType, versions: Optional[Collection[int]]
+    ) -> None:
+        if versions is None or self.version_field is None:
+            return
+        if getattr(db_obj, self.version_field) not in versions:
+            raise StaleDataError(f"{self.model.__name__} {db_obj.id} has changed")
+
+    def _commit_detached(self, db: Session, db_objs: Sequence[ModelType]) -> None:
+        # Detach the rows before committing so they are not expired: reloading
+        # them afterwards would cost a SELECT each.
+        for db_obj in db_objs:
+            if db_obj in db:
+                db.expunge(db_obj)
+        db.commit()
+
+
+def version_field(model: Type[Base]) -> Optional[str]:
+    """Name of the attribute mapped as `model`'s `version_id_col`, if any."""
+    mapper = inspect(model)
+    if mapper.version_id_col is None:
+        return None
+    return mapper.get_property_by_column(mapper.version_id_col).key
+
+
+def update_by_id_statements(
+    model: Type[Base],
+    id: Any,
+    update_data: Mapping[str, Any],
+    versions: Optional[Collection[int]],
+    dialect: Dialect,
+    old_values: bool = True,
+) -> Tuple[Optional[Select[Any]], Update]:
+    """
+    Statements updating row `id` to `update_data`, bumping the version column if
+    `model` has one and, with `versions`, only if the current version is one of
+    them. The UPDATE returns the new row, then with `old_values` the old value
+    of each field of `update_data`, read under a row lock.
+
+    On Postgres that is a single statement, whose RETURNING reads a
+    `FOR UPDATE` subquery. Other databases can't return columns of the UPDATE's
+    FROM clause, so the locking SELECT is returned too, to run first in the same
+    transaction: a second round trip, and on databases without row locks (such
+    as SQLite) the old values are only as current as the isolation level keeps
+    them. Without `old_values` there is only the UPDATE, everywhere.
+    """
+    old = (
+        select(*(getattr(model, field).label(field) for field in update_data))
+        .add_columns(model.id.label("_id"))
+        .where(model.id == id)
+        .with_for_update()
+    )
+    values = dict(update_data)
+    stmt = update(model)
+    field = version_field(model)
+    if field is not None:
+        version = getattr(model, field)
+        values[field] = version + 1
+        if versions is not None:
+            stmt = stmt.where(version.in_(versions))
+    stmt = stmt.values(**values)
+    if not old_values:
+        return None, stmt.where(model.id == id).returning(model)
+    if dialect.name != "postgresql":
+        # Other databases can't return columns of the UPDATE's FROM clause.
+        return old, stmt.where(model.id == id).returning(model)
+    subquery = old.subquery("old")
+    stmt = stmt.where(model.id == subquery.c._id).returning(
+        model, *(subquery.c[field] for field in update_data)
+    )
+    return None, stmt
+
+
+def is_unique_violation(error: IntegrityError, model: Type[Base], field: str) -> bool:
+    """
+    Whether `error` was raised by a unique constraint or index on `field` alone,
+    as opposed to another constraint of `model`'s table.
+    """
+    orig = error.orig
+    if orig is None:
+        return False
+    column = getattr(model, field).property.columns[0]
+    table = column.table
+    # psycopg2 sets `pgcode`, the asyncpg adapter `sqlstate`.
+    sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if sqlstate is None:
+        # SQLite names the columns rather than the constraint.
+        return str(orig) == f"UNIQUE constraint failed: {table.name}.{column.name}"
+    if sqlstate != "23505":
+        return False
+    diag = getattr(orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None) or getattr(
+        orig.__cause__, "constraint_name", None
+    )
+    unique = [
+        *(index for index in table.indexes if index.unique),
+        *(c for c in table.constraints if isinstance(c, UniqueConstraint)),
+    ]
+    return any(u.name == constraint and list(u.columns) == [column] for u in unique)
+
+
+def estimate_count(
+    db: Session, model: Type[Base], filters: Optional[Mapping[str, Any]] = None
+) -> Optional[int]:
+    """
+    The planner's row estimate for `model`'s table filtered by `filters`, from
+    table statistics rather than a scan. None on databases other than Postgres.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+    query = select(model.id).where(*filter_clauses(model, filters))
+    sql = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def audit_changes(
+    new: Optional[Mapping[str, Any]], old: Optional[Mapping[str, Any]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    `{field: {"old": ..., "new": ...}}` for the fields of `new` that changed;
+    without `old`, every field of `new` is reported with its new value only.
+    """
+    if old is None:
+        return {field: {"new": value} for field, value in (new or {}).items()}
+    return {
+        field: {"old": old[field], "new": value}
+        for field, value in (new or {}).items()
+        if old.get(field) != value
+    }
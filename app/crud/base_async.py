@@ -0,0 +1,289 @@
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Generic,
+    Mapping,
+    Optional,
+    Type,
+    Sequence,
+    Union,
+)
+from sqlalchemy import Row, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.crud.audit import AuditLog
+from app.crud.base import (
+    CreateSchemaType,
+    ModelType,
+    UpdateSchemaType,
+    audit_changes,
+    estimate_count,
+    is_unique_violation,
+    update_by_id_statements,
+    version_field,
+)
+from app.crud.cache import ModelCache
+from app.crud.counter import RowCounter
+from app.crud.pagination import Cursor, filter_clauses, page_query
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: Optional[ModelCache[ModelType]] = None,
+        counter: Optional[RowCounter[ModelType]] = None,
+        audit: Optional[AuditLog] = None,
+    ):
+        """
+        Async twin of `CRUDBase` working on an `AsyncSession`.
+        **Parameters**
+        * `model`: A SQLAlchemy model class
+        * `cache`: The sync CRUD's cache, invalidated by `update` and `remove`
+        * `counter`: The sync CRUD's row counts, served to `count` and kept up
+          to date by writes
+        * `audit`: Optional audit trail; events are dropped rather than
+          blocking the event loop when its queue is full
+        """
+        self.model = model
+        self.cache = cache
+        self.counter = counter
+        self.audit = audit
+        self.version_field = version_field(model)
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def get_by_field(
+        self, db: AsyncSession, field: str, value: Any
+    ) -> Optional[ModelType]:
+        result = await db.execute(
+            select(self.model).where(getattr(self.model, field) == value).limit(1)
+        )
+        return result.scalars().first()
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str = "id",
+        after: Optional[Cursor] = None,
+        filters: Optional[Mapping[str, Any]] = None,
+    ) -> Sequence[ModelType]:
+        query = page_query(
+            self.model,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            after=after,
+            filters=filters,
+        )
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    async def get_columns_by_field(
+        self, db: AsyncSession, *, field: str, value: Any, columns: Sequence[str]
+    ) -> Optional[Row[Any]]:
+        """The row where `field` equals `value`, with only `columns` loaded."""
+        query = select(*(getattr(self.model, column) for column in columns)).where(
+            getattr(self.model, field) == value
+        )
+        return (await db.execute(query)).first()
+
+    async def get_multi_columns(
+        self,
+        db: AsyncSession,
+        *,
+        columns: Sequence[str],
+        skip: int = 0,
+        limit: int = 100,
+        order_by: str = "id",
+        after: Optional[Cursor] = None,
+        filters: Optional[Mapping[str, Any]] = None,
+    ) -> Sequence[Row[Any]]:
+        """Like `get_multi`, but selects only `columns` and returns rows."""
+        query = page_query(
+            self.model,
+            skip=skip,
+            limit=limit,
+            order_by=order_by,
+            after=after,
+            filters=filters,
+            columns=columns,
+        )
+        return (await db.execute(query)).all()
+
+    async def count(
+        self,
+        db: AsyncSession,
+        *,
+        filters: Optional[Mapping[str, Any]] = None,
+        approximate: bool = False,
+    ) -> int:
+        """
+        Number of rows matching `filters`. Served by the counter when it covers
+        the filters; with `approximate`, Postgres planner estimates are used
+        instead. Otherwise falls back to COUNT(*).
+        """
+        if approximate:
+            estimate = await db.run_sync(estimate_count, self.model, filters)
+            if estimate is not None:
+                return estimate
+        if self.counter is not None and self.counter.covers(filters):
+            # Reconciling runs a sync query, hence `run_sync`.
+            return await db.run_sync(self.counter.count, filters)
+        query = (
+            select(func.count())
+            .select_from(self.model)
+            .where(*filter_clauses(self.model, filters))
+        )
+        return (await db.scalar(query)) or 0
+
+    async def create(
+        self, db: AsyncSession, *, obj_in: Union[CreateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        create_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump()
+        stmt = insert(self.model).values(**create_data).returning(self.model)
+        try:
+            db_obj = (await db.scalars(stmt)).one()
+        except IntegrityError:
+            await db.rollback()
+            raise
+        await db.commit()
+        if self.counter is not None:
+            self.counter.added([db_obj])
+        self._audit("create", db_obj.id, new=create_data)
+        return db_obj
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        old_key = self.counter.key(db_obj) if self.counter is not None else None
+        old = {field: getattr(db_obj, field) for field in update_data}
+        for field in update_data:
+            setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        if self.cache is not None:
+            self.cache.invalidate(db_obj)
+        if self.counter is not None and old_key is not None:
+            self.counter.moved(old_key, db_obj)
+        self._audit("update", db_obj.id, new=update_data, old=old)
+        return db_obj
+
+    async def update_by_id(
+        self,
+        db: AsyncSession,
+        *,
+        id: Any,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        versions: Optional[Collection[int]] = None,
+    ) -> Optional[ModelType]:
+        """
+        Async `CRUDBase.update_by_id`: returns None when no row has this id, and
+        with `versions` raises `StaleDataError` unless the row's current version
+        is one of them.
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        if not update_data:
+            current = await self.get(db, id=id)
+            if current is not None:
+                self._check_version(current, versions)
+            return current
+        lock, stmt = update_by_id_statements(
+            self.model,
+            id,
+            update_data,
+            versions,
+            db.get_bind().dialect,
+            old_values=self._needs_old_values(update_data),
+        )
+        try:
+            old_row = None if lock is None else (await db.execute(lock)).first()
+            row = (await db.execute(stmt)).one_or_none()
+        except IntegrityError:
+            await db.rollback()
+            raise
+        if row is None:
+            await db.rollback()
+            if versions is not None and await self.get(db, id=id) is not None:
+                raise StaleDataError(f"{self.model.__name__} {id} has changed")
+            return None
+        db_obj: ModelType = row[0]
+        old = dict(zip(update_data, row[1:] if old_row is None else old_row))
+        await db.commit()
+        if self.cache is not None:
+            self.cache.invalidate(db_obj)
+        if self.counter is not None:
+            old_key = tuple(
+                old[field] if field in old else getattr(db_obj, field)
+                for field in self.counter.group_by
+            )
+            self.counter.moved(old_key, db_obj)
+        self._audit("update", db_obj.id, new=update_data, old=old)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        stmt = delete(self.model).where(self.model.id == id).returning(self.model)
+        obj = (await db.scalars(stmt)).one_or_none()
+        if obj is None:
+            await db.rollback()
+            return None
+        await db.commit()
+        if self.cache is not None:
+            self.cache.invalidate(obj)
+        if self.counter is not None:
+            self.counter.removed(obj)
+        self._audit("delete", obj.id)
+        return obj
+
+    def is_unique_violation(self, error: IntegrityError, field: str) -> bool:
+        return is_unique_violation(error, self.model, field)
+
+    def _needs_old_values(self, update_data: Mapping[str, Any]) -> bool:
+        # For the audit trail, and to move the row between counter groups.
+        if self.audit is not None:
+            return True
+        return self.counter is not None and bool(
+            set(self.counter.group_by) & set(update_data)
+        )
+
+    def _check_version(
+        self, db_obj: ModelType, versions: Optional[Collection[int]]
+    ) -> None:
+        if versions is None or self.version_field is None:
+            return
+        if getattr(db_obj, self.version_field) not in versions:
+            raise StaleDataError(f"{self.model.__name__} {db_obj.id} has changed")
+
+    def _audit(
+        self,
+        action: str,
+        id: Any,
+        *,
+        new: Optional[Mapping[str, Any]] = None,
+        old: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        if self.audit is None:
+            return
+        changes = audit_changes(new, old)
+        if action == "update" and not changes:
+            return
+        self.audit.record(action, self.model.__tablename__, id, changes, block=False)
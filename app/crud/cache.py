@@ -0,0 +1,80 @@
+from typing import Any, Dict, Generic, List, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.cache import CacheBackend, CacheStats
+from app.db.base_class import Base
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+
+def column_keys(model: Type[Base]) -> List[str]:
+    return [attr.key for attr in inspect(model).column_attrs]
+
+
+def attach_snapshot(
+    db: Session, model: Type[ModelType], snapshot: Dict[str, Any]
+) -> ModelType:
+    """Turn a column snapshot into a persistent object of `db` without a query."""
+    db_obj = model(**snapshot)
+    make_transient_to_detached(db_obj)
+    return db.merge(db_obj, load=False)
+
+
+class ModelCache(Generic[ModelType]):
+    """
+    Read-through cache of model rows, keyed by primary key and by each of the
+    unique `fields`. Rows are stored as column snapshots under
+    `<table>:id:<id>`; the other keys only point at the id, so invalidating the
+    id entry is enough to drop every way of reaching a row.
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        backend: CacheBackend,
+        *,
+        fields: Sequence[str] = (),
+    ):
+        self.model = model
+        self.backend = backend
+        self.fields = tuple(fields)
+        self._prefix = model.__tablename__
+        self._columns = column_keys(model)
+
+    def _key(self, field: str, value: Any) -> str:
+        return f"{self._prefix}:{field}:{value}"
+
+    def get(self, db: Session, field: str, value: Any) -> Optional[ModelType]:
+        """Return the cached row attached to `db`, or None on a miss."""
+        if field != "id":
+            id = self.backend.get(self._key(field, value))
+            if id is None:
+                return None
+        else:
+            id = value
+        snapshot = self.backend.get(self._key("id", id))
+        if snapshot is None or snapshot.get(field) != value:
+            return None
+        return attach_snapshot(db, self.model, snapshot)
+
+    def set(self, db_obj: ModelType) -> None:
+        snapshot: Dict[str, Any] = {
+            column: getattr(db_obj, column) for column in self._columns
+        }
+        self.backend.set(self._key("id", db_obj.id), snapshot)
+        for field in self.fields:
+            self.backend.set(self._key(field, snapshot[field]), db_obj.id)
+
+    def invalidate(self, db_obj: ModelType) -> None:
+        keys = [self._key("id", db_obj.id)]
+        keys += [self._key(field, getattr(db_obj, field)) for field in self.fields]
+        self.backend.delete(*keys)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.backend.stats
@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Any, Dict, Generic, Mapping, Optional, Sequence, Tuple, Type, TypeVar
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.base_class import Base
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+
+class RowCounter(Generic[ModelType]):
+    """
+    Row counts of a model for each combination of the `group_by` columns, so
+    counts filtered on those columns need no query. CRUD writes adjust them in
+    place; they are recomputed with one GROUP BY query when first needed, when a
+    write had an effect that can't be applied locally, and every
+    `reconcile_interval` seconds to correct for writes made by other processes.
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelType],
+        *,
+        group_by: Sequence[str],
+        reconcile_interval: float,
+    ):
+        self.model = model
+        self.group_by = tuple(group_by)
+        self.reconcile_interval = reconcile_interval
+        self._counts: Optional[Dict[Tuple[Any, ...], int]] = None
+        self._reconciled_at = 0.0
+        self._lock = threading.Lock()
+
+    def covers(self, filters: Optional[Mapping[str, Any]]) -> bool:
+        """Whether counts for `filters` can be served from the counters."""
+        return all(
+            field in self.group_by
+            for field, value in (filters or {}).items()
+            if value is not None
+        )
+
+    def key(self, obj: ModelType) -> Tuple[Any, ...]:
+        return tuple(getattr(obj, field) for field in self.group_by)
+
+    def count(self, db: Session, filters: Optional[Mapping[str, Any]] = None) -> int:
+        with self._lock:
+            counts = self._counts
+            if time.monotonic() - self._reconciled_at > self.reconcile_interval:
+                counts = None
+        if counts is None:
+            counts = self.reconcile(db)
+        wanted = [
+            (index, (filters or {}).get(field))
+            for index, field in enumerate(self.group_by)
+        ]
+        return sum(
+            count
+            for key, count in counts.items()
+            if all(value is None or key[index] == value for index, value in wanted)
+        )
+
+    def reconcile(self, db: Session) -> Dict[Tuple[Any, ...], int]:
+        """Reload the counts from the database."""
+        columns = [getattr(self.model, field) for field in self.group_by]
+        rows = db.execute(select(*columns, func.count()).group_by(*columns)).all()
+        counts = {tuple(row[:-1]): row[-1] for row in rows}
+        with self._lock:
+            self._counts = counts
+            self._reconciled_at = time.monotonic()
+        return counts
+
+    def _adjust(self, key: Tuple[Any, ...], delta: int) -> None:
+        # Callers hold the lock.
+        if self._counts is not None:
+            self._counts[key] = self._counts.get(key, 0) + delta
+
+    def added(self, db_objs: Sequence[ModelType]) -> None:
+        with self._lock:
+            for db_obj in db_objs:
+                self._adjust(self.key(db_obj), 1)
+
+    def removed(self, db_obj: ModelType) -> None:
+        with self._lock:
+            self._adjust(self.key(db_obj), -1)
+
+    def moved(self, old_key: Tuple[Any, ...], db_obj: ModelType) -> None:
+        new_key = self.key(db_obj)
+        if new_key != old_key:
+            with self._lock:
+                self._adjust(old_key, -1)
+                self._adjust(new_key, 1)
+
+    def invalidate(self) -> None:
+        """Recompute the counts on next use."""
+        with self._lock:
+            self._counts = None
@@ -0,0 +1,113 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Any, List, Mapping, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy import ColumnElement, Select, and_, or_, select
+
+from app.db.base_class import Base
+
+ModelType = TypeVar("ModelType", bound=Base)
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Position after the last row of a page for keyset pagination: the values of
+    the ordering column and, as a tie-breaker, the primary key.
+    """
+
+    order_by: str
+    values: List[Any]
+
+    def encode(self) -> str:
+        raw = json.dumps([self.order_by, self.values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "Cursor":
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            order_by, values = json.loads(base64.urlsafe_b64decode(padded))
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise InvalidCursorError("Malformed cursor")
+        if not isinstance(order_by, str) or not isinstance(values, list):
+            raise InvalidCursorError("Malformed cursor")
+        expected = 1 if order_by == "id" else 2
+        if len(values) != expected:
+            raise InvalidCursorError("Malformed cursor")
+        # Other orderings are by text columns, with the id as tie-breaker.
+        *sort_values, id = values
+        if not isinstance(id, int) or isinstance(id, bool):
+            raise InvalidCursorError("Malformed cursor")
+        if not all(isinstance(value, str) for value in sort_values):
+            raise InvalidCursorError("Malformed cursor")
+        return cls(order_by=order_by, values=values)
+
+    @classmethod
+    def from_row(cls, row: Any, order_by: str) -> "Cursor":
+        if order_by == "id":
+            return cls(order_by=order_by, values=[row.id])
+        return cls(order_by=order_by, values=[getattr(row, order_by), row.id])
+
+
+def order_columns(model: Type[Base], order_by: str) -> List[Any]:
+    if order_by == "id":
+        return [model.id]
+    return [getattr(model, order_by), model.id]
+
+
+def keyset_filter(model: Type[Base], cursor: Cursor) -> ColumnElement[bool]:
+    if cursor.order_by == "id":
+        condition: ColumnElement[bool] = model.id > cursor.values[0]
+        return condition
+    column = getattr(model, cursor.order_by)
+    value, last_id = cursor.values
+    return or_(column > value, and_(column == value, model.id > last_id))
+
+
+def filter_clauses(
+    model: Type[Base], filters: Optional[Mapping[str, Any]]
+) -> List[ColumnElement[bool]]:
+    """Equality conditions for each filter; None values are ignored."""
+    if not filters:
+        return []
+    return [
+        getattr(model, field) == value
+        for field, value in filters.items()
+        if value is not None
+    ]
+
+
+def page_query(
+    model: Type[ModelType],
+    *,
+    skip: int,
+    limit: int,
+    order_by: str,
+    after: Optional[Cursor],
+    filters: Optional[Mapping[str, Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> Select[Any]:
+    """
+    Build the SELECT for one page. With a cursor the page starts right after it
+    (keyset pagination); otherwise `skip` rows are skipped (OFFSET). With
+    `columns` only those columns are selected instead of whole entities.
+    """
+    if columns is None:
+        query: Select[Any] = select(model)
+    else:
+        query = select(*(getattr(model, column) for column in columns))
+    query = query.where(*filter_clauses(model, filters))
+    if after is not None:
+        return (
+            query.where(keyset_filter(model, after))
+            .order_by(*order_columns(model, after.order_by))
+            .limit(limit)
+        )
+    return query.order_by(*order_columns(model, order_by)).offset(skip).limit(limit)
@@ -1,20 +1,216 @@
-from typing import Optional
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Type,
+    Union,
+)
+from sqlalchemy import ColumnElement, Integer, and_, column, func, not_, select, table
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+from app.core.revocation import TokenRevocationSet
+from app.core.security import get_password_hash, verify_and_update
+from app.core.singleflight import SingleFlight
+from app.crud.audit import audit_log
 from app.crud.base import CRUDBase
-from app.models.user import User
+from app.crud.cache import ModelCache
+from app.crud.counter import RowCounter
+from app.models.user import EMAIL_SEARCH_FTS_TABLE, User
 from app.schemas.user import UserCreate, UserUpdate
 
+# Trigram indexes can't serve shorter substrings, so those only match prefixes.
+MIN_SUBSTRING_SEARCH_LENGTH = 3
+
+# Changes to these make tokens carrying the old values untrustworthy.
+TOKEN_CLAIM_FIELDS = frozenset({"is_active", "is_superuser", "password"})
+
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    def __init__(
+        self,
+        model: Type[User],
+        *,
+        revocations: Optional[TokenRevocationSet] = None,
+        **kwargs: Any,
+    ):
+        """
+        `revocations`, if given, is told about users whose flags or password
+        change, or who are removed, for claims-only auth.
+        """
+        super().__init__(model, **kwargs)
+        self.revocations = revocations
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return self.get_by_field(db, field="email", value=email)
 
+    def create(
+        self,
+        db: Session,
+        *,
+        obj_in: Union[UserCreate, Dict[str, Any]],
+        hashed_password: Optional[str] = None,
+    ) -> User:
+        """
+        Create a user. Callers on the request path should hash the password
+        through `app.core.hashing.password_hasher` and pass `hashed_password`;
+        otherwise it is hashed inline.
+        """
+        create_data = dict(obj_in) if isinstance(obj_in, dict) else obj_in.model_dump()
+        create_data["password"] = hashed_password or get_password_hash(
+            create_data["password"]
+        )
+        return super().create(db, obj_in=create_data)
+
+    def create_multi(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[UserCreate, Dict[str, Any]]],
+        hashed_passwords: Optional[Sequence[str]] = None,
+    ) -> Sequence[User]:
+        rows = []
+        for index, obj_in in enumerate(objs_in):
+            data = dict(obj_in) if isinstance(obj_in, dict) else obj_in.model_dump()
+            if hashed_passwords is not None:
+                data["password"] = hashed_passwords[index]
+            else:
+                data["password"] = get_password_hash(data["password"])
+            rows.append(data)
+        return super().create_multi(db, objs_in=rows)
+
+    def search(self, db: Session, *, q: str, limit: int) -> List[User]:
+        """
+        Case-insensitive email search: prefix matches first, then (for terms of
+        at least `MIN_SUBSTRING_SEARCH_LENGTH` characters) substring matches,
+        each ordered by email. Both parts are served by indexes.
+        """
+        term = q.strip().lower()
+        if not term:
+            return []
+        email = func.lower(User.email)
+        sqlite = db.get_bind().dialect.name == "sqlite"
+        if sqlite:
+            # SQLite only uses expression indexes for comparisons, not LIKE.
+            upper = term[:-1] + chr(ord(term[-1]) + 1)
+            prefix: ColumnElement[bool] = and_(email >= term, email < upper)
+        else:
+            prefix = email.like(f"{_escape_like(term)}%", escape="\\")
+        users = list(
+            db.scalars(select(User).where(prefix).order_by(email).limit(limit))
+        )
+        if len(users) >= limit or len(term) < MIN_SUBSTRING_SEARCH_LENGTH:
+            return users
+
+        if sqlite:
+            fts = table(EMAIL_SEARCH_FTS_TABLE)
+            phrase = '"' + term.replace('"', '""') + '"'
+            substring = User.id.in_(
+                select(column("rowid", Integer))
+                .select_from(fts)
+                .where(
+                    text(f"{EMAIL_SEARCH_FTS_TABLE} MATCH :phrase").bindparams(
+                        phrase=phrase
+                    )
+                )
+            )
+        else:
+            substring = email.like(f"%{_escape_like(term)}%", escape="\\")
+        users += db.scalars(
+            select(User)
+            .where(substring, not_(prefix))
+            .order_by(email)
+            .limit(limit - len(users))
+        )
+        return users
+
+    def get_existing_emails(self, db: Session, *, emails: Iterable[str]) -> Set[str]:
+        """Return which of `emails` are already taken, using one IN query."""
+        emails = set(emails)
+        if not emails:
+            return set()
+        return set(db.scalars(select(User.email).where(User.email.in_(emails))))
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]],
+        hashed_password: Optional[str] = None,
+    ) -> User:
+        update_data = self._update_data(obj_in, hashed_password)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        self._revoke_tokens(self.revocations, db_obj, update_data)
+        return db_obj
+
+    def update_by_id(
+        self,
+        db: Session,
+        *,
+        id: Any,
+        obj_in: Union[UserUpdate, Dict[str, Any]],
+        hashed_password: Optional[str] = None,
+        versions: Optional[Collection[int]] = None,
+    ) -> Optional[User]:
+        update_data = self._update_data(obj_in, hashed_password)
+        db_obj = super().update_by_id(db, id=id, obj_in=update_data, versions=versions)
+        if db_obj is not None:
+            self._revoke_tokens(self.revocations, db_obj, update_data)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Optional[User]:
+        db_obj = super().remove(db, id=id)
+        if db_obj is not None and self.revocations is not None:
+            self.revocations.revoke(db_obj.id, db_obj.version + 1)
+        return db_obj
+
+    @staticmethod
+    def _revoke_tokens(
+        revocations: Optional[TokenRevocationSet],
+        db_obj: User,
+        update_data: Dict[str, Any],
+    ) -> None:
+        if revocations is not None and TOKEN_CLAIM_FIELDS & set(update_data):
+            revocations.revoke(db_obj.id, db_obj.version)
+
+    @staticmethod
+    def _update_data(
+        obj_in: Union[UserUpdate, Dict[str, Any]], hashed_password: Optional[str]
+    ) -> Dict[str, Any]:
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        password = update_data.pop("password", None)
+        if password is not None:
+            update_data["password"] = hashed_password or get_password_hash(password)
+        return update_data
+
+    def set_password_hash(
+        self, db: Session, *, id: Any, hashed_password: str
+    ) -> Optional[User]:
+        return super().update_by_id(db, id=id, obj_in={"password": hashed_password})
+
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
+        """
+        Return the user if `password` matches, rehashing it when the stored hash
+        uses an outdated scheme or cost.
+        """
         user = self.get_by_email(db, email=email)
         if not user:
             return None
-        if not user.password == password:
+        valid, new_hash = verify_and_update(password, user.password)
+        if not valid:
             return None
+        if new_hash:
+            return self.set_password_hash(db, id=user.id, hashed_password=new_hash)
         return user
 
     def is_active(self, user: User) -> bool:
@@ -24,4 +220,44 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return user.is_superuser
 
 
-user = CRUDUser(User)
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+user_cache = (
+    ModelCache(
+        User,
+        LRUTTLCache(
+            max_size=settings.USER_CACHE_MAX_SIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS,
+        ),
+        fields=("email",),
+    )
+    if settings.USER_CACHE_ENABLED
+    else None
+)
+user_counter = (
+    RowCounter(
+        User,
+        group_by=("is_active", "is_superuser"),
+        reconcile_interval=settings.USER_COUNT_RECONCILE_SECONDS,
+    )
+    if settings.USER_COUNT_MODE != "exact"
+    else None
+)
+token_revocations = (
+    TokenRevocationSet(
+        max_token_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        capacity=settings.AUTH_REVOCATION_CAPACITY,
+    )
+    if settings.AUTH_CLAIMS_ONLY
+    else None
+)
+user = CRUDUser(
+    User,
+    revocations=token_revocations,
+    audit=audit_log,
+    cache=user_cache,
+    counter=user_counter,
+    singleflight=SingleFlight() if settings.USER_READ_COALESCING_ENABLED else None,
+)
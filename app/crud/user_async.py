@@ -0,0 +1,88 @@
+from typing import Any, Collection, Dict, Optional, Type, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import get_password_hash
+from app.crud.base_async import AsyncCRUDBase
+from app.core.revocation import TokenRevocationSet
+from app.crud.audit import audit_log
+from app.crud.user import CRUDUser, token_revocations, user_cache, user_counter
+from app.models.user import User
+from app.schemas.user import UserCreate, UserUpdate
+
+
+class AsyncCRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    def __init__(
+        self,
+        model: Type[User],
+        *,
+        revocations: Optional[TokenRevocationSet] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(model, **kwargs)
+        self.revocations = revocations
+
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        return await self.get_by_field(db, field="email", value=email)
+
+    async def create(
+        self,
+        db: AsyncSession,
+        *,
+        obj_in: Union[UserCreate, Dict[str, Any]],
+        hashed_password: Optional[str] = None,
+    ) -> User:
+        create_data = dict(obj_in) if isinstance(obj_in, dict) else obj_in.model_dump()
+        create_data["password"] = hashed_password or get_password_hash(
+            create_data["password"]
+        )
+        return await super().create(db, obj_in=create_data)
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]],
+        hashed_password: Optional[str] = None,
+    ) -> User:
+        update_data = CRUDUser._update_data(obj_in, hashed_password)
+        db_obj = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        CRUDUser._revoke_tokens(self.revocations, db_obj, update_data)
+        return db_obj
+
+    async def update_by_id(
+        self,
+        db: AsyncSession,
+        *,
+        id: Any,
+        obj_in: Union[UserUpdate, Dict[str, Any]],
+        hashed_password: Optional[str] = None,
+        versions: Optional[Collection[int]] = None,
+    ) -> Optional[User]:
+        update_data = CRUDUser._update_data(obj_in, hashed_password)
+        db_obj = await super().update_by_id(
+            db, id=id, obj_in=update_data, versions=versions
+        )
+        if db_obj is not None:
+            CRUDUser._revoke_tokens(self.revocations, db_obj, update_data)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[User]:
+        db_obj = await super().remove(db, id=id)
+        if db_obj is not None and self.revocations is not None:
+            self.revocations.revoke(db_obj.id, db_obj.version + 1)
+        return db_obj
+
+    def is_active(self, user: User) -> bool:
+        return user.is_active
+
+    def is_superuser(self, user: User) -> bool:
+        return user.is_superuser
+
+
+user_async = AsyncCRUDUser(
+    User,
+    cache=user_cache,
+    counter=user_counter,
+    revocations=token_revocations,
+    audit=audit_log,
+)
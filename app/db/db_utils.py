@@ -1,15 +1,66 @@
 import threading
 from sqlalchemy import create_engine, Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine.default import DefaultDialect
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
-from typing import Optional
+from app.core.metrics import instrument_engine
+from app.db.pool_stats import InstrumentedQueuePool, PoolStats
+from app.db.routing import ReplicaBalancer, RoutingSession
+from typing import Any, Dict, List, Optional, Type, cast
+
+
+def pool_options() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+    }
+
+
+def async_pool_options(url: str) -> Dict[str, Any]:
+    """
+    `pool_options()` for an async engine on `url`. Dialects that don't pool
+    connections in a queue, like aiosqlite's `NullPool`, take none of them.
+    """
+    parsed = make_url(url)
+    dialect = cast(Type[DefaultDialect], parsed.get_dialect())
+    if not issubclass(dialect.get_pool_class(parsed), QueuePool):
+        return {}
+    return pool_options()
+
+
+def create_pooled_engine(url: str) -> Engine:
+    """Engine using the configured pool settings, with pool stats attached."""
+    engine = create_engine(url, poolclass=InstrumentedQueuePool, **pool_options())
+    get_pool_stats(engine).attach(engine)
+    if settings.METRICS_ENABLED:
+        instrument_engine(engine)
+    return engine
+
+
+def get_pool_stats(engine: Engine) -> PoolStats:
+    pool = engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    return pool.stats
 
 
 class DatabaseConnectionPool:
     _instance: Optional["DatabaseConnectionPool"] = None
     _lock: threading.Lock = threading.Lock()
     engine: Engine
-    session_local: sessionmaker[Session]
+    replica_engines: List[Engine]
+    session_local: sessionmaker[RoutingSession]
 
     def __new__(cls) -> "DatabaseConnectionPool":
         if cls._instance is None:
@@ -20,10 +71,73 @@ class DatabaseConnectionPool:
         return cls._instance
 
     def _initialize_pool(self) -> None:
-        self.engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+        self.engine = create_pooled_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+        self.replica_engines = [
+            create_pooled_engine(url) for url in settings.SQLALCHEMY_REPLICA_URIS
+        ]
+        balancer = (
+            ReplicaBalancer(self.replica_engines, settings.DB_REPLICA_BALANCING)
+            if self.replica_engines
+            else None
+        )
         self.session_local = sessionmaker(
-            autocommit=False, autoflush=False, bind=self.engine
+            class_=RoutingSession,
+            autocommit=False,
+            autoflush=False,
+            primary=self.engine,
+            balancer=balancer,
         )
 
     def get_session(self) -> Session:
         return self.session_local()
+
+    def get_read_session(self) -> Session:
+        """Session whose reads may go to a replica until it writes."""
+        return self.session_local(read_only=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return get_pool_stats(self.engine).snapshot(self.engine.pool)
+
+    def replica_stats(self) -> List[Dict[str, Any]]:
+        return [
+            get_pool_stats(engine).snapshot(engine.pool)
+            for engine in self.replica_engines
+        ]
+
+
+def get_async_database_uri() -> str:
+    if settings.ASYNC_SQLALCHEMY_DATABASE_URI:
+        return settings.ASYNC_SQLALCHEMY_DATABASE_URI
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI))
+    return url.set(drivername="postgresql+asyncpg").render_as_string(
+        hide_password=False
+    )
+
+
+class AsyncDatabaseConnectionPool:
+    _instance: Optional["AsyncDatabaseConnectionPool"] = None
+    _lock: threading.Lock = threading.Lock()
+    engine: AsyncEngine
+    session_local: async_sessionmaker[AsyncSession]
+
+    def __new__(cls) -> "AsyncDatabaseConnectionPool":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(AsyncDatabaseConnectionPool, cls).__new__(cls)
+                    cls._instance._initialize_pool()
+        return cls._instance
+
+    def _initialize_pool(self) -> None:
+        url = get_async_database_uri()
+        self.engine = create_async_engine(url, **async_pool_options(url))
+        if settings.METRICS_ENABLED:
+            instrument_engine(self.engine.sync_engine)
+        # Attributes must stay loaded after commit: lazy refreshes would need
+        # implicit IO, which AsyncSession does not allow.
+        self.session_local = async_sessionmaker(
+            autoflush=False, expire_on_commit=False, bind=self.engine
+        )
+
+    def get_session(self) -> AsyncSession:
+        return self.session_local()
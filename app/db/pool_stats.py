@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import Engine, event, exc
+from sqlalchemy.pool import PoolProxiedConnection, QueuePool
+
+from app.core.metrics import current_request
+
+
+class PoolStats:
+    """
+    Counters for one connection pool. Checkouts, checkins, new connections and
+    invalidations come from SQLAlchemy pool events; the time spent waiting for a
+    connection and checkout timeouts are recorded by `InstrumentedQueuePool`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connections_created = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, *args: Any) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, *args: Any) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def _on_connect(self, *args: Any) -> None:
+        with self._lock:
+            self.connections_created += 1
+
+    def _on_invalidate(self, *args: Any) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool: Any) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connections_created": self.connections_created,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": (
+                    self.wait_total / self.wait_count * 1000 if self.wait_count else 0.0
+                ),
+                "wait_max_ms": self.wait_max * 1000,
+            }
+        if isinstance(pool, QueuePool):
+            counters.update(
+                pool_size=pool.size(),
+                in_use=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return counters
+
+
+class InstrumentedQueuePool(QueuePool):
+    """`QueuePool` that times every checkout into its `PoolStats`."""
+
+    stats: PoolStats
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self._record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self._record_wait(time.perf_counter() - started)
+        return connection
+
+    def _record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        self.stats.record_wait(seconds, timed_out)
+        request = current_request.get()
+        if request is not None:
+            request.pool_wait += seconds
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        assert isinstance(pool, InstrumentedQueuePool)
+        pool.stats = self.stats
+        return pool
@@ -0,0 +1,77 @@
+import itertools
+import threading
+from typing import Any, Iterator, Optional, Sequence
+
+from sqlalchemy import Delete, Engine, Insert, Select, Update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+
+class ReplicaBalancer:
+    """
+    Picks the replica for a read-only session: `round_robin` cycles through
+    them, `least_busy` takes the one with the fewest checked-out connections.
+    """
+
+    def __init__(self, replicas: Sequence[Engine], strategy: str = "round_robin"):
+        if strategy not in ("round_robin", "least_busy"):
+            raise ValueError(f"Unknown replica balancing strategy: {strategy}")
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self._cycle: Iterator[Engine] = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    def choose(self) -> Engine:
+        if self.strategy == "least_busy":
+            return min(self.replicas, key=_checked_out)
+        with self._lock:
+            return next(self._cycle)
+
+
+def _checked_out(engine: Engine) -> int:
+    pool = engine.pool
+    return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of a read-only session to a replica and
+    everything else to the primary. Once the session writes (flush or DML), it
+    sticks to the primary so it can read its own writes.
+    """
+
+    def __init__(
+        self,
+        *,
+        primary: Engine,
+        balancer: Optional[ReplicaBalancer] = None,
+        read_only: bool = False,
+        **kwargs: Any,
+    ):
+        kwargs["bind"] = primary
+        super().__init__(**kwargs)
+        self.primary = primary
+        self.balancer = balancer
+        self.read_only = read_only
+        self.replica: Optional[Engine] = None
+        self.wrote = False
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Any:
+        if self.wrote or self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.wrote = True
+            return self.primary
+        if not self.read_only or self.balancer is None:
+            return self.primary
+        if not isinstance(clause, Select):
+            # Raw SQL and anything else we cannot classify stays on the primary.
+            return self.primary
+        if self.replica is None:
+            self.replica = self.balancer.choose()
+        return self.replica
+
+
+def routed_to_replica(db: Session, clause: Any) -> bool:
+    """Whether `db` runs `clause` on a replica rather than on the primary."""
+    return (
+        isinstance(db, RoutingSession) and db.get_bind(clause=clause) is not db.primary
+    )
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import JSON, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, declared_attr, mapped_column
+from app.db.base_class import Base
+
+
+class AuditEvent(Base):
+    @declared_attr.directive
+    @classmethod
+    def __tablename__(cls) -> str:
+        return "audit_event"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    occurred_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+    # Id of the authenticated user that made the change, if any.
+    actor_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    action: Mapped[str] = mapped_column(String, nullable=False)
+    entity: Mapped[str] = mapped_column(String, nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    # {field: {"old": ..., "new": ...}}; "old" is absent when it wasn't loaded.
+    changes: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
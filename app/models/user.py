@@ -1,4 +1,7 @@
-from sqlalchemy import Integer, String, Boolean
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DDL, DateTime, Index, Integer, String, Boolean, event, func
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base_class import Base
 
@@ -9,3 +12,65 @@ class User(Base):
     password: Mapped[str] = mapped_column(String, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_superuser: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Bumped on every update; ORM flushes check it (optimistic concurrency) and
+    # it is the basis of the ETags served for users.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+    # Written in batches by `app.crud.activity.ActivityTracker`, so they lag
+    # behind by up to its flush interval and staleness bound.
+    last_login_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+# Email search: lower(email) serves case-insensitive prefix matches (LIKE 'q%'
+# on Postgres, a range scan on SQLite) and a trigram index serves substrings.
+EMAIL_SEARCH_FTS_TABLE = "user_email_fts"
+
+Index(
+    "ix_user_email_lower",
+    func.lower(User.email).label("email_lower"),
+    postgresql_ops={"email_lower": "text_pattern_ops"},
+)
+Index(
+    "ix_user_email_trgm",
+    func.lower(User.email).label("email_lower"),
+    postgresql_using="gin",
+    postgresql_ops={"email_lower": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# SQLite has no trigram index type; an FTS5 table with the trigram tokenizer,
+# kept in sync by triggers, plays the same role.
+for statement in (
+    f"CREATE VIRTUAL TABLE {EMAIL_SEARCH_FTS_TABLE} USING fts5(email, "
+    "content='user', content_rowid='id', tokenize='trigram case_sensitive 0')",
+    f"CREATE TRIGGER {EMAIL_SEARCH_FTS_TABLE}_ai AFTER INSERT ON user BEGIN "
+    f"INSERT INTO {EMAIL_SEARCH_FTS_TABLE}(rowid, email) "
+    "VALUES (new.id, new.email); END",
+    f"CREATE TRIGGER {EMAIL_SEARCH_FTS_TABLE}_ad AFTER DELETE ON user BEGIN "
+    f"INSERT INTO {EMAIL_SEARCH_FTS_TABLE}({EMAIL_SEARCH_FTS_TABLE}, rowid, email) "
+    "VALUES ('delete', old.id, old.email); END",
+    f"CREATE TRIGGER {EMAIL_SEARCH_FTS_TABLE}_au AFTER UPDATE OF email ON user BEGIN "
+    f"INSERT INTO {EMAIL_SEARCH_FTS_TABLE}({EMAIL_SEARCH_FTS_TABLE}, rowid, email) "
+    "VALUES ('delete', old.id, old.email); "
+    f"INSERT INTO {EMAIL_SEARCH_FTS_TABLE}(rowid, email) "
+    "VALUES (new.id, new.email); END",
+):
+    event.listen(
+        User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    User.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {EMAIL_SEARCH_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
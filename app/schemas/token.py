@@ -1,5 +1,15 @@
 from pydantic import BaseModel
 
 
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+
+
 class TokenPayload(BaseModel):
     sub: int | None = None
+    iat: int | None = None
+    # Only present in claims-only auth mode.
+    is_active: bool | None = None
+    is_superuser: bool | None = None
+    token_version: int | None = None
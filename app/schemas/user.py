@@ -1,6 +1,9 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
-from app.core.security import get_password_hash
-from typing import Optional
+from enum import Enum
+from pydantic import BaseModel, EmailStr, Field
+from typing import Any, List, Optional
+from typing_extensions import TypedDict
+
+from app.core.config import settings
 
 
 class UserBase(BaseModel):
@@ -15,10 +18,6 @@ class UserCreate(BaseModel):
     is_active: bool = True
     is_superuser: bool = False
 
-    @field_validator("password")
-    def hash_password(cls, v: str) -> str:
-        return get_password_hash(v)
-
 
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
@@ -26,11 +25,14 @@ class UserUpdate(BaseModel):
     is_superuser: Optional[bool] = None
     password: Optional[str] = None
 
-    @field_validator("password")
-    def hash_password(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            return get_password_hash(v)
-        return v
+
+class UserFilter(BaseModel):
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+
+
+class UserCount(BaseModel):
+    count: int
 
 
 class UserInDBBase(UserBase):
@@ -43,5 +45,56 @@ class User(UserInDBBase):
     pass
 
 
+class UserRecord(TypedDict):
+    """
+    Fields of `User` as a plain dict, for serializing rows read from the
+    database without validating them again.
+    """
+
+    email: str
+    is_active: bool
+    is_superuser: bool
+    id: int
+
+
 class UserInDB(UserInDBBase):
     password: str
+
+
+class UserLookup(BaseModel):
+    ids: List[int] = Field([], max_length=settings.USER_LOOKUP_MAX_KEYS)
+    emails: List[str] = Field([], max_length=settings.USER_LOOKUP_MAX_KEYS)
+
+
+class UserLookupResult(BaseModel):
+    users: List[User]
+    missing_ids: List[int]
+    missing_emails: List[str]
+
+
+class UserBulkCreate(BaseModel):
+    # Items are validated one by one so a bad entry is reported, not fatal.
+    users: List[Any] = Field(
+        ..., min_length=1, max_length=settings.BULK_CREATE_MAX_USERS
+    )
+
+
+class BulkItemStatus(str, Enum):
+    created = "created"
+    conflict = "conflict"
+    invalid = "invalid"
+
+
+class UserBulkItemResult(BaseModel):
+    index: int
+    status: BulkItemStatus
+    email: Optional[str] = None
+    user: Optional[User] = None
+    detail: Optional[str] = None
+
+
+class UserBulkCreateResult(BaseModel):
+    created: int
+    conflicts: int
+    invalid: int
+    results: List[UserBulkItemResult]
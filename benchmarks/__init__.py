@@ -0,0 +1,12 @@
+"""
+Benchmarks for the users API. Run them as modules from the project root, e.g.
+`python -m benchmarks.bench_async_db`.
+
+The benchmarks use SQLite stand-ins for the database, so the Postgres settings only
+need to be well formed; placeholders are filled in when they are not set.
+"""
+
+import os
+
+for _name in ("POSTGRES_SERVER", "TEST_POSTGRES_SERVER"):
+    os.environ.setdefault(_name, "localhost")
@@ -0,0 +1,121 @@
+"""
+Compare throughput of the sync (`users`) and async (`users_async`) endpoints.
+
+Both variants read the same SQLite file, the sync one through pysqlite on
+Starlette's thread pool and the async one through aiosqlite on the event loop:
+
+    python -m benchmarks.bench_async_db --users 5000 --requests 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+from pathlib import Path
+from typing import AsyncGenerator, Generator, List
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api import deps
+from app.api.v1.endpoints import users, users_async
+from app.core.config import settings
+from benchmarks.utils import BenchResult, print_results, run_concurrently, seed_users
+
+USERS_URL = f"{settings.API_V1_STR}/users"
+
+
+def build_sync_app(db_path: Path) -> FastAPI:
+    engine = create_engine(
+        f"sqlite:///{db_path}", connect_args={"check_same_thread": False}
+    )
+    session_local = sessionmaker(autoflush=False, bind=engine)
+
+    def get_db() -> Generator[Session, None, None]:
+        db = session_local()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(users.router, prefix=USERS_URL)
+    app.dependency_overrides[deps.get_db] = get_db
+    return app
+
+
+def build_async_app(db_path: Path) -> FastAPI:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    session_local = async_sessionmaker(
+        autoflush=False, expire_on_commit=False, bind=engine
+    )
+
+    async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+        db = session_local()
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    app = FastAPI()
+    app.include_router(users_async.router, prefix=USERS_URL)
+    app.dependency_overrides[deps.get_async_db] = get_async_db
+    return app
+
+
+async def bench_app(
+    name: str, app: FastAPI, user_count: int, total: int, concurrency: int
+) -> List[BenchResult]:
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def read_by_id(i: int) -> bool:
+            user_id = random.randint(1, user_count)
+            response = await client.get(f"{USERS_URL}/{user_id}")
+            return response.status_code == 200
+
+        async def read_page(i: int) -> bool:
+            skip = random.randint(0, max(0, user_count - 50))
+            response = await client.get(f"{USERS_URL}/?skip={skip}&limit=50")
+            return response.status_code == 200
+
+        return [
+            await run_concurrently(
+                f"{name} GET /users/{{id}}", read_by_id, total, concurrency
+            ),
+            await run_concurrently(
+                f"{name} GET /users/?limit=50", read_page, total, concurrency
+            ),
+        ]
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        seed_users(create_engine(f"sqlite:///{db_path}"), args.users)
+        results = await bench_app(
+            "sync",
+            build_sync_app(db_path),
+            args.users,
+            args.requests,
+            args.concurrency,
+        )
+        results += await bench_app(
+            "async",
+            build_async_app(db_path),
+            args.users,
+            args.requests,
+            args.concurrency,
+        )
+    print_results(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
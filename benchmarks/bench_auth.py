@@ -0,0 +1,50 @@
+"""
+Per-request overhead of the `get_current_user` dependency with and without the
+verified-claims cache:
+
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+
+import argparse
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.core.token_cache import TokenClaimsCache
+from app.crud.user import user as user_crud
+from benchmarks.utils import seed_users
+
+
+def main(args: argparse.Namespace) -> None:
+    engine = create_engine("sqlite://")
+    seed_users(engine, 1)
+    db = Session(engine)
+    user = user_crud.get_by_email(db, email="user0@example.com")
+    assert user is not None
+    token = create_access_token(user.id)
+
+    variants = {
+        "no token cache": None,
+        "token cache": TokenClaimsCache(
+            max_size=settings.TOKEN_CACHE_MAX_SIZE,
+            max_ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS,
+        ),
+    }
+    for name, cache in variants.items():
+        deps.token_cache = cache
+        deps.get_current_user(db=db, token=token)
+        elapsed = timeit.timeit(
+            lambda: deps.get_current_user(db=db, token=token),
+            number=args.iterations,
+        )
+        print(f"{name:<15} {elapsed / args.iterations * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    main(parser.parse_args())
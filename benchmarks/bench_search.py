@@ -0,0 +1,69 @@
+"""
+Latency of `CRUDUser.search` against a full-scan `lower(email) LIKE '%q%'`:
+
+    python -m benchmarks.bench_search --users 1000000
+
+Uses a SQLite file, where substring matches go through the FTS5 trigram table;
+pass `--database-url` to run against a scratch Postgres database instead.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.crud.user import user as user_crud
+from app.db.base import Base
+from app.models.user import User
+from benchmarks.utils import seed_users, timed
+
+QUERIES = {
+    "rare prefix": "user123456@",
+    "common prefix": "user5",
+    "rare substring": "99999@",
+    "common substring": "ser77",
+    "no match": "nobody",
+}
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = create_engine(url)
+        started = time.perf_counter()
+        seed_users(engine, args.users)
+        print(f"seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+        with Session(engine) as db:
+            print(f"{'query':<18} {'term':<12} {'search p50/p95 ms':>20} {'scan':>20}")
+            for name, term in QUERIES.items():
+                indexed = timed(
+                    lambda: user_crud.search(db, q=term, limit=args.limit),
+                    args.repeat,
+                )
+                scan = timed(
+                    lambda: db.scalars(
+                        select(User)
+                        .where(func.lower(User.email).like(f"%{term}%"))
+                        .order_by(func.lower(User.email))
+                        .limit(args.limit)
+                    ).all(),
+                    args.repeat,
+                )
+                print(
+                    f"{name:<18} {term:<12} "
+                    f"{indexed['p50_ms']:>10}/{indexed['p95_ms']:<9} "
+                    f"{scan['p50_ms']:>10}/{scan['p95_ms']:<9}"
+                )
+        Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
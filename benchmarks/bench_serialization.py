@@ -0,0 +1,88 @@
+"""
+Cost of encoding and decoding `GET /users/` bodies of 100 and 10k users:
+
+    python -m benchmarks.bench_serialization
+
+compares FastAPI's `response_model` handling, which validates every user
+again before encoding it, with the precompiled `TypeAdapter` the endpoints
+now serialize through, writing JSON or MessagePack. Users are built in memory,
+so no database is involved.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Callable, Dict, List
+
+import msgpack
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.api.fieldsets import fieldset_response
+from app.api.negotiation import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from app.api.v1.endpoints.users import USERS_ADAPTER, USER_FIELDS, read_users
+from app.models.user import User
+from benchmarks.utils import timed
+from main import app
+
+
+def make_users(count: int) -> List[User]:
+    return [
+        User(id=i, email=f"user{i}@example.com", is_active=True, is_superuser=False)
+        for i in range(count)
+    ]
+
+
+def response_model_body(users: List[User]) -> bytes:
+    route = next(
+        r for r in app.routes if isinstance(r, APIRoute) and r.endpoint is read_users
+    )
+    # Sync endpoints have their response validated in the thread pool.
+    content = asyncio.run(
+        serialize_response(
+            field=route.response_field, response_content=users, is_coroutine=False
+        )
+    )
+    return JSONResponse(content).body
+
+
+def adapter_body(users: List[User], media_type: str) -> bytes:
+    return fieldset_response(
+        users, USER_FIELDS, Response(), media_type, USERS_ADAPTER
+    ).body
+
+
+def main(args: argparse.Namespace) -> None:
+    formats: Dict[str, Callable[[List[User]], bytes]] = {
+        "response_model json": response_model_body,
+        "TypeAdapter json": lambda users: adapter_body(users, JSON_MEDIA_TYPE),
+        "TypeAdapter msgpack": lambda users: adapter_body(users, MSGPACK_MEDIA_TYPE),
+    }
+    decoders: Dict[str, Callable[[bytes], object]] = {
+        "response_model json": json.loads,
+        "TypeAdapter json": json.loads,
+        "TypeAdapter msgpack": msgpack.unpackb,
+    }
+    print(
+        f"{'users':>6} {'format':<20} {'bytes':>9} "
+        f"{'encode p50/p95 ms':>20} {'decode p50/p95 ms':>20}"
+    )
+    for count in args.sizes:
+        users = make_users(count)
+        for name, encode in formats.items():
+            body = encode(users)
+            encoded = timed(lambda: encode(users), args.repeat)
+            decoded = timed(lambda: decoders[name](body), args.repeat)
+            print(
+                f"{count:>6} {name:<20} {len(body):>9} "
+                f"{encoded['p50_ms']:>10}/{encoded['p95_ms']:<9} "
+                f"{decoded['p50_ms']:>10}/{decoded['p95_ms']:<9}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,266 @@
+"""
+Load test of the users API: drives the ASGI app from `main.py` in-process with
+scenario mixes at a fixed concurrency and reports req/s and p50/p95/p99 per
+scenario and endpoint:
+
+    python -m benchmarks.load_test --concurrency 32 --output results.json
+    python -m benchmarks.load_test --baseline results.json --max-regression 0.2
+
+The database is a temporary SQLite file unless `--database-url` points at a
+scratch Postgres database; its tables are created, seeded and dropped again.
+With `--baseline`, the run exits with status 1 if any endpoint's p95 grew or
+its throughput dropped by more than `--max-regression` (a fraction).
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from itertools import count
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Generator, List, Optional
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api import deps
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.metrics import instrument_engine
+from app.core.security import create_access_token
+from app.db.base import Base
+from benchmarks.utils import BenchResult, print_results, seed_users
+from main import app
+
+USERS_URL = f"{settings.API_V1_STR}/users"
+SCENARIOS = ("signup_burst", "read_storm", "paginated_scan", "update_churn", "mixed")
+
+
+@dataclass
+class Operation:
+    endpoint: str
+    weight: int
+    call: Callable[[], Awaitable[bool]]
+
+
+class Workload:
+    """The requests each scenario is made of, bound to one client."""
+
+    def __init__(self, client: AsyncClient, user_count: int, seed: int) -> None:
+        self.client = client
+        self.user_count = user_count
+        self.random = random.Random(seed)
+        self.signups = count()
+        self.cursors: List[Optional[str]] = []
+        token = create_access_token(1)
+        self.auth_headers = {"Authorization": f"Bearer {token}"}
+
+    def operations(self, scenario: str) -> List[Operation]:
+        signup = Operation("POST /users/", 1, self.signup)
+        read = Operation("GET /users/{id}", 8, self.read_by_id)
+        read_email = Operation("GET /users/by-email/{email}", 2, self.read_by_email)
+        scan = Operation("GET /users/?after=", 1, self.next_page)
+        update = Operation("PUT /users/{id}", 1, self.update)
+        return {
+            "signup_burst": [signup],
+            "read_storm": [read, read_email],
+            "paginated_scan": [scan],
+            "update_churn": [update],
+            "mixed": [signup, read, read_email, scan, update],
+        }[scenario]
+
+    def random_user_id(self) -> int:
+        return self.random.randint(1, self.user_count)
+
+    async def signup(self) -> bool:
+        data = {
+            "email": f"signup{next(self.signups)}@example.com",
+            "password": "load-test-password",
+        }
+        response = await self.client.post(f"{USERS_URL}/", json=data)
+        return response.status_code == 201
+
+    async def read_by_id(self) -> bool:
+        response = await self.client.get(
+            f"{USERS_URL}/{self.random_user_id()}", headers=self.auth_headers
+        )
+        return response.status_code == 200
+
+    async def read_by_email(self) -> bool:
+        email = f"user{self.random_user_id() - 1}@example.com"
+        response = await self.client.get(
+            f"{USERS_URL}/by-email/{email}", headers=self.auth_headers
+        )
+        return response.status_code == 200
+
+    async def next_page(self) -> bool:
+        # Each in-flight scan keeps its own cursor and restarts at the end.
+        if not self.cursors:
+            self.cursors.append(None)
+        after = self.cursors.pop()
+        params = {"limit": "50", **({"after": after} if after else {})}
+        response = await self.client.get(f"{USERS_URL}/", params=params)
+        self.cursors.insert(0, response.headers.get("X-Next-Cursor"))
+        return response.status_code == 200
+
+    async def update(self) -> bool:
+        data = {"is_active": self.random.random() < 0.5}
+        response = await self.client.put(
+            f"{USERS_URL}/{self.random_user_id()}", json=data
+        )
+        return response.status_code == 200
+
+
+async def run_scenario(
+    workload: Workload, scenario: str, total: int, concurrency: int
+) -> List[BenchResult]:
+    """
+    Issue `total` requests drawn from the scenario's weighted operations with at
+    most `concurrency` in flight; latencies are kept per endpoint.
+    """
+    operations = workload.operations(scenario)
+    weights = [op.weight for op in operations]
+    results = {
+        op.endpoint: BenchResult(f"{scenario} {op.endpoint}") for op in operations
+    }
+    remaining = iter(range(total))
+
+    async def worker() -> None:
+        for _ in remaining:
+            op = workload.random.choices(operations, weights)[0]
+            started = time.perf_counter()
+            ok = await op.call()
+            result = results[op.endpoint]
+            result.latencies.append(time.perf_counter() - started)
+            if not ok:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    for result in results.values():
+        result.elapsed = elapsed
+    return [result for result in results.values() if result.latencies]
+
+
+def use_database(engine: Engine) -> None:
+    """Point the app's session dependencies at `engine`."""
+    session_local = sessionmaker(autoflush=False, bind=engine)
+
+    def get_db() -> Generator[Session, None, None]:
+        db = session_local()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[deps.get_db] = get_db
+    app.dependency_overrides[deps.get_read_db] = get_db
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    max_regression: float,
+) -> List[str]:
+    """Describe every endpoint that regressed by more than `max_regression`."""
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            failures.append(
+                f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms"
+            )
+        if current["rps"] < previous["rps"] * (1 - max_regression):
+            failures.append(f"{name}: rps {previous['rps']} -> {current['rps']}")
+        if current["errors"] > previous["errors"]:
+            failures.append(
+                f"{name}: errors {previous['errors']} -> {current['errors']}"
+            )
+    return failures
+
+
+async def run(args: argparse.Namespace, database_url: str) -> List[BenchResult]:
+    engine = create_engine(
+        database_url,
+        **(
+            {"connect_args": {"check_same_thread": False}}
+            if database_url.startswith("sqlite")
+            else {}
+        ),
+    )
+    instrument_engine(engine)
+    seed_users(engine, args.users)
+    use_database(engine)
+    # Errors become 500s and count against the endpoint instead of aborting.
+    transport = ASGITransport(
+        app=app, raise_app_exceptions=False  # type: ignore[arg-type]
+    )
+    results: List[BenchResult] = []
+    try:
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            workload = Workload(client, args.users, args.seed)
+            for scenario in args.scenarios:
+                total = args.signups if scenario == "signup_burst" else args.requests
+                results += await run_scenario(
+                    workload, scenario, total, args.concurrency
+                )
+    finally:
+        app.dependency_overrides.clear()
+        password_hasher.shutdown()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+    return results
+
+
+def main(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        results = asyncio.run(run(args, database_url))
+    print_results(results)
+
+    summaries = {result.name: result.summary() for result in results}
+    if args.output:
+        report: Dict[str, Any] = {
+            "config": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+            "python": platform.python_version(),
+            "results": summaries,
+        }
+        args.output.write_text(json.dumps(report, indent=2, default=str) + "\n")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        failures = compare(summaries, baseline, args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--database-url")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--signups", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Sequence
+
+from sqlalchemy import Engine, insert
+
+from app.db.base import Base
+from app.models.user import User
+
+
+@dataclass
+class BenchResult:
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    elapsed: float = 0.0
+    errors: int = 0
+
+    @property
+    def requests_per_second(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(self.requests_per_second, 1),
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 3),
+        }
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """p50 and p95 of `repeat` calls of `fn`, after one warm-up call."""
+    fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+    }
+
+
+def seed_users(engine: Engine, count: int) -> None:
+    """Create the schema and insert `count` users with a placeholder hash."""
+    Base.metadata.create_all(bind=engine)
+    rows = [
+        {"email": f"user{i}@example.com", "password": "not-a-real-hash"}
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        for start in range(0, len(rows), 10_000):
+            conn.execute(insert(User), rows[start : start + 10_000])
+
+
+async def run_concurrently(
+    name: str,
+    request: Callable[[int], Awaitable[bool]],
+    total: int,
+    concurrency: int,
+) -> BenchResult:
+    """
+    Issue `total` calls of `request(i)` with at most `concurrency` in flight.
+    `request` returns whether the call succeeded.
+    """
+    result = BenchResult(name=name)
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for i in counter:
+            started = time.perf_counter()
+            ok = await request(i)
+            result.latencies.append(time.perf_counter() - started)
+            if not ok:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def print_results(results: Sequence[BenchResult]) -> None:
+    columns = ["requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"]
+    width = max(len(r.name) for r in results)
+    print(f"{'scenario':<{width}}  " + "  ".join(f"{c:>9}" for c in columns))
+    for r in results:
+        summary = r.summary()
+        print(f"{r.name:<{width}}  " + "  ".join(f"{summary[c]:>9}" for c in columns))
@@ -1,14 +1,87 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import anyio.to_thread
+from fastapi import APIRouter, FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.routing import APIRoute
-from app.api.v1.endpoints import users
+from app.api.deps import activity_tracker
+from app.api.middleware import (
+    ConcurrencyLimitMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+)
+from app.api.v1.endpoints import internal, login, users, users_async
+from app.core.concurrency import concurrency_limiters
 from app.core.config import settings
+from app.core.hashing import HashingUnavailableError, password_hasher
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, metrics_registry
+from app.core.profiling import ProfileStore
+from app.core.rate_limit import RateLimitExceeded
+from app.crud.audit import audit_log
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Sync endpoints beyond what the DB pool can serve would only hold a thread
+    # while waiting for a connection.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = (
+        settings.THREADPOOL_SIZE or settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    )
+    for worker in (audit_log, activity_tracker):
+        if worker is not None:
+            worker.start()
+    yield
+    password_hasher.shutdown()
+    for worker in (audit_log, activity_tracker):
+        if worker is not None:
+            await run_in_threadpool(worker.stop)
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME or "User Management Service",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
-app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
+
+def users_router() -> APIRouter:
+    """The users endpoints of the `USE_ASYNC_DB` mode."""
+    return users_async.router if settings.USE_ASYNC_DB else users.router
+
+
+app.include_router(login.router, prefix=settings.API_V1_STR, tags=["login"])
+app.include_router(
+    users_router(), prefix=f"{settings.API_V1_STR}/users", tags=["users"]
+)
+app.include_router(
+    internal.router, prefix=f"{settings.API_V1_STR}/internal", tags=["internal"]
+)
+
+
+@app.exception_handler(HashingUnavailableError)
+async def hashing_unavailable_handler(
+    request: Request, exc: HashingUnavailableError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(
+    request: Request, exc: RateLimitExceeded
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many attempts, please retry later."},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
 
 
 @app.get("/")
@@ -16,6 +89,32 @@ def read_root() -> dict:
     return {"message": "Welcome to the User Management Service"}
 
 
+# Added before the metrics middleware so that it runs inside it and rejected
+# requests are counted too.
+if concurrency_limiters is not None:
+    app.add_middleware(ConcurrencyLimitMiddleware, limiters=concurrency_limiters)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics() -> PlainTextResponse:
+        return PlainTextResponse(
+            metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE
+        )
+
+
+# Outermost, so profiles cover the other middleware too.
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=ProfileStore(Path(settings.PROFILING_DIR), settings.PROFILING_MAX_BYTES),
+        interval=settings.PROFILING_INTERVAL_SECONDS,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        secret=settings.PROFILING_SECRET,
+        max_concurrent=settings.PROFILING_MAX_CONCURRENT,
+    )
+
 # Add this debugging code
 print("Registered routes:")
 for route in app.routes:
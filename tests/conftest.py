@@ -1,41 +1,125 @@
 import pytest
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.engine import Engine
 from fastapi.testclient import TestClient
-from typing import Generator, Dict, Any, cast
+from typing import Generator, Dict, Any, List, cast
 
 from app.db.base import Base
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 from main import app
 from app.api import deps
+from app.crud.activity import ActivityTracker
+from app.crud.audit import AuditLog
 from app.crud.user import user as user_crud
+from app.crud.user_async import user_async
+from app.crud.user import user_cache, user_counter
 from app.schemas.user import UserCreate
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    return "asyncio"
+
+
 @pytest.fixture(scope="session")
 def db_engine() -> Generator[Engine, None, None]:
     engine = create_engine(str(settings.TEST_SQLALCHEMY_DATABASE_URI))
+    instrument_engine(engine)
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def clear_user_caches() -> None:
+    # Rows cached or counted by one test are rolled back before the next runs.
+    if user_cache is not None:
+        user_cache.clear()
+    if user_counter is not None:
+        user_counter.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def audit_log(monkeypatch: pytest.MonkeyPatch) -> AuditLog:
+    """
+    A fresh audit log in place of the app's. It is never started, so events
+    stay queued until a test binds `session_factory` and calls `flush`.
+    """
+    log = AuditLog(
+        sessionmaker(),
+        max_pending=1000,
+        batch_size=100,
+        flush_interval=1.0,
+        enqueue_timeout=0.0,
+    )
+    monkeypatch.setattr(user_crud, "audit", log)
+    monkeypatch.setattr(user_async, "audit", log)
+    return log
+
+
+@pytest.fixture(autouse=True)
+def activity_tracker(monkeypatch: pytest.MonkeyPatch) -> ActivityTracker:
+    """
+    A fresh activity tracker in place of the app's. It is never started, so
+    touches stay pending until a test binds `session_factory` and flushes.
+    """
+    tracker = ActivityTracker(
+        sessionmaker(), flush_interval=1.0, staleness=60.0, max_users=1000
+    )
+    monkeypatch.setattr(deps, "activity_tracker", tracker)
+    return tracker
+
+
+@pytest.fixture(autouse=True)
+def reset_login_rate_limiter() -> None:
+    if deps.login_rate_limiter is not None:
+        deps.login_rate_limiter.store.clear()
+
+
 @pytest.fixture(scope="function")
 def db_session(db_engine: Engine) -> Generator[Session, None, None]:
     connection = db_engine.connect()
     transaction = connection.begin()
-    session = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+    # Commits and rollbacks inside the code under test only release or roll
+    # back savepoints, so the outer transaction survives until teardown.
+    session = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=connection,
+        join_transaction_mode="create_savepoint",
+    )()
     yield session
     session.close()
     transaction.rollback()
     connection.close()
 
 
+@pytest.fixture(scope="function")
+def sql_statements(db_session: Session) -> Generator[List[str], None, None]:
+    """
+    SQL statements sent through `db_session`, leaving out the savepoints that
+    only exist because of the test transaction.
+    """
+    statements: List[str] = []
+    connection = db_session.connection()
+
+    def before_cursor_execute(
+        conn: Any, cursor: Any, statement: str, *args: Any
+    ) -> None:
+        if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK TO")):
+            statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+
 @pytest.fixture(scope="function")
 def client(db_session: Session) -> Generator[TestClient, None, None]:
     def override_get_db() -> Generator[Session, None, None]:
@@ -45,6 +129,7 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
             pass
 
     app.dependency_overrides[deps.get_db] = override_get_db
+    app.dependency_overrides[deps.get_read_db] = override_get_db
     with TestClient(app) as c:
         yield c
 
@@ -0,0 +1,145 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Any, Dict, List
+
+from app.api import deps
+from app.core.config import settings
+from app.crud.activity import ActivityTracker
+from app.crud.user import user as user_crud
+from app.models.user import User
+from app.schemas.user import UserCreate
+from tests.utils.utils import random_email, random_lower_string
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_tracker(db_session: Session, **options: Any) -> ActivityTracker:
+    defaults: Dict[str, Any] = dict(flush_interval=1.0, staleness=60.0, max_users=1000)
+    return ActivityTracker(
+        sessionmaker(
+            bind=db_session.connection(), join_transaction_mode="create_savepoint"
+        ),
+        **{**defaults, **options},
+    )
+
+
+def create_users(db_session: Session, count: int) -> List[User]:
+    return list(
+        user_crud.create_multi(
+            db_session,
+            objs_in=[{"email": random_email(), "password": "x"} for _ in range(count)],
+            hashed_passwords=["x"] * count,
+        )
+    )
+
+
+def updates(statements: List[str]) -> List[str]:
+    return [s for s in statements if s.startswith("UPDATE user")]
+
+
+def test_touches_are_coalesced_under_load(
+    db_session: Session, sql_statements: List[str]
+) -> None:
+    """Test that many concurrent touches become one UPDATE per flush."""
+    users = create_users(db_session, 50)
+    tracker = make_tracker(db_session)
+    ids = [user.id for user in users]
+
+    def hammer(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(2000):
+            tracker.touch(rng.choice(ids), login=rng.random() < 0.01)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(hammer, range(8)))
+    stats = tracker.stats
+    assert stats.touches == 16_000
+    assert stats.pending == len(ids)
+
+    sql_statements.clear()
+    assert tracker.flush() == len(ids)
+    assert len(updates(sql_statements)) == 1
+    db_session.expire_all()
+    for user in users:
+        db_user = db_session.get(User, user.id)
+        assert db_user is not None and db_user.last_seen_at is not None
+        assert db_user.version == user.version
+
+
+def test_staleness_bounds_rewrites(
+    db_session: Session, sql_statements: List[str]
+) -> None:
+    """Test that users seen again soon after a write aren't written again."""
+    (user,) = create_users(db_session, 1)
+    clock = FakeClock()
+    tracker = make_tracker(db_session, staleness=60.0, clock=clock)
+    tracker.touch(user.id)
+    assert tracker.flush() == 1
+
+    clock.now += 30
+    for _ in range(100):
+        tracker.touch(user.id)
+    assert tracker.stats.skipped == 100
+    sql_statements.clear()
+    assert tracker.flush() == 0
+    assert updates(sql_statements) == []
+
+    tracker.touch(user.id, login=True)
+    clock.now += 31
+    tracker.touch(user.id)
+    assert tracker.flush() == 1
+    db_session.expire_all()
+    db_user = db_session.get(User, user.id)
+    assert db_user is not None and db_user.last_login_at is not None
+    assert db_user.last_seen_at is not None
+    assert db_user.last_seen_at > db_user.last_login_at
+
+
+def test_flush_batches_and_bounds(
+    db_session: Session, sql_statements: List[str]
+) -> None:
+    """Test UPDATE batching and the cap on pending users."""
+    users = create_users(db_session, 5)
+    tracker = make_tracker(db_session, batch_size=2, max_users=4)
+    for user in users:
+        tracker.touch(user.id)
+    assert (tracker.stats.pending, tracker.stats.dropped) == (4, 1)
+    sql_statements.clear()
+    assert tracker.flush() == 4
+    assert len(updates(sql_statements)) == 2
+
+
+def test_login_and_requests_are_tracked(
+    client: TestClient, db_session: Session, activity_tracker: ActivityTracker
+) -> None:
+    """Test that logins and authenticated requests touch the user."""
+    password = random_lower_string()
+    user = user_crud.create(
+        db_session,
+        obj_in=UserCreate(email=random_email(), password=password),
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": user.email, "password": password},
+    )
+    token = response.json()["access_token"]
+    assert activity_tracker.stats.pending == 1
+    deps.get_current_user(db=db_session, token=token)
+    assert activity_tracker.stats.touches == 2
+
+    activity_tracker.session_factory = sessionmaker(
+        bind=db_session.connection(), join_transaction_mode="create_savepoint"
+    )
+    activity_tracker.flush()
+    db_session.expire_all()
+    db_user = db_session.get(User, user.id)
+    assert db_user is not None
+    assert db_user.last_login_at is not None and db_user.last_seen_at is not None
@@ -0,0 +1,130 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+from typing import List
+
+from app.core.config import settings
+from app.crud.audit import REDACTED, AuditLog
+from app.crud.user import user as user_crud
+from app.models.audit import AuditEvent
+from app.schemas.user import UserCreate, UserUpdate
+from tests.utils.user import create_random_user, user_authentication_headers
+from tests.utils.utils import random_email, random_lower_string
+
+
+def bind_to_test_transaction(audit_log: AuditLog, db_session: Session) -> None:
+    audit_log.session_factory = sessionmaker(
+        bind=db_session.connection(), join_transaction_mode="create_savepoint"
+    )
+
+
+def events_for(db_session: Session, entity_id: int) -> List[AuditEvent]:
+    return list(
+        db_session.scalars(
+            select(AuditEvent)
+            .where(AuditEvent.entity == "user", AuditEvent.entity_id == entity_id)
+            .order_by(AuditEvent.id)
+        )
+    )
+
+
+def test_writes_are_audited(
+    db_session: Session, audit_log: AuditLog, sql_statements: List[str]
+) -> None:
+    """Test that CRUD writes queue diffs that are flushed in one INSERT."""
+    bind_to_test_transaction(audit_log, db_session)
+    user = create_random_user(db_session)
+    user = user_crud.update(
+        db_session,
+        db_obj=user,
+        obj_in=UserUpdate(is_active=False, is_superuser=False, password="new-pass"),
+    )
+    user_crud.update_by_id(db_session, id=user.id, obj_in={"is_superuser": True})
+    # Writes that change nothing are not audited.
+    user_crud.update_by_id(
+        db_session, id=user.id, obj_in={"is_superuser": True, "is_active": False}
+    )
+    user_crud.remove(db_session, id=user.id)
+    assert audit_log.stats.pending == 4
+
+    sql_statements.clear()
+    assert audit_log.flush() == 4
+    inserts = [s for s in sql_statements if s.startswith("INSERT INTO audit_event")]
+    assert len(inserts) == 1
+
+    created, updated, updated_by_id, deleted = events_for(db_session, user.id)
+    assert created.action == "create"
+    assert created.changes["email"] == {"new": user.email}
+    assert created.changes["password"] == {"new": REDACTED}
+    assert updated.action == "update"
+    assert updated.changes == {
+        "is_active": {"old": True, "new": False},
+        "password": {"old": REDACTED, "new": REDACTED},
+    }
+    assert updated_by_id.changes == {"is_superuser": {"old": False, "new": True}}
+    assert (deleted.action, deleted.changes) == ("delete", {})
+    stats = audit_log.stats
+    assert (stats.flushed, stats.batches, stats.pending) == (4, 1, 0)
+
+
+def test_audit_actor(
+    client: TestClient, db_session: Session, audit_log: AuditLog
+) -> None:
+    """Test that events are attributed to the bearer token's user."""
+    bind_to_test_transaction(audit_log, db_session)
+    password = random_lower_string()
+    actor = user_crud.create(
+        db_session, obj_in=UserCreate(email=random_email(), password=password)
+    )
+    headers = user_authentication_headers(
+        client=client, email=actor.email, password=password
+    )
+    user = create_random_user(db_session)
+    url = f"{settings.API_V1_STR}/users/{user.id}"
+    assert client.put(url, json={"is_active": False}, headers=headers).is_success
+    assert client.put(url, json={"is_active": True}).is_success
+    audit_log.flush()
+
+    events = events_for(db_session, user.id)
+    assert [event.actor_id for event in events] == [None, actor.id, None]
+
+
+def test_full_queue_drops_events(db_session: Session) -> None:
+    """Test that events beyond `max_pending` are dropped and counted."""
+    audit_log = AuditLog(
+        sessionmaker(),
+        max_pending=2,
+        batch_size=10,
+        flush_interval=1.0,
+        enqueue_timeout=0.01,
+    )
+    assert audit_log.record("delete", "user", 1)
+    assert audit_log.record("delete", "user", 2)
+    assert not audit_log.record("delete", "user", 3)
+    stats = audit_log.stats
+    assert (stats.enqueued, stats.dropped, stats.pending) == (2, 1, 2)
+
+    # Unbound sessions can't write: the batch is lost, not retried forever.
+    assert audit_log.flush() == 0
+    assert (audit_log.stats.failed, audit_log.stats.pending) == (2, 0)
+
+
+def test_writer_flushes_on_stop(db_session: Session) -> None:
+    """Test that the writer thread flushes in batches and drains on stop."""
+    audit_log = AuditLog(
+        sessionmaker(),
+        max_pending=100,
+        batch_size=2,
+        flush_interval=60.0,
+        enqueue_timeout=1.0,
+    )
+    bind_to_test_transaction(audit_log, db_session)
+    user = create_random_user(db_session)
+    audit_log.start()
+    for _ in range(5):
+        audit_log.record("update", "user", user.id, {"is_active": {"new": False}})
+    audit_log.stop()
+
+    assert len(events_for(db_session, user.id)) == 5
+    assert audit_log.stats.flushed == 5
+    assert audit_log.stats.batches >= 3
@@ -0,0 +1,165 @@
+import pytest
+import time
+from datetime import timedelta
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List
+
+from app.api import deps
+from app.core.config import settings
+from app.core.revocation import BloomFilter, TokenRevocationSet
+from app.core.security import create_access_token
+from app.crud.user import user as user_crud
+from app.schemas.user import UserCreate
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_email, random_lower_string
+
+
+@pytest.fixture
+def decode_calls(monkeypatch: pytest.MonkeyPatch) -> Iterator[List[str]]:
+    """Record calls to `jwt.decode` made by the auth dependency."""
+    calls: List[str] = []
+    original = jwt.decode
+
+    def counting_decode(token: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        calls.append(token)
+        return original(token, *args, **kwargs)
+
+    monkeypatch.setattr(deps.jwt, "decode", counting_decode)
+    if deps.token_cache is not None:
+        deps.token_cache.clear()
+    yield calls
+
+
+def test_get_current_user(db_session: Session, decode_calls: List[str]) -> None:
+    """Test that a token is verified once and then served from the cache."""
+    user = create_random_user(db_session)
+    token = create_access_token(user.id)
+    assert deps.get_current_user(db=db_session, token=token).id == user.id
+    assert deps.get_current_user(db=db_session, token=token).id == user.id
+    assert len(decode_calls) == 1
+
+
+def test_expired_token_is_rejected(decode_calls: List[str]) -> None:
+    """Test that expired tokens are rejected and never cached."""
+    token = create_access_token(1, expires_delta=timedelta(seconds=-1))
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            deps.decode_token(token)
+        assert exc_info.value.status_code == 403
+    assert len(decode_calls) == 2
+
+
+def test_secret_key_rotation_clears_cache(
+    decode_calls: List[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that rotating SECRET_KEY invalidates previously verified tokens."""
+    token = create_access_token(1)
+    assert deps.decode_token(token).sub == 1
+    monkeypatch.setattr(settings, "SECRET_KEY", "rotated-secret-key")
+    with pytest.raises(HTTPException):
+        deps.decode_token(token)
+    assert len(decode_calls) == 2
+
+
+@pytest.fixture
+def claims_only(monkeypatch: pytest.MonkeyPatch) -> TokenRevocationSet:
+    """Enable claims-only auth with a fresh revocation set."""
+    revocations = TokenRevocationSet(max_token_age=3600, capacity=100)
+    monkeypatch.setattr(settings, "AUTH_CLAIMS_ONLY", True)
+    monkeypatch.setattr(user_crud, "revocations", revocations)
+    if deps.token_cache is not None:
+        deps.token_cache.clear()
+    return revocations
+
+
+def login(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": password},
+    )
+    assert response.status_code == 200, response.text
+    return str(response.json()["access_token"])
+
+
+def test_claims_only_auth(
+    client: TestClient,
+    db_session: Session,
+    sql_statements: List[str],
+    claims_only: TokenRevocationSet,
+) -> None:
+    """Test that claims-only tokens authorize without queries until revoked."""
+    password = random_lower_string()
+    user = user_crud.create(
+        db_session,
+        obj_in=UserCreate(email=random_email(), password=password, is_superuser=True),
+    )
+    token = login(client, user.email, password)
+
+    sql_statements.clear()
+    current = deps.get_current_active_superuser(
+        deps.get_current_user(db=db_session, token=token)
+    )
+    assert current.id == user.id and current.is_superuser
+    assert sql_statements == []
+
+    user_crud.update_by_id(db_session, id=user.id, obj_in={"is_superuser": False})
+    sql_statements.clear()
+    current = deps.get_current_user(db=db_session, token=token)
+    assert current.email == user.email and not current.is_superuser
+    assert any(s.startswith("SELECT") for s in sql_statements)
+    with pytest.raises(HTTPException):
+        deps.get_current_active_superuser(current)
+
+    fresh = deps.get_current_user(
+        db=db_session, token=login(client, user.email, password)
+    )
+    assert fresh.email is None and not fresh.is_superuser
+
+    user_crud.remove(db_session, id=user.id)
+    with pytest.raises(HTTPException) as exc_info:
+        deps.get_current_user(db=db_session, token=token)
+    assert exc_info.value.status_code == 404
+
+
+def test_claims_from_before_startup_are_not_trusted(
+    db_session: Session, claims_only: TokenRevocationSet
+) -> None:
+    """Test that tokens older than the revocation set fall back to the database."""
+    user = create_random_user(db_session)
+    claims = {"is_active": True, "is_superuser": True, "token_version": user.version}
+    token = create_access_token(user.id, claims=claims)
+    assert deps.get_current_user(db=db_session, token=token).email is None
+    claims_only.since += 5
+    assert deps.get_current_user(db=db_session, token=token).email == user.email
+
+
+def test_token_revocation_set() -> None:
+    """Test revocation by version and pruning of expired revocations."""
+    now = time.time()
+    revocations = TokenRevocationSet(max_token_age=60, capacity=2)
+    assert not revocations.is_revoked(1, 1, now)
+    assert revocations.is_revoked(1, 1, None)
+    revocations.revoke(1, 3)
+    revocations.revoke(1, 2)
+    assert revocations.is_revoked(1, 2, now)
+    assert not revocations.is_revoked(1, 3, now)
+    assert not revocations.is_revoked(2, 1, now)
+
+    revocations.max_token_age = 0
+    for user_id in range(2, 5):
+        revocations.revoke(user_id, 1)
+    assert len(revocations) < 4
+    assert not revocations.is_revoked(1, 1, now)
+
+
+def test_bloom_filter() -> None:
+    """Test that the Bloom filter has no false negatives and few false positives."""
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for key in range(1000):
+        bloom.add(str(key))
+    assert all(str(key) in bloom for key in range(1000))
+    false_positives = sum(str(key) in bloom for key in range(1000, 11000))
+    assert false_positives < 300
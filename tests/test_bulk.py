@@ -0,0 +1,78 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.security import verify_password
+from app.crud.user import user as user_crud
+from app.schemas.user import UserCreate
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_email, random_lower_string
+
+
+def test_create_multi(db_session: Session) -> None:
+    """Test batched creation through the CRUD layer."""
+    users_in = [
+        UserCreate(email=random_email(), password=random_lower_string())
+        for _ in range(3)
+    ]
+    users = user_crud.create_multi(db_session, objs_in=users_in)
+    assert [u.email for u in users] == [u.email for u in users_in]
+    assert all(
+        verify_password(u_in.password, u.password) for u, u_in in zip(users, users_in)
+    )
+    assert user_crud.get_existing_emails(
+        db_session, emails=[u.email for u in users_in] + [random_email()]
+    ) == {u.email for u in users_in}
+
+
+def test_create_users_bulk_api(client: TestClient, db_session: Session) -> None:
+    """Test the per-item outcome of a mixed bulk request."""
+    existing = create_random_user(db_session)
+    new_email = random_email()
+    password = random_lower_string()
+    payload = {
+        "users": [
+            {"email": new_email, "password": password},
+            {"email": existing.email, "password": password},
+            {"email": "notanemail", "password": password},
+            {"email": new_email, "password": password},
+            "not an object",
+        ]
+    }
+    response = client.post(f"{settings.API_V1_STR}/users/bulk", json=payload)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created"], body["conflicts"], body["invalid"]) == (1, 2, 2)
+    statuses = [item["status"] for item in body["results"]]
+    assert statuses == ["created", "conflict", "invalid", "conflict", "invalid"]
+    assert body["results"][0]["user"]["email"] == new_email
+
+    user = user_crud.get_by_email(db_session, email=new_email)
+    assert user and verify_password(password, user.password)
+
+
+def test_create_users_bulk_too_many(client: TestClient) -> None:
+    """Test that oversized batches are rejected up front."""
+    users = [
+        {"email": random_email(), "password": random_lower_string()}
+        for _ in range(settings.BULK_CREATE_MAX_USERS + 1)
+    ]
+    response = client.post(f"{settings.API_V1_STR}/users/bulk", json={"users": users})
+    assert response.status_code == 422
+
+
+def test_create_users_bulk_beyond_hashing_bound(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that batches larger than the hashing bound wait rather than fail."""
+    monkeypatch.setattr(password_hasher, "max_pending", 2)
+    users = [
+        {"email": random_email(), "password": random_lower_string()}
+        for _ in range(password_hasher.max_pending * 2 + 1)
+    ]
+    response = client.post(f"{settings.API_V1_STR}/users/bulk", json={"users": users})
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == len(users)
+    assert password_hasher.pending == 0
@@ -0,0 +1,65 @@
+import time
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.core.cache import LRUTTLCache
+from app.crud.user import user as user_crud
+from app.schemas.user import UserUpdate
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_email
+
+
+def test_lru_ttl_cache_eviction() -> None:
+    """Test that the least recently used entry is evicted when full."""
+    cache = LRUTTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 2)
+
+
+def test_lru_ttl_cache_expiry() -> None:
+    """Test that entries expire after their TTL."""
+    cache = LRUTTLCache(max_size=10, ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats.expirations == 1
+
+
+def test_get_is_read_through(db_session: Session, sql_statements: List[str]) -> None:
+    """Test that repeated lookups by id and email are served from the cache."""
+    user = create_random_user(db_session)
+    user_id, email = user.id, user.email
+    db_session.expunge_all()
+    sql_statements.clear()
+
+    assert user_crud.get(db_session, id=user_id)
+    assert len(sql_statements) == 1
+    by_id = user_crud.get(db_session, id=user_id)
+    by_email = user_crud.get_by_email(db_session, email=email)
+    assert by_id is by_email
+    assert by_id is not None and by_id.email == email
+    assert len(sql_statements) == 1
+
+
+def test_update_and_remove_invalidate(db_session: Session) -> None:
+    """Test that writes through the CRUD layer invalidate cached rows."""
+    user = create_random_user(db_session)
+    old_email = user.email
+    assert user_crud.get_by_email(db_session, email=old_email)
+
+    new_email = random_email()
+    user_crud.update(db_session, db_obj=user, obj_in=UserUpdate(email=new_email))
+    assert user_crud.get_by_email(db_session, email=old_email) is None
+    cached = user_crud.get_by_email(db_session, email=new_email)
+    assert cached is not None and cached.id == user.id
+
+    user_crud.remove(db_session, id=user.id)
+    assert user_crud.get(db_session, id=user.id) is None
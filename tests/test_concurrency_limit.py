@@ -0,0 +1,165 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pathlib import Path
+from sqlalchemy import exc
+from typing import Any, List
+
+from app.api.middleware import ConcurrencyLimitMiddleware, route_class
+from app.core.concurrency import (
+    AIMDLimit,
+    ConcurrencyLimiter,
+    Overloaded,
+    concurrency_limiters,
+)
+from app.core.config import settings
+from app.core.metrics import RequestMetrics, current_request
+from app.db.db_utils import create_pooled_engine
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limit(**options: Any) -> AIMDLimit:
+    defaults = dict(
+        initial=4, min_limit=1, max_limit=8, latency_target=1.0, pool_wait_target=0.1
+    )
+    return AIMDLimit(**{**defaults, **options})
+
+
+def test_aimd_limit() -> None:
+    """Test that the limit grows while used and backs off on overload."""
+    clock = FakeClock()
+    limit = make_limit(clock=clock)
+    for _ in range(4):
+        limit.on_sample(0.1, 0.0, in_flight=4, dropped=False)
+    assert limit.current == pytest.approx(5, abs=0.1)
+    # Idle capacity isn't a reason to grow.
+    limit.on_sample(0.1, 0.0, in_flight=1, dropped=False)
+    assert limit.increases == 4
+
+    before = limit.current
+    limit.on_sample(2.0, 0.0, in_flight=4, dropped=False)
+    assert limit.current == pytest.approx(before * 0.9)
+    # Further slow requests of the same episode don't compound the decrease.
+    limit.on_sample(0.1, 0.5, in_flight=4, dropped=False)
+    limit.on_sample(0.1, 0.0, in_flight=4, dropped=True)
+    assert limit.decreases == 1
+
+    for _ in range(50):
+        clock.now += 1.0
+        limit.on_sample(0.1, 0.0, in_flight=4, dropped=True)
+    assert limit.current == 1
+
+
+@pytest.mark.anyio
+async def test_limiter_queues_and_sheds() -> None:
+    """Test FIFO hand-over of slots, the queue bound and the queue timeout."""
+    limiter = ConcurrencyLimiter(
+        make_limit(initial=1, max_limit=1), max_queue=2, queue_timeout=0.2
+    )
+    await limiter.acquire()
+    admitted: List[int] = []
+
+    async def wait(n: int) -> None:
+        await limiter.acquire()
+        admitted.append(n)
+
+    first = asyncio.create_task(wait(1))
+    second = asyncio.create_task(wait(2))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded):
+        await limiter.acquire()
+    assert (limiter.stats.queued, limiter.stats.rejected) == (2, 1)
+
+    limiter.release(0.01, 0.0, dropped=False)
+    await first
+    assert admitted == [1]
+    with pytest.raises(Overloaded):
+        await second
+    stats = limiter.stats
+    assert (stats.in_flight, stats.queued, stats.timed_out) == (1, 0, 1)
+
+
+def test_middleware_adapts_to_pool_waits() -> None:
+    """Test that requests waiting on the DB pool shrink their class's limit."""
+    limiter = ConcurrencyLimiter(make_limit(), max_queue=10, queue_timeout=1.0)
+    app = FastAPI()
+
+    @app.get("/")
+    def slow_checkout() -> dict:
+        request = current_request.get()
+        assert request is not None
+        request.pool_wait += 0.5
+        return {}
+
+    app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        limiters={"read": limiter},
+        classify=lambda scope: "read",
+    )
+    assert TestClient(app).get("/").status_code == 200
+    stats = limiter.stats
+    assert (stats.admitted, stats.in_flight, stats.decreases) == (1, 0, 1)
+    assert stats.limit < 4
+
+
+def test_overloaded_requests_get_503(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that requests the limiter can't admit are shed with Retry-After."""
+    assert concurrency_limiters is not None
+    saturated = ConcurrencyLimiter(
+        make_limit(initial=0, min_limit=0), max_queue=0, queue_timeout=0.0
+    )
+    monkeypatch.setitem(concurrency_limiters, "read", saturated)
+    response = client.get(f"{settings.API_V1_STR}/users/1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert saturated.stats.rejected == 1
+    # Other classes are limited separately.
+    response = client.post(f"{settings.API_V1_STR}/login/access-token", data={})
+    assert response.status_code == 422
+
+
+def test_route_classes() -> None:
+    """Test which limit each API request counts against."""
+    users = f"{settings.API_V1_STR}/users"
+
+    def classify(method: str, path: str) -> Any:
+        return route_class({"method": method, "path": path})
+
+    assert classify("POST", f"{settings.API_V1_STR}/login/access-token") == "auth"
+    assert classify("GET", f"{users}/1") == "read"
+    assert classify("POST", f"{users}/lookup") == "read"
+    assert classify("POST", f"{users}/bulk") == "hashing"
+    assert classify("PUT", f"{users}/1") == "write"
+    assert classify("DELETE", f"{users}/1") == "write"
+    assert classify("GET", f"{users}/export") is None
+    assert classify("GET", "/metrics") is None
+
+
+def test_pool_wait_is_attributed_to_request(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that time spent waiting for a connection is added to the request."""
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.05)
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    request = RequestMetrics()
+    token = current_request.set(request)
+    try:
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+    finally:
+        current_request.reset(token)
+        engine.dispose()
+    assert request.pool_wait >= 0.05
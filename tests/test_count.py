@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.core.config import settings
+from app.crud.user import user as user_crud
+from app.models.user import User
+from app.schemas.user import UserCreate, UserUpdate
+from tests.utils.utils import random_email, random_lower_string
+
+USERS_URL = f"{settings.API_V1_STR}/users"
+
+
+def exact_count(db: Session, **filters: bool) -> int:
+    query = select(func.count()).select_from(User).filter_by(**filters)
+    return db.scalar(query) or 0
+
+
+def api_count(client: TestClient, **params: bool) -> int:
+    response = client.get(f"{USERS_URL}/count", params=params)
+    assert response.status_code == 200, response.text
+    return int(response.json()["count"])
+
+
+def test_count_matches_database(client: TestClient, db_session: Session) -> None:
+    """Test that counts follow creates, updates and deletes."""
+    password = random_lower_string()
+    users = [
+        user_crud.create(
+            db_session,
+            obj_in=UserCreate(
+                email=random_email(), password=password, is_active=i % 2 == 0
+            ),
+        )
+        for i in range(4)
+    ]
+    assert api_count(client) == exact_count(db_session)
+
+    user_crud.create_multi(
+        db_session,
+        objs_in=[
+            UserCreate(email=random_email(), password=password, is_superuser=True)
+        ],
+        hashed_passwords=["not-a-real-hash"],
+    )
+    user_crud.remove(db_session, id=users[0].id)
+    db_obj = user_crud.get(db_session, id=users[1].id)
+    assert db_obj is not None
+    user_crud.update(db_session, db_obj=db_obj, obj_in=UserUpdate(is_active=True))
+    user_crud.update_by_id(
+        db_session, id=users[2].id, obj_in=UserUpdate(is_superuser=True)
+    )
+
+    for filters in [
+        {},
+        {"is_active": True},
+        {"is_active": False},
+        {"is_superuser": True, "is_active": True},
+    ]:
+        assert api_count(client, **filters) == exact_count(db_session, **filters)
+
+
+def test_counts_served_without_queries(
+    client: TestClient, db_session: Session, sql_statements: List[str]
+) -> None:
+    """Test that only the first count hits the database."""
+    api_count(client)
+    user_crud.create(
+        db_session,
+        obj_in=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    sql_statements.clear()
+    count = api_count(client, is_active=True)
+    assert sql_statements == []
+    assert count == exact_count(db_session, is_active=True)
+
+
+def test_count_reconciles(db_session: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that rows written behind the counter's back are picked up."""
+    assert user_crud.counter is not None
+    before = user_crud.count(db_session)
+    db_session.add(User(email=random_email(), password="not-a-real-hash"))
+    db_session.flush()
+    assert user_crud.count(db_session) == before
+    monkeypatch.setattr(user_crud.counter, "reconcile_interval", 0)
+    assert user_crud.count(db_session) == before + 1
+
+
+def test_read_users_total_count_header(client: TestClient, db_session: Session) -> None:
+    """Test that list responses carry the filtered total."""
+    response = client.get(f"{USERS_URL}/", params={"limit": 1, "is_active": True})
+    assert response.status_code == 200
+    assert int(response.headers["X-Total-Count"]) == exact_count(
+        db_session, is_active=True
+    )
@@ -0,0 +1,125 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Any, Dict, List
+
+from app.api.etags import if_match_versions
+from app.core.config import settings
+from app.crud.user import user as user_crud
+from app.schemas.user import UserUpdate
+from tests.utils.user import create_random_user
+
+USERS_URL = f"{settings.API_V1_STR}/users"
+
+
+def test_read_user_not_modified(client: TestClient, db_session: Session) -> None:
+    """Test that a matching If-None-Match gets an empty 304."""
+    user = create_random_user(db_session)
+    for url in [f"{USERS_URL}/{user.id}", f"{USERS_URL}/by-email/{user.email}"]:
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert etag == f'"{user.id}.{user.version}"'
+
+        unchanged = client.get(url, headers={"If-None-Match": f'"x", W/{etag}'})
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+        assert unchanged.headers["ETag"] == etag
+
+
+def test_etag_changes_on_update(client: TestClient, db_session: Session) -> None:
+    """Test that updates bump the version, so stale ETags no longer match."""
+    user = create_random_user(db_session)
+    url = f"{USERS_URL}/{user.id}"
+    etag = client.get(url).headers["ETag"]
+
+    updated = client.put(url, json={"is_active": False})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] == f'"{user.id}.{user.version + 1}"'
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == updated.headers["ETag"]
+
+
+def test_fieldset_etag(client: TestClient, db_session: Session) -> None:
+    """Test that narrowed representations get their own ETag."""
+    user = create_random_user(db_session)
+    url = f"{USERS_URL}/{user.id}"
+    full = client.get(url).headers["ETag"]
+    narrowed = client.get(url, params={"fields": "email"})
+    assert narrowed.headers["ETag"] != full
+    assert narrowed.json() == {"email": user.email}
+    response = client.get(
+        url,
+        params={"fields": "email"},
+        headers={"If-None-Match": narrowed.headers["ETag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_read_users_not_modified(client: TestClient, db_session: Session) -> None:
+    """Test list ETags, which change when a listed user changes."""
+    user = create_random_user(db_session)
+    params: Dict[str, Any] = {"order_by": "email", "limit": 1000}
+    extras: List[Dict[str, Any]] = [{}, {"fields": "email"}]
+    for is_active, extra in zip([False, True], extras):
+        response = client.get(f"{USERS_URL}/", params={**params, **extra})
+        etag = response.headers["ETag"]
+        unchanged = client.get(
+            f"{USERS_URL}/", params={**params, **extra}, headers={"If-None-Match": etag}
+        )
+        assert unchanged.status_code == 304
+        assert unchanged.headers["X-Total-Count"] == response.headers["X-Total-Count"]
+
+        client.put(f"{USERS_URL}/{user.id}", json={"is_active": is_active})
+        changed = client.get(
+            f"{USERS_URL}/", params={**params, **extra}, headers={"If-None-Match": etag}
+        )
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+
+
+def test_update_user_if_match(client: TestClient, db_session: Session) -> None:
+    """Test that PUT with a stale If-Match fails with 412 and changes nothing."""
+    user = create_random_user(db_session)
+    url = f"{USERS_URL}/{user.id}"
+    etag = client.get(url).headers["ETag"]
+
+    first = client.put(url, json={"is_active": False}, headers={"If-Match": etag})
+    assert first.status_code == 200, first.text
+
+    second = client.put(url, json={"is_active": True}, headers={"If-Match": etag})
+    assert second.status_code == 412
+    assert client.get(url).json()["is_active"] is False
+
+    for header in [first.headers["ETag"], "*"]:
+        response = client.put(
+            url, json={"is_active": True}, headers={"If-Match": header}
+        )
+        assert response.status_code == 200, header
+
+    missing = client.put(
+        f"{USERS_URL}/{user.id + 10**6}",
+        json={"is_active": True},
+        headers={"If-Match": etag},
+    )
+    assert missing.status_code == 412
+
+
+def test_update_stale_object(db_session: Session) -> None:
+    """Test that ORM updates of an outdated object raise StaleDataError."""
+    user = create_random_user(db_session)
+    stale = user_crud.get(db_session, id=user.id)
+    assert stale is not None
+    db_session.expunge(stale)
+    user_crud.update_by_id(db_session, id=user.id, obj_in={"is_active": False})
+    with pytest.raises(StaleDataError):
+        user_crud.update(db_session, db_obj=stale, obj_in=UserUpdate(is_superuser=True))
+
+
+def test_if_match_versions() -> None:
+    assert if_match_versions(None, 1) is None
+    assert if_match_versions('"1.2", *', 1) is None
+    assert if_match_versions('"1.2", "1.3.abcd", W/"1.4", "2.5", "junk"', 1) == {2, 3}
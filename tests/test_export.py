@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.core.config import settings
+from app.crud.user import user as user_crud
+from app.schemas.user import UserUpdate
+from tests.utils.user import create_random_user
+
+
+@pytest.fixture
+def user_ids(db_session: Session) -> List[int]:
+    """Ids of three new users, the first one inactive."""
+    users = [create_random_user(db_session) for _ in range(3)]
+    user_crud.update(db_session, db_obj=users[0], obj_in=UserUpdate(is_active=False))
+    return [u.id for u in users]
+
+
+def test_stream_batches(db_session: Session, user_ids: List[int]) -> None:
+    """Test that the CRUD stream yields column rows in bounded batches."""
+    batches = list(user_crud.stream(db_session, columns=["id", "email"], batch_size=2))
+    assert all(len(batch) <= 2 for batch in batches)
+    rows = [row for batch in batches for row in batch]
+    assert set(user_ids) <= {row.id for row in rows}
+    assert [row.id for row in rows] == sorted(row.id for row in rows)
+
+
+def test_export_ndjson(client: TestClient, user_ids: List[int]) -> None:
+    """Test the NDJSON export and its filters."""
+    response = client.get(f"{settings.API_V1_STR}/users/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert set(user_ids) <= {row["id"] for row in exported}
+    assert all("password" not in row for row in exported)
+
+    response = client.get(
+        f"{settings.API_V1_STR}/users/export", params={"is_active": False}
+    )
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in exported] == [user_ids[0]]
+
+
+def test_export_csv(client: TestClient, user_ids: List[int]) -> None:
+    """Test the CSV export."""
+    response = client.get(
+        f"{settings.API_V1_STR}/users/export", params={"format": "csv"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert {str(id) for id in user_ids} <= {row["id"] for row in rows}
+    assert set(rows[0]) == {"id", "email", "is_active", "is_superuser"}
+
+
+def test_read_users_filters(client: TestClient, user_ids: List[int]) -> None:
+    """Test that the list endpoint takes the same filters as the export."""
+    response = client.get(f"{settings.API_V1_STR}/users/", params={"is_active": False})
+    assert response.status_code == 200
+    assert [u["id"] for u in response.json()] == [user_ids[0]]
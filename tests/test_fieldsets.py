@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.core.config import settings
+from app.crud.user import user_cache
+from tests.utils.user import create_random_user
+
+USERS_URL = f"{settings.API_V1_STR}/users"
+
+
+def test_read_users_fields(
+    client: TestClient, db_session: Session, sql_statements: List[str]
+) -> None:
+    """Test that list responses and their SELECT only contain `fields`."""
+    for _ in range(3):
+        create_random_user(db_session)
+    sql_statements.clear()
+    response = client.get(
+        f"{USERS_URL}/", params={"fields": "email", "limit": 2, "order_by": "email"}
+    )
+    assert response.status_code == 200, response.text
+    users = response.json()
+    assert len(users) == 2
+    assert all(list(user) == ["email"] for user in users)
+    assert "X-Next-Cursor" in response.headers
+    assert "X-Total-Count" in response.headers
+    select = next(s for s in sql_statements if s.startswith("SELECT"))
+    assert "password" not in select and "is_active" not in select
+
+    next_page = client.get(
+        f"{USERS_URL}/",
+        params={"fields": "email", "after": response.headers["X-Next-Cursor"]},
+    )
+    assert next_page.status_code == 200
+    assert next_page.json()[0]["email"] > users[-1]["email"]
+
+
+def test_read_user_fields(client: TestClient, db_session: Session) -> None:
+    """Test that single-user reads are narrowed, cached or not."""
+    user = create_random_user(db_session)
+    for url in [f"{USERS_URL}/{user.id}", f"{USERS_URL}/by-email/{user.email}"]:
+        if user_cache is not None:
+            user_cache.clear()
+        for _ in range(2):
+            response = client.get(url, params={"fields": "id,email,id"})
+            assert response.status_code == 200, response.text
+            assert response.json() == {"id": user.id, "email": user.email}
+
+
+def test_read_user_unknown_fields(client: TestClient, db_session: Session) -> None:
+    """Test that unknown or empty fieldsets are rejected."""
+    user = create_random_user(db_session)
+    for fields in ["password", "email,nope", ","]:
+        response = client.get(f"{USERS_URL}/{user.id}", params={"fields": fields})
+        assert response.status_code == 400, fields
+    response = client.get(f"{USERS_URL}/", params={"fields": "password"})
+    assert response.status_code == 400
+
+
+def test_read_user_fields_not_found(client: TestClient) -> None:
+    response = client.get(f"{USERS_URL}/999999", params={"fields": "email"})
+    assert response.status_code == 404
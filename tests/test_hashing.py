@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.hashing import HashingUnavailableError, PasswordHasher, password_hasher
+from app.core.security import verify_password
+from tests.utils.utils import random_email, random_lower_string
+
+
+@pytest.mark.anyio
+async def test_hash_and_verify_password() -> None:
+    """Test hashing and verifying a password through the worker pool."""
+    hasher = PasswordHasher(max_workers=1)
+    try:
+        password = random_lower_string()
+        hashed = await hasher.hash_password(password)
+        assert hashed != password
+        assert verify_password(password, hashed)
+        assert await hasher.verify_password(password, hashed)
+        assert not await hasher.verify_password("wrong-password", hashed)
+        assert hasher.pending == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.anyio
+async def test_hash_password_saturated() -> None:
+    """Test that a saturated pool fails fast instead of queueing."""
+    hasher = PasswordHasher(max_workers=1, max_pending=0)
+    with pytest.raises(HashingUnavailableError):
+        await hasher.hash_password(random_lower_string())
+    assert hasher.pending == 0
+
+
+def test_create_user_api_hashing_saturated(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the API answers 503 with Retry-After when hashing is saturated."""
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    data = {"email": random_email(), "password": random_lower_string()}
+    response = client.post(f"{settings.API_V1_STR}/users/", json=data)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.anyio
+async def test_hash_passwords_waits_for_slots() -> None:
+    """Test that a batch larger than `max_pending` waits for slots to free up."""
+    hasher = PasswordHasher(max_workers=1, max_pending=2)
+    try:
+        passwords = [random_lower_string() for _ in range(5)]
+        hashed = await hasher.hash_passwords(passwords)
+        assert all(verify_password(p, h) for p, h in zip(passwords, hashed))
+        assert hasher.pending == 0
+    finally:
+        hasher.shutdown()
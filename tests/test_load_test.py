@@ -0,0 +1,31 @@
+from benchmarks.load_test import compare
+
+
+def summary(p95_ms: float, rps: float, errors: int = 0) -> dict:
+    return {"p95_ms": p95_ms, "rps": rps, "errors": errors}
+
+
+def test_compare_within_tolerance() -> None:
+    """Test that changes inside the allowed regression pass."""
+    baseline = {"read_storm GET /users/{id}": summary(10.0, 500.0)}
+    results = {"read_storm GET /users/{id}": summary(11.5, 430.0)}
+    assert compare(results, baseline, max_regression=0.2) == []
+
+
+def test_compare_reports_regressions() -> None:
+    """Test that slower, lower-throughput or failing endpoints are reported."""
+    baseline = {
+        "read_storm GET /users/{id}": summary(10.0, 500.0),
+        "update_churn PUT /users/{id}": summary(10.0, 500.0),
+    }
+    results = {
+        "read_storm GET /users/{id}": summary(13.0, 350.0),
+        "update_churn PUT /users/{id}": summary(10.0, 500.0, errors=3),
+        "signup_burst POST /users/": summary(900.0, 1.0),
+    }
+    failures = compare(results, baseline, max_regression=0.2)
+    assert failures == [
+        "read_storm GET /users/{id}: p95 10.0 ms -> 13.0 ms",
+        "read_storm GET /users/{id}: rps 500.0 -> 350.0",
+        "update_churn PUT /users/{id}: errors 0 -> 3",
+    ]
@@ -0,0 +1,107 @@
+import pytest
+from fastapi.testclient import TestClient
+from passlib.hash import pbkdf2_sha256
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.calibrate_hashing import calibrate
+from app.core.config import settings
+from app.core.security import pwd_context
+from app.crud.user import user as user_crud
+from app.schemas.user import UserCreate
+from tests.utils.user import user_authentication_headers
+from tests.utils.utils import random_email, random_lower_string
+
+LOGIN_URL = f"{settings.API_V1_STR}/login/access-token"
+
+
+def test_login_access_token(client: TestClient, db_session: Session) -> None:
+    """Test that a valid login returns a token for the user."""
+    email, password = random_email(), random_lower_string()
+    user = user_crud.create(
+        db_session, obj_in=UserCreate(email=email, password=password)
+    )
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    token = headers["Authorization"].removeprefix("Bearer ")
+    assert deps.decode_token(token).sub == user.id
+
+
+@pytest.mark.parametrize("known_email", [True, False])
+def test_login_incorrect_password(
+    client: TestClient, db_session: Session, known_email: bool
+) -> None:
+    """Test that wrong passwords and unknown emails get the same answer."""
+    email = random_email()
+    if known_email:
+        user_crud.create(
+            db_session, obj_in=UserCreate(email=email, password=random_lower_string())
+        )
+    data = {"username": email, "password": random_lower_string()}
+    response = client.post(LOGIN_URL, data=data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Incorrect email or password"
+
+
+def test_login_inactive_user(client: TestClient, db_session: Session) -> None:
+    """Test that inactive users cannot log in."""
+    email, password = random_email(), random_lower_string()
+    user_crud.create(
+        db_session, obj_in=UserCreate(email=email, password=password, is_active=False)
+    )
+    response = client.post(LOGIN_URL, data={"username": email, "password": password})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_login_rehashes_outdated_hash(client: TestClient, db_session: Session) -> None:
+    """Test that a hash from a deprecated scheme is replaced at login."""
+    email, password = random_email(), random_lower_string()
+    old_hash = pbkdf2_sha256.hash(password)
+    user = user_crud.create(
+        db_session,
+        obj_in=UserCreate(email=email, password=password),
+        hashed_password=old_hash,
+    )
+    response = client.post(LOGIN_URL, data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+
+    stored = user_crud.get(db_session, id=user.id)
+    assert stored is not None and stored.password != old_hash
+    assert pwd_context.identify(stored.password) == settings.PASSWORD_HASH_SCHEME
+    assert not pwd_context.needs_update(stored.password)
+    assert pwd_context.verify(password, stored.password)
+
+
+def test_authenticate(db_session: Session) -> None:
+    """Test that authenticate verifies the hash rather than the raw value."""
+    email, password = random_email(), random_lower_string()
+    user = user_crud.create(
+        db_session, obj_in=UserCreate(email=email, password=password)
+    )
+    assert user_crud.authenticate(db_session, email=email, password=password)
+    assert not user_crud.authenticate(db_session, email=email, password=user.password)
+    assert not user_crud.authenticate(
+        db_session, email=random_email(), password=password
+    )
+
+
+def test_calibrate_log2_cost() -> None:
+    """Test that calibration stops before the first cost over budget."""
+    rounds, measured = calibrate(
+        "bcrypt", 0.1, lambda rounds: 0.001 * 2 ** (rounds - 4), min_rounds=10
+    )
+    assert rounds == 10
+    assert measured == [(11, 0.128)]
+
+    rounds, _ = calibrate(
+        "bcrypt", 0.1, lambda rounds: 0.0001 * 2 ** (rounds - 4), min_rounds=4
+    )
+    assert rounds == 13
+
+
+def test_calibrate_linear_cost() -> None:
+    """Test that calibration scales linear costs to the budget."""
+    rounds, _ = calibrate(
+        "pbkdf2_sha256", 0.25, lambda rounds: rounds / 1_000_000, min_rounds=100_000
+    )
+    assert rounds == 250_000
@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from typing import Dict, List
+
+import pytest
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.crud.user import user as user_crud, user_cache
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_email
+
+USERS_URL = f"{settings.API_V1_STR}/users"
+
+
+def test_lookup_users(
+    client: TestClient, db_session: Session, sql_statements: List[str]
+) -> None:
+    """Test that ids and emails are resolved with one query each."""
+    users = [create_random_user(db_session) for _ in range(3)]
+    if user_cache is not None:
+        user_cache.clear()
+    db_session.expunge_all()
+    missing_email = random_email()
+    sql_statements.clear()
+    response = client.post(
+        f"{USERS_URL}/lookup",
+        json={
+            "ids": [users[1].id, users[0].id, users[1].id, 10**9],
+            "emails": [users[2].email, users[0].email, missing_email],
+        },
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert [user["id"] for user in result["users"]] == [
+        users[1].id,
+        users[0].id,
+        users[2].id,
+    ]
+    assert result["missing_ids"] == [10**9]
+    assert result["missing_emails"] == [missing_email]
+    selects = [s for s in sql_statements if s.startswith("SELECT")]
+    assert len(selects) == 2
+    assert all(" IN " in select for select in selects)
+
+
+def test_lookup_users_cached(
+    client: TestClient, db_session: Session, sql_statements: List[str]
+) -> None:
+    """Test that cached users cost no query."""
+    if user_cache is None:
+        pytest.skip("user cache disabled")
+    user = create_random_user(db_session)
+    body = {"ids": [user.id], "emails": [user.email]}
+    client.post(f"{USERS_URL}/lookup", json=body)
+    sql_statements.clear()
+    response = client.post(f"{USERS_URL}/lookup", json=body)
+    assert [u["id"] for u in response.json()["users"]] == [user.id]
+    assert not [s for s in sql_statements if s.startswith("SELECT")]
+
+
+def test_lookup_users_limits(client: TestClient) -> None:
+    """Test that empty lookups are fine and oversized ones are rejected."""
+    response = client.post(f"{USERS_URL}/lookup", json={})
+    assert response.json() == {"users": [], "missing_ids": [], "missing_emails": []}
+    too_many = list(range(settings.USER_LOOKUP_MAX_KEYS + 1))
+    response = client.post(f"{USERS_URL}/lookup", json={"ids": too_many})
+    assert response.status_code == 422
+
+
+def test_get_many(db_session: Session) -> None:
+    """Test that `get_many` keys rows by id and skips unknown ids."""
+    users = [create_random_user(db_session) for _ in range(2)]
+    found = user_crud.get_many(db_session, ids=[users[1].id, -1, users[0].id])
+    assert list(found) == [users[1].id, users[0].id]
+    assert found[users[0].id].email == users[0].email
+
+
+def test_singleflight_coalesces() -> None:
+    """Test that concurrent loads of overlapping keys share one load per key."""
+    flight: SingleFlight[int, str] = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    loads: List[List[int]] = []
+
+    def load(keys: List[int]) -> Dict[int, str]:
+        loads.append(keys)
+        started.set()
+        release.wait(5)
+        return {key: str(key) for key in keys if key != 3}
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(flight.do_many, [1, 2, 3], load)
+        started.wait(5)
+        second = pool.submit(flight.do_many, [2, 3, 4], load)
+        while len(loads) < 2:
+            release.wait(0.001)
+        release.set()
+        assert first.result() == {1: "1", 2: "2"}
+        assert second.result() == {2: "2", 4: "4"}
+    assert loads == [[1, 2, 3], [4]]
+    assert flight.in_flight() == 0
+
+
+def test_singleflight_shares_errors() -> None:
+    """Test that waiters see the error of the load they waited for."""
+    flight: SingleFlight[int, str] = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls: List[List[int]] = []
+
+    def failing(keys: List[int]) -> Dict[int, str]:
+        calls.append(keys)
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(flight.do_many, [1], failing)
+        started.wait(5)
+        second = pool.submit(flight.do_many, [1], failing)
+        time.sleep(0.1)
+        release.set()
+        for future in (first, second):
+            with pytest.raises(RuntimeError):
+                future.result()
+    assert calls == [[1]]
+    assert flight.in_flight() == 0
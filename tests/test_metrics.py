@@ -0,0 +1,68 @@
+import pytest
+import re
+from fastapi.testclient import TestClient
+from httpx import Response
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import MetricsRegistry, RequestMetrics, metrics_registry
+from app.models.user import User
+from tests.utils.user import create_random_user
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics() -> None:
+    metrics_registry.clear()
+
+
+@pytest.fixture
+def user(db_session: Session) -> User:
+    return create_random_user(db_session)
+
+
+def statement_count(response: Response) -> int:
+    match = re.search(r'desc="(\d+) queries"', response.headers["Server-Timing"])
+    assert match
+    return int(match.group(1))
+
+
+def test_registry_render() -> None:
+    """Test the Prometheus text output of the registry."""
+    registry = MetricsRegistry()
+    registry.observe("GET", "/users/{user_id}", 200, RequestMetrics(statements=2))
+    registry.observe("GET", "/users/{user_id}", 404, RequestMetrics(statements=1))
+    text = registry.render()
+    labels = 'method="GET",route="/users/{user_id}"'
+    assert f'http_requests_total{{{labels},status="200"}} 1' in text
+    assert f'http_requests_total{{{labels},status="404"}} 1' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in text
+    assert f"http_request_db_statements_total{{{labels}}} 3" in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+
+
+def test_server_timing_header(client: TestClient, user: User) -> None:
+    """Test that responses report their DB time and statement count."""
+    response = client.get(f"{settings.API_V1_STR}/users/{user.id}")
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert re.search(r'db;dur=[\d.]+;desc="[1-9]\d* queries"', timing), timing
+    assert re.search(r"total;dur=[\d.]+", timing), timing
+
+
+def test_metrics_endpoint(client: TestClient, user: User) -> None:
+    """Test that /metrics aggregates requests by route template."""
+    found = client.get(f"{settings.API_V1_STR}/users/{user.id}")
+    missing = client.get(f"{settings.API_V1_STR}/users/999999")
+    statements = statement_count(found) + statement_count(missing)
+    client.get("/no-such-path")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    labels = f'method="GET",route="{settings.API_V1_STR}/users/{{user_id}}"'
+    assert f'http_requests_total{{{labels},status="200"}} 1' in response.text
+    assert f'http_requests_total{{{labels},status="404"}} 1' in response.text
+    assert f"http_request_db_statements_total{{{labels}}} {statements}" in (
+        response.text
+    )
+    assert 'route="<unmatched>",status="404"' in response.text
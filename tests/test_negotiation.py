@@ -0,0 +1,74 @@
+import msgpack
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+
+from app.api.negotiation import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, negotiate
+from app.core.config import settings
+from app.schemas.user import User, UserRecord
+from tests.utils.user import create_random_user
+
+USERS_URL = f"{settings.API_V1_STR}/users"
+MSGPACK = {"Accept": MSGPACK_MEDIA_TYPE}
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("text/html", JSON_MEDIA_TYPE),
+        ("application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/x-msgpack, application/json;q=0.5", MSGPACK_MEDIA_TYPE),
+        ("application/json, application/msgpack", JSON_MEDIA_TYPE),
+        ("application/json;q=0.9, application/msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/msgpack;q=0, */*", JSON_MEDIA_TYPE),
+    ],
+)
+def test_negotiate(accept: str, expected: str) -> None:
+    headers = [] if accept is None else [(b"accept", accept.encode())]
+    request = Request({"type": "http", "headers": headers})
+    assert negotiate(request) == expected
+
+
+def test_read_user_msgpack(client: TestClient, db_session: Session) -> None:
+    """Test that a user reads the same in MessagePack, with its own ETag."""
+    user = create_random_user(db_session)
+    url = f"{USERS_URL}/{user.id}"
+    as_json = client.get(url)
+    packed = client.get(url, headers=MSGPACK)
+    assert packed.status_code == 200
+    assert packed.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert as_json.headers["Content-Type"] == JSON_MEDIA_TYPE
+    assert as_json.headers["Vary"] == packed.headers["Vary"] == "Accept"
+    assert msgpack.unpackb(packed.content) == as_json.json()
+
+    etag = packed.headers["ETag"]
+    assert etag != as_json.headers["ETag"]
+    unchanged = client.get(url, headers={**MSGPACK, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    narrowed = client.get(url, params={"fields": "email"}, headers=MSGPACK)
+    assert msgpack.unpackb(narrowed.content) == {"email": user.email}
+
+
+def test_read_users_msgpack(client: TestClient, db_session: Session) -> None:
+    """Test that lists are negotiated and keep their paging headers."""
+    for _ in range(3):
+        create_random_user(db_session)
+    params: Dict[str, Any] = {"order_by": "email", "limit": 2}
+    as_json = client.get(f"{USERS_URL}/", params=params)
+    packed = client.get(f"{USERS_URL}/", params=params, headers=MSGPACK)
+    assert packed.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(packed.content) == as_json.json()
+    for header in ["X-Total-Count", "X-Next-Cursor"]:
+        assert packed.headers[header] == as_json.headers[header]
+    assert packed.headers["ETag"] != as_json.headers["ETag"]
+
+
+def test_user_record_matches_schema() -> None:
+    """Test that the unvalidated serialization schema sends every user field."""
+    assert list(UserRecord.__annotations__) == list(User.model_fields)
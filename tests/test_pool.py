@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+from sqlalchemy import exc, text
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core.config import settings
+from app.db.db_utils import (
+    AsyncDatabaseConnectionPool,
+    create_pooled_engine,
+    get_pool_stats,
+)
+from main import app
+from tests.utils.user import create_random_user
+
+
+def test_pool_settings_and_stats(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that pool settings apply and checkouts and timeouts are counted."""
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.05)
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    stats = get_pool_stats(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        snapshot = stats.snapshot(engine.pool)
+        assert (snapshot["pool_size"], snapshot["in_use"]) == (1, 1)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    snapshot = stats.snapshot(engine.pool)
+    assert snapshot["checkouts"] == snapshot["checkins"] == 1
+    assert (snapshot["in_use"], snapshot["idle"]) == (0, 1)
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_max_ms"] >= 50
+    engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_async_pool_on_sqlite(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the async pool builds for aiosqlite, which takes no pool sizing."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'async.db'}"
+    monkeypatch.setattr(settings, "ASYNC_SQLALCHEMY_DATABASE_URI", url)
+    monkeypatch.setattr(AsyncDatabaseConnectionPool, "_instance", None)
+    pool = AsyncDatabaseConnectionPool()
+    try:
+        async with pool.get_session() as session:
+            assert await session.scalar(text("SELECT 1")) == 1
+    finally:
+        await pool.engine.dispose()
+
+
+def test_read_stats_api(client: TestClient, db_session: Session) -> None:
+    """Test the internal stats endpoint."""
+    superuser = create_random_user(db_session)
+    app.dependency_overrides[deps.get_current_active_superuser] = lambda: superuser
+    try:
+        response = client.get(f"{settings.API_V1_STR}/internal/stats")
+    finally:
+        del app.dependency_overrides[deps.get_current_active_superuser]
+    assert response.status_code == 200
+    body = response.json()
+    assert {"in_use", "idle", "timeouts", "wait_avg_ms"} <= set(body["db_pool"])
+    assert "hits" in body["user_cache"]
@@ -0,0 +1,98 @@
+import anyio
+import anyio.to_thread
+import os
+import pytest
+import threading
+import time
+from collections import Counter
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pathlib import Path
+from typing import Any
+
+from app.api.middleware import ProfilingMiddleware
+from app.core.profiling import (
+    PROFILE_SUFFIX,
+    WORKER_THREAD_NAME,
+    ProfileStore,
+    StackSampler,
+)
+
+
+def make_client(tmp_path: Path, **options: Any) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def slow_endpoint(item_id: int) -> dict:
+        time.sleep(0.05)
+        return {}
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=ProfileStore(tmp_path, max_bytes=10_000),
+        interval=0.001,
+        **options,
+    )
+    return TestClient(app)
+
+
+def test_profile_on_request(tmp_path: Path) -> None:
+    """Test that only requests with the secret header are profiled on demand."""
+    client = make_client(tmp_path, secret="s3cret")
+    assert "X-Profile-File" not in client.get("/items/1").headers
+    wrong = client.get("/items/1", headers={"X-Profile": "guess"})
+    assert "X-Profile-File" not in wrong.headers
+    assert list(tmp_path.iterdir()) == []
+
+    response = client.get("/items/1", headers={"X-Profile": "s3cret"})
+    assert response.status_code == 200
+    name = response.headers["X-Profile-File"]
+    assert "-GET-items_item_id-" in name
+    lines = (tmp_path / name).read_text().splitlines()
+    assert lines
+    assert any(line.startswith("worker;") and "slow_endpoint" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_sampled_profiles(tmp_path: Path) -> None:
+    """Test sampling without the header; no file name is disclosed then."""
+    client = make_client(tmp_path, sample_rate=1.0)
+    response = client.get("/items/1")
+    assert "X-Profile-File" not in response.headers
+    assert len(list(tmp_path.glob(f"*{PROFILE_SUFFIX}"))) == 1
+
+
+def test_store_rotation(tmp_path: Path) -> None:
+    """Test that the oldest profiles are deleted beyond the size cap."""
+    store = ProfileStore(tmp_path / "profiles", max_bytes=250)
+    samples = Counter({"worker;" + "x" * 90: 1})
+    for i in range(4):
+        path = store.save(f"profile-{i}", samples)
+        os.utime(path, (i, i))
+    assert sorted(p.name for p in store.directory.iterdir()) == [
+        f"profile-{i}{PROFILE_SUFFIX}" for i in (2, 3)
+    ]
+
+
+@pytest.mark.anyio
+async def test_sampler_skips_idle_threads() -> None:
+    """Test that busy worker threads are sampled and idle ones are not."""
+    stop = threading.Event()
+
+    def busy() -> None:
+        while not stop.is_set():
+            pass
+
+    worker = threading.Thread(target=busy, name=WORKER_THREAD_NAME)
+    worker.start()
+    # Leaves an idle anyio worker thread behind.
+    await anyio.to_thread.run_sync(lambda: None)
+    await anyio.sleep(0.05)
+    sampler = StackSampler(0.001, loop_thread=0)
+    try:
+        sampler.sample()
+    finally:
+        stop.set()
+        worker.join()
+    assert sampler.samples
+    assert all("busy" in stack for stack in sampler.samples)
@@ -0,0 +1,88 @@
+import pytest
+from fastapi.testclient import TestClient
+from typing import Iterator
+
+from app.api import deps
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.rate_limit import (
+    InMemoryRateLimitStore,
+    Limit,
+    LoginRateLimiter,
+    RateLimitExceeded,
+)
+from tests.utils.utils import random_email, random_lower_string
+
+LOGIN_URL = f"{settings.API_V1_STR}/login/access-token"
+
+
+@pytest.fixture
+def limiter(monkeypatch: pytest.MonkeyPatch) -> Iterator[LoginRateLimiter]:
+    limiter = LoginRateLimiter(
+        InMemoryRateLimitStore(max_keys=100),
+        per_ip=Limit(attempts=3, window=60),
+        per_email=Limit(attempts=2, window=60),
+    )
+    monkeypatch.setattr(deps, "login_rate_limiter", limiter)
+    yield limiter
+
+
+def test_token_bucket_refills() -> None:
+    """Test that a bucket allows `attempts` per window and then refills."""
+    store = InMemoryRateLimitStore(max_keys=10)
+    limit = Limit(attempts=2, window=0.05)
+    assert store.take("key", limit) == 0
+    assert store.take("key", limit) == 0
+    retry_after = store.take("key", limit)
+    assert 0 < retry_after <= 0.05
+    store.reset("key")
+    assert store.take("key", limit) == 0
+
+
+def test_store_is_bounded() -> None:
+    """Test that the least recently used buckets are evicted when full."""
+    store = InMemoryRateLimitStore(max_keys=2)
+    limit = Limit(attempts=1, window=60)
+    store.take("a", limit)
+    store.take("b", limit)
+    store.take("a", limit)
+    store.take("c", limit)
+    assert len(store) == 2
+    assert store.evictions == 1
+    assert store.take("a", limit) > 0
+    assert store.take("b", limit) == 0
+
+
+def test_limiter_keys_email_and_ip(limiter: LoginRateLimiter) -> None:
+    """Test that both the email and the client IP are limited."""
+    limiter.check(email="A@example.com", ip="10.0.0.1")
+    limiter.check(email="a@example.com ", ip="10.0.0.2")
+    with pytest.raises(RateLimitExceeded):
+        limiter.check(email="a@example.com", ip="10.0.0.3")
+    limiter.succeeded(email="a@example.com")
+    limiter.check(email="a@example.com", ip="10.0.0.3")
+
+    limiter.check(email="b@example.com", ip="10.0.0.4")
+    limiter.check(email="c@example.com", ip="10.0.0.4")
+    limiter.check(email="d@example.com", ip="10.0.0.4")
+    with pytest.raises(RateLimitExceeded):
+        limiter.check(email="e@example.com", ip="10.0.0.4")
+
+
+def test_login_throttled_before_hashing(
+    client: TestClient,
+    limiter: LoginRateLimiter,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that over-limit logins get 429 with Retry-After and skip hashing."""
+    data = {"username": random_email(), "password": random_lower_string()}
+    for _ in range(2):
+        assert client.post(LOGIN_URL, data=data).status_code == 400
+
+    async def fail(*args: object) -> None:
+        raise AssertionError("password hashed for a throttled login")
+
+    monkeypatch.setattr(password_hasher, "verify_and_update", fail)
+    response = client.post(LOGIN_URL, data=data)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
@@ -0,0 +1,130 @@
+import pytest
+from pathlib import Path
+from sqlalchemy import Engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping
+
+from app.core.cache import LRUTTLCache
+from app.core.singleflight import SingleFlight
+from app.crud.base import CRUDBase, RowKey
+from app.crud.cache import ModelCache
+from app.db.base import Base
+from app.db.db_utils import create_pooled_engine
+from app.db.routing import ReplicaBalancer, RoutingSession
+from app.models.user import User
+
+
+@pytest.fixture
+def engines(tmp_path: Path) -> Iterator[Dict[str, Engine]]:
+    """A primary and two replicas, each holding one user named after it."""
+    engines = {}
+    for name in ("primary", "replica0", "replica1"):
+        engine = create_pooled_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(
+                insert(User).values(id=1, email=f"{name}@example.com", password="x")
+            )
+        engines[name] = engine
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+def make_factory(
+    engines: Dict[str, Engine], strategy: str = "round_robin"
+) -> "sessionmaker[RoutingSession]":
+    balancer = ReplicaBalancer([engines["replica0"], engines["replica1"]], strategy)
+    return sessionmaker(
+        class_=RoutingSession, primary=engines["primary"], balancer=balancer
+    )
+
+
+def read_marker(session: RoutingSession) -> str:
+    return session.scalars(select(User.email).where(User.id == 1)).one()
+
+
+def test_read_only_sessions_round_robin(engines: Dict[str, Engine]) -> None:
+    """Test that read-only sessions are spread across replicas in turn."""
+    factory = make_factory(engines)
+    markers = []
+    for _ in range(4):
+        with factory(read_only=True) as session:
+            markers.append(read_marker(session))
+            # A session stays on the replica it started with.
+            assert read_marker(session) == markers[-1]
+    assert markers == [
+        "replica0@example.com",
+        "replica1@example.com",
+        "replica0@example.com",
+        "replica1@example.com",
+    ]
+
+
+def test_default_sessions_use_primary(engines: Dict[str, Engine]) -> None:
+    """Test that sessions not marked read-only never touch a replica."""
+    with make_factory(engines)() as session:
+        assert read_marker(session) == "primary@example.com"
+
+
+def test_sticks_to_primary_after_write(engines: Dict[str, Engine]) -> None:
+    """Test that a read-only session reads from the primary once it writes."""
+    with make_factory(engines)(read_only=True) as session:
+        assert read_marker(session) == "replica0@example.com"
+        session.add(User(email="new@example.com", password="x"))
+        session.commit()
+        assert read_marker(session) == "primary@example.com"
+        assert session.scalars(
+            select(User).where(User.email == "new@example.com")
+        ).one()
+
+
+def test_least_busy(engines: Dict[str, Engine]) -> None:
+    """Test that least-busy balancing avoids the replica with connections out."""
+    factory = make_factory(engines, strategy="least_busy")
+    with engines["replica0"].connect():
+        with factory(read_only=True) as session:
+            assert read_marker(session) == "replica1@example.com"
+
+
+class RecordingSingleFlight(SingleFlight[RowKey, Dict[str, Any]]):
+    def __init__(self) -> None:
+        super().__init__()
+        self.keys: List[RowKey] = []
+
+    def do_many(
+        self,
+        keys: Iterable[RowKey],
+        load: Callable[[List[RowKey]], Mapping[RowKey, Dict[str, Any]]],
+    ) -> Dict[RowKey, Dict[str, Any]]:
+        keys = list(keys)
+        self.keys.extend(keys)
+        return super().do_many(keys, load)
+
+
+def test_singleflight_keys_follow_replica(engines: Dict[str, Engine]) -> None:
+    """Test that replica reads never share coalesced rows with primary reads."""
+    flight = RecordingSingleFlight()
+    crud: CRUDBase = CRUDBase(User, singleflight=flight)
+    factory = make_factory(engines)
+    with factory() as primary, factory(read_only=True) as replica:
+        emails = [crud.get_many(s, ids=[1])[1].email for s in (primary, replica)]
+    assert emails == ["primary@example.com", "replica0@example.com"]
+    assert [key[0] for key in flight.keys] == [
+        engines["primary"],
+        engines["replica0"],
+    ]
+
+
+def test_cache_filled_from_primary_only(engines: Dict[str, Engine]) -> None:
+    """Test that rows read from a replica, possibly stale, are never cached."""
+    cache = ModelCache(User, LRUTTLCache(max_size=10, ttl=60.0), fields=("email",))
+    crud: CRUDBase = CRUDBase(User, cache=cache)
+    factory = make_factory(engines)
+    with factory(read_only=True) as replica:
+        assert crud.get_many(replica, ids=[1])[1].email == "replica0@example.com"
+        assert cache.get(replica, "id", 1) is None
+    with factory() as primary:
+        crud.get_many(primary, ids=[1])
+    with factory(read_only=True) as replica:
+        assert crud.get_many(replica, ids=[1])[1].email == "primary@example.com"
@@ -0,0 +1,91 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.core.config import settings
+from app.crud.user import user as user_crud
+from app.schemas.user import UserCreate, UserUpdate
+from tests.utils.utils import random_lower_string
+
+SEARCH_URL = f"{settings.API_V1_STR}/users/search"
+
+
+@pytest.fixture
+def emails(db_session: Session) -> List[str]:
+    tag = "zq" + random_lower_string()[:6]
+    emails = [
+        f"{tag}.alice@example.com",
+        f"{tag}.bob@example.com",
+        f"1Carol.{tag}@example.com",
+        f"2dave_{tag}@example.org",
+        f"2davex{tag}@example.org",
+    ]
+    password = random_lower_string()
+    for email in emails:
+        user_crud.create(db_session, obj_in=UserCreate(email=email, password=password))
+    return emails
+
+
+def search(client: TestClient, q: str, limit: int = 20) -> List[str]:
+    response = client.get(SEARCH_URL, params={"q": q, "limit": limit})
+    assert response.status_code == 200, response.text
+    return [user["email"] for user in response.json()]
+
+
+def test_search_prefix_then_substring(client: TestClient, emails: List[str]) -> None:
+    """Test that prefix matches come before substring matches."""
+    tag = emails[0].split(".")[0]
+    assert search(client, tag.upper()) == [
+        emails[0],
+        emails[1],
+        emails[2],
+        emails[3],
+        emails[4],
+    ]
+    assert search(client, f"{tag}.b") == [emails[1]]
+    assert search(client, "1carol.") == [emails[2]]
+
+
+def test_search_limit(client: TestClient, emails: List[str]) -> None:
+    """Test that `limit` caps prefix and substring matches together."""
+    tag = emails[0].split(".")[0]
+    assert search(client, tag, limit=3) == [emails[0], emails[1], emails[2]]
+
+
+def test_search_escapes_wildcards(client: TestClient, emails: List[str]) -> None:
+    """Test that LIKE wildcards in the query are matched literally."""
+    tag = emails[0].split(".")[0]
+    assert search(client, f"dave_{tag}") == [emails[3]]
+    assert search(client, f"%{tag}") == []
+
+
+def test_search_short_terms_match_prefix_only(
+    client: TestClient, emails: List[str]
+) -> None:
+    """Test that terms below the trigram length only match prefixes."""
+    tag = emails[0].split(".")[0]
+    assert search(client, tag[:2]) == [emails[0], emails[1]]
+    assert search(client, tag[1:3]) == []
+
+
+def test_search_follows_updates(
+    client: TestClient, db_session: Session, emails: List[str]
+) -> None:
+    """Test that the search index tracks email changes and deletions."""
+    tag = emails[0].split(".")[0]
+    user = user_crud.get_by_email(db_session, email=emails[0])
+    assert user is not None
+    user_crud.update(db_session, db_obj=user, obj_in=UserUpdate(email="x@y.org"))
+    user_2 = user_crud.get_by_email(db_session, email=emails[1])
+    assert user_2 is not None
+    user_crud.remove(db_session, id=user_2.id)
+    assert emails[0] not in search(client, tag)
+    assert emails[1] not in search(client, tag)
+    assert search(client, "x@y.or") == ["x@y.org"]
+
+
+@pytest.mark.parametrize("params", [{}, {"q": ""}, {"q": "a", "limit": 0}])
+def test_search_invalid_params(client: TestClient, params: dict) -> None:
+    response = client.get(SEARCH_URL, params=params)
+    assert response.status_code == 422
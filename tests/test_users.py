@@ -1,7 +1,10 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Tuple
+from types import SimpleNamespace
+from typing import Any, List, Tuple
 
 from app.core.config import settings
 from app.crud.user import user as user_crud
@@ -94,6 +97,49 @@ def test_create_user_existing_email(
     )
 
 
+class FakePostgresError(Exception):
+    def __init__(self, pgcode: str, constraint_name: str):
+        self.pgcode = pgcode
+        self.diag = SimpleNamespace(constraint_name=constraint_name)
+
+
+def test_is_unique_violation(db_session: Session, test_user: Tuple[User, str]) -> None:
+    """Test telling a duplicate email from other constraint violations."""
+    user, password = test_user
+    with pytest.raises(IntegrityError) as duplicate:
+        user_crud.create(
+            db_session, obj_in=UserCreate(email=user.email, password=password)
+        )
+    assert user_crud.is_unique_violation(duplicate.value, "email")
+
+    with pytest.raises(IntegrityError) as missing:
+        with db_session.begin_nested():
+            db_session.execute(insert(User).values(email=None, password=password))
+    assert not user_crud.is_unique_violation(missing.value, "email")
+
+    for pgcode, constraint, expected in [
+        ("23505", "ix_user_email", True),
+        ("23505", "user_pkey", False),
+        ("23502", "ix_user_email", False),
+    ]:
+        error = IntegrityError("", {}, FakePostgresError(pgcode, constraint))
+        assert user_crud.is_unique_violation(error, "email") is expected
+
+
+def test_create_user_api_other_integrity_error(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that only a duplicate email is reported as 409."""
+
+    def create(*args: Any, **kwargs: Any) -> User:
+        raise IntegrityError("", {}, FakePostgresError("23503", "fk_user_org"))
+
+    monkeypatch.setattr(user_crud, "create", create)
+    data = {"email": random_email(), "password": random_lower_string()}
+    with pytest.raises(IntegrityError):
+        client.post(f"{settings.API_V1_STR}/users/", json=data)
+
+
 @pytest.mark.parametrize(
     "email, password, status_code",
     [
@@ -147,3 +193,91 @@ def test_delete_user_api(client: TestClient, db_session: Session) -> None:
     assert response.status_code == 204
     user_2 = user_crud.get(db_session, id=user.id)
     assert user_2 is None
+
+
+def test_create_user_api_single_statement(
+    client: TestClient, sql_statements: List[str]
+) -> None:
+    """Test that creating a user issues one INSERT ... RETURNING."""
+    data = {"email": random_email(), "password": random_lower_string()}
+    response = client.post(f"{settings.API_V1_STR}/users/", json=data)
+    assert response.status_code == 201, response.text
+    assert len(sql_statements) == 1
+    assert sql_statements[0].startswith("INSERT")
+
+
+def test_update_user_api_single_statement(
+    client: TestClient,
+    db_session: Session,
+    test_user: Tuple[User, str],
+    sql_statements: List[str],
+) -> None:
+    """
+    Test that updating a user issues one UPDATE ... RETURNING, which reads the
+    old values too on Postgres; other databases read them first.
+    """
+    user, _ = test_user
+    sql_statements.clear()
+    data = {"email": random_email()}
+    response = client.put(f"{settings.API_V1_STR}/users/{user.id}", json=data)
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == data["email"]
+    if db_session.get_bind().dialect.name != "postgresql":
+        assert sql_statements.pop(0).startswith("SELECT")
+    assert len(sql_statements) == 1
+    assert sql_statements[0].startswith("UPDATE")
+
+
+def test_update_by_id_without_old_values(
+    db_session: Session,
+    test_user: Tuple[User, str],
+    sql_statements: List[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that old values aren't read when neither audit nor counts need them."""
+    user, _ = test_user
+    monkeypatch.setattr(user_crud, "audit", None)
+    sql_statements.clear()
+    email = random_email()
+    updated = user_crud.update_by_id(db_session, id=user.id, obj_in={"email": email})
+    assert updated is not None and updated.email == email
+    assert len(sql_statements) == 1
+    assert sql_statements[0].startswith("UPDATE")
+
+
+def test_update_user_api_existing_email(
+    client: TestClient, db_session: Session, test_user: Tuple[User, str]
+) -> None:
+    """Test that updating to a taken email is a conflict."""
+    user, password = test_user
+    other = user_crud.create(
+        db_session, obj_in=UserCreate(email=random_email(), password=password)
+    )
+    data = {"email": user.email}
+    response = client.put(f"{settings.API_V1_STR}/users/{other.id}", json=data)
+    assert response.status_code == 409, response.text
+
+
+def test_update_user_api_not_found(client: TestClient) -> None:
+    """Test updating a user that does not exist."""
+    data = {"email": random_email()}
+    response = client.put(f"{settings.API_V1_STR}/users/999999", json=data)
+    assert response.status_code == 404
+
+
+def test_delete_user_api_single_statement(
+    client: TestClient, test_user: Tuple[User, str], sql_statements: List[str]
+) -> None:
+    """Test that deleting a user issues one DELETE ... RETURNING."""
+    user, _ = test_user
+    sql_statements.clear()
+    response = client.delete(f"{settings.API_V1_STR}/users/{user.id}")
+    assert response.status_code == 204
+    assert len(sql_statements) == 1
+    assert sql_statements[0].startswith("DELETE")
+
+
+def test_delete_user_api_not_found(client: TestClient) -> None:
+    """Test deleting a user that does not exist."""
+    response = client.delete(f"{settings.API_V1_STR}/users/999999")
+    assert response.status_code == 404
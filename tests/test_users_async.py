@@ -0,0 +1,265 @@
+import msgpack
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from typing import Any, AsyncGenerator, Dict, Generator, List, Tuple
+
+from app.api import deps
+from app.api.negotiation import MSGPACK_MEDIA_TYPE
+from app.api.v1.endpoints import users_async
+from app.core.config import settings
+from app.crud.audit import AuditLog
+from app.crud.user_async import user_async as user_crud
+from app.db.base import Base
+from app.models.user import User
+from app.schemas.user import UserCreate, UserUpdate
+from main import users_router
+from tests.utils.utils import random_email, random_lower_string
+
+
+@pytest.fixture
+async def async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session = async_sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    await session.close()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def async_client(
+    async_db_session: AsyncSession,
+) -> AsyncGenerator[AsyncClient, None]:
+    async def override_get_async_db() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    app = FastAPI()
+    app.include_router(users_async.router, prefix=f"{settings.API_V1_STR}/users")
+    app.dependency_overrides[deps.get_async_db] = override_get_async_db
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+@pytest.fixture(params=["sync", "async"])
+async def mode_client(
+    request: pytest.FixtureRequest,
+    monkeypatch: pytest.MonkeyPatch,
+    db_session: Session,
+    async_db_session: AsyncSession,
+) -> AsyncGenerator[AsyncClient, None]:
+    """Client of the users API as `main` mounts it with `USE_ASYNC_DB` off and on."""
+    monkeypatch.setattr(settings, "USE_ASYNC_DB", request.param == "async")
+
+    def override_get_db() -> Generator[Session, None, None]:
+        yield db_session
+
+    async def override_get_async_db() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    app = FastAPI()
+    app.include_router(users_router(), prefix=f"{settings.API_V1_STR}/users")
+    app.dependency_overrides[deps.get_db] = override_get_db
+    app.dependency_overrides[deps.get_read_db] = override_get_db
+    app.dependency_overrides[deps.get_async_db] = override_get_async_db
+    transport = ASGITransport(app=app)  # type: ignore[arg-type]
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.anyio
+async def test_async_crud(async_db_session: AsyncSession) -> None:
+    """Test create, read, update and delete through the async CRUD layer."""
+    email = random_email()
+    password = random_lower_string()
+    user = await user_crud.create(
+        async_db_session, obj_in=UserCreate(email=email, password=password)
+    )
+    assert user.email == email
+    assert user.password != password
+
+    user_2 = await user_crud.get_by_email(async_db_session, email=email)
+    assert user_2 and user_2.id == user.id
+
+    new_email = random_email()
+    user_3 = await user_crud.update(
+        async_db_session, db_obj=user, obj_in=UserUpdate(email=new_email)
+    )
+    assert user_3.email == new_email
+
+    assert await user_crud.remove(async_db_session, id=user.id) is not None
+    assert await user_crud.get(async_db_session, id=user.id) is None
+
+
+@pytest.mark.anyio
+async def test_async_users_api(async_client: AsyncClient) -> None:
+    """Test the async users endpoints end to end."""
+    email = random_email()
+    data = {"email": email, "password": random_lower_string()}
+    response = await async_client.post(f"{settings.API_V1_STR}/users/", json=data)
+    assert response.status_code == 201, response.text
+    user_id = response.json()["id"]
+
+    response = await async_client.post(f"{settings.API_V1_STR}/users/", json=data)
+    assert response.status_code == 409
+
+    response = await async_client.get(f"{settings.API_V1_STR}/users/{user_id}")
+    assert response.status_code == 200
+    assert response.json()["email"] == email
+
+    response = await async_client.get(f"{settings.API_V1_STR}/users/")
+    assert response.status_code == 200
+    assert [u["id"] for u in response.json()] == [user_id]
+
+    new_email = random_email()
+    response = await async_client.put(
+        f"{settings.API_V1_STR}/users/{user_id}", json={"email": new_email}
+    )
+    assert response.status_code == 200
+    assert response.json()["email"] == new_email
+
+    response = await async_client.delete(f"{settings.API_V1_STR}/users/{user_id}")
+    assert response.status_code == 204
+    response = await async_client.get(f"{settings.API_V1_STR}/users/{user_id}")
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_users_api_in_both_modes(mode_client: AsyncClient) -> None:
+    """Test that every users endpoint and read option is served in both modes."""
+    url = f"{settings.API_V1_STR}/users"
+    email = random_email()
+    data = {"email": email, "password": random_lower_string()}
+    response = await mode_client.post(f"{url}/", json=data)
+    assert response.status_code == 201
+    user_id = response.json()["id"]
+
+    response = await mode_client.get(f"{url}/", params={"fields": "email"})
+    assert response.status_code == 200
+    assert response.json() == [{"email": email}]
+    assert response.headers["X-Total-Count"] == "1"
+    response = await mode_client.get(
+        f"{url}/{user_id}", headers={"Accept": MSGPACK_MEDIA_TYPE}
+    )
+    assert response.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content)["email"] == email
+    response = await mode_client.get(f"{url}/by-email/{email}?fields=id")
+    assert response.json() == {"id": user_id}
+    response = await mode_client.get(f"{url}/count")
+    assert response.json() == {"count": 1}
+
+    requests: List[Tuple[str, str, Dict[str, Any]]] = [
+        ("POST", "/bulk", {"json": {"users": [data]}}),
+        ("GET", "/export", {}),
+        ("GET", "/search", {"params": {"q": email[:3]}}),
+        ("POST", "/lookup", {"json": {"ids": [user_id]}}),
+    ]
+    for method, path, options in requests:
+        response = await mode_client.request(method, f"{url}{path}", **options)
+        assert response.status_code == 200, (path, response.text)
+
+
+@pytest.mark.anyio
+async def test_etags_in_both_modes(mode_client: AsyncClient) -> None:
+    """Test conditional reads and updates with `USE_ASYNC_DB` off and on."""
+    url = f"{settings.API_V1_STR}/users"
+    data = {"email": random_email(), "password": random_lower_string()}
+    user_id = (await mode_client.post(f"{url}/", json=data)).json()["id"]
+
+    response = await mode_client.get(f"{url}/{user_id}")
+    etag = response.headers["ETag"]
+    response = await mode_client.get(
+        f"{url}/{user_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    page = await mode_client.get(f"{url}/", params={"fields": "email"})
+    response = await mode_client.get(
+        f"{url}/",
+        params={"fields": "email"},
+        headers={"If-None-Match": page.headers["ETag"]},
+    )
+    assert response.status_code == 304
+
+    response = await mode_client.put(
+        f"{url}/{user_id}", json={"is_active": False}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    response = await mode_client.put(
+        f"{url}/{user_id}", json={"is_active": True}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+    response = await mode_client.get(
+        f"{url}/{user_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+
+    # Preconditions can't hold for a user that doesn't exist.
+    for if_match in [etag, "*"]:
+        response = await mode_client.put(
+            f"{url}/{user_id + 1}",
+            json={"is_active": True},
+            headers={"If-Match": if_match},
+        )
+        assert response.status_code == 412
+    response = await mode_client.put(f"{url}/{user_id + 1}", json={"is_active": True})
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_async_update_by_id_audits_old_values(
+    async_db_session: AsyncSession, audit_log: AuditLog, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that only changed fields are audited, with their old values."""
+    user = await user_crud.create(
+        async_db_session,
+        obj_in=UserCreate(email=random_email(), password=random_lower_string()),
+    )
+    recorded: List[Tuple[Any, ...]] = []
+    monkeypatch.setattr(
+        audit_log, "record", lambda *args, **kwargs: recorded.append(args)
+    )
+    for _ in range(2):
+        await user_crud.update_by_id(
+            async_db_session, id=user.id, obj_in={"is_active": False}
+        )
+    assert recorded == [
+        ("update", "user", user.id, {"is_active": {"old": True, "new": False}})
+    ]
+
+
+@pytest.mark.anyio
+async def test_async_counts_follow_writes(
+    async_client: AsyncClient, async_db_session: AsyncSession
+) -> None:
+    """Test that async writes keep the counter serving `/count` up to date."""
+    assert user_crud.counter is not None
+    url = f"{settings.API_V1_STR}/users"
+
+    async def count() -> int:
+        response = await async_client.get(f"{url}/count")
+        assert response.status_code == 200, response.text
+        return int(response.json()["count"])
+
+    assert await count() == 0
+    data = {"email": random_email(), "password": random_lower_string()}
+    user_id = (await async_client.post(f"{url}/", json=data)).json()["id"]
+    assert await count() == 1
+    # Rows written behind the counter's back show it is not a COUNT(*).
+    await async_db_session.execute(
+        insert(User).values(email=random_email(), password="x")
+    )
+    await async_db_session.commit()
+    assert await count() == 1
+    response = await async_client.get(f"{url}/", params={"fields": "id"})
+    assert response.headers["X-Total-Count"] == "1"
+
+    assert (await async_client.delete(f"{url}/{user_id}")).status_code == 204
+    assert await count() == 0